@@ -0,0 +1,245 @@
+"""
+Button benchmark: the interrupt-driven decoder (buttons.ButtonEvents)
+against OLED_1inch3.check_button() on simulated edge sequences.
+
+Each scenario is a list of edges on KEY0/KEY1 (taps, contact bounce, long
+presses, presses closer than the debounce time, a tap shorter than one
+polling period, a press across the ticks_ms wrap). The virtual clock steps
+1 ms at a time and the edges are driven through the pins' IRQ handlers.
+
+  ref_1ms     check_button() called every ms: the reference event sequence
+  poll_50ms   check_button() called every 50 ms, like a busy render loop
+  irq_50ms    ButtonEvents.poll() every 50 ms
+  irq_wake    ButtonEvents polled when main.button_task would wake: on an
+              edge or when pending_ms() runs out
+
+For each scheme the per-key event sequences are compared with ref_1ms
+(missed/extra events) and the detection latency is reported. The irq_*
+schemes must match exactly; any difference exits non-zero. On the board
+only the timing part runs (us per IRQ push and per poll).
+
+    python DIS/bench/bench_buttons.py [--calls N]
+"""
+import sys
+import benchlib
+from benchlib import ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "calls": 1000,
+}
+
+if not ON_DEVICE:
+    import dishost
+    from dishost import clock as clock_mod
+    dishost.install()
+
+from buttons import ButtonEvents
+from config import OLED_1inch3
+
+TICKS_PERIOD = 1 << 30
+POLL_MS = 50
+TAIL_MS = 4000      # time simulated after the last edge
+
+
+class _SimPin:
+    """
+    Active-low button with a machine.Pin-style irq(). Every handler
+    registered stays attached, so several decoders can share the pins.
+    """
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self):
+        self.level = 1
+        self.handlers = []
+
+    def value(self):
+        return self.level
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handlers.append(handler)
+
+    def set(self, level):
+        if level != self.level:
+            self.level = level
+            for handler in self.handlers:
+                handler(self)
+
+
+class _RefButtons:
+    """The button state check_button() keeps on the display driver."""
+    check_button = OLED_1inch3.check_button
+
+    def __init__(self, key0, key1, now):
+        self.key0 = key0
+        self.key1 = key1
+        self._debounce_ms = 150
+        self._longpress_ms = 3000
+        self._last_key0 = key0.value()
+        self._last_key1 = key1.value()
+        self._last_time_k0 = now
+        self._last_time_k1 = now
+        self._k1_press_start = None
+        self._k1_reset_fired = False
+
+
+def _tap(key, at, ms):
+    return [(at, key, 0), (at + ms, key, 1)]
+
+
+def _bounce(key, at, ms, n=3):
+    # n extra 1 ms open/close pairs at each end of the press
+    edges = []
+    for i in range(n):
+        edges += [(at + 2 * i, key, 0), (at + 2 * i + 1, key, 1)]
+    edges.append((at + 2 * n, key, 0))
+    for i in range(n):
+        edges += [(at + ms + 2 * i, key, 1), (at + ms + 2 * i + 1, key, 0)]
+    edges.append((at + ms + 2 * n, key, 1))
+    return edges
+
+
+SCENARIOS = (
+    ("taps", 0, _tap(0, 500, 120) + _tap(1, 900, 200) + _tap(0, 1500, 80) + _tap(1, 2000, 90)),
+    ("bounce", 0, _bounce(0, 500, 150) + _bounce(1, 1200, 300) + _bounce(1, 2500, 120)),
+    ("long_press", 0, _tap(1, 500, 3500) + _tap(0, 1500, 60) + _tap(1, 5000, 100)),
+    ("long_exact", 0, _tap(1, 500, 2999) + _tap(1, 4000, 3000) + _tap(1, 9000, 6000)),
+    ("close_taps", 0, _tap(1, 500, 40) + _tap(1, 600, 40) + _tap(1, 800, 40)
+        + _tap(0, 1500, 30) + _tap(0, 1600, 30) + _tap(0, 1800, 30)),
+    ("short_tap", 0, _tap(0, 510, 20) + _tap(1, 1010, 20) + _tap(0, 1777, 5)),
+    ("boot_press", 0, _tap(1, 50, 200) + _tap(1, 600, 100)),
+    ("wrap", TICKS_PERIOD - 2000, _tap(1, 500, 3200) + _tap(0, 1990, 40) + _tap(1, 4000, 80)),
+)
+
+SCHEMES = ("ref_1ms", "poll_50ms", "irq_50ms", "irq_wake")
+
+
+def _record(events, t, result):
+    screen_delta, toggle, reset, clear = result
+    for _ in range(screen_delta):
+        events[0].append(t)
+    if toggle:
+        events[1].append(("toggle", t))
+    if reset:
+        events[1].append(("reset", t))
+    if clear:
+        events[1].append(("clear", t))
+
+
+def simulate(start_ms, edges):
+    """Run one scenario; returns {scheme: ([key0 times], [(key1 event, time)])}."""
+    clock = clock_mod.Clock(speed=0, start_ms=start_ms)
+    clock_mod.set_clock(clock)
+    pins = (_SimPin(), _SimPin())
+    now = clock.ticks_ms()
+    ref = _RefButtons(pins[0], pins[1], now)
+    slow = _RefButtons(pins[0], pins[1], now)
+    polled = ButtonEvents(pins[0], pins[1])
+    woken = ButtonEvents(pins[0], pins[1])
+
+    out = {}
+    for name in SCHEMES:
+        out[name] = ([], [])
+    edges = sorted(edges)
+    end = edges[-1][0] + TAIL_MS
+    i = 0
+    for ms in range(end):
+        while i < len(edges) and edges[i][0] == ms:
+            pins[edges[i][1]].set(edges[i][2])
+            i += 1
+        _record(out["ref_1ms"], ms, ref.check_button())
+        while woken.pending_ms() == 0:
+            _record(out["irq_wake"], ms, woken.poll())
+        if ms % POLL_MS == POLL_MS - 1:
+            _record(out["poll_50ms"], ms, slow.check_button())
+            _record(out["irq_50ms"], ms, polled.poll())
+        clock.advance_us(1000)
+    return out
+
+
+def compare(ref, got):
+    """Missed and extra events against ref, and latencies of the matches."""
+    missed = extra = 0
+    lat = []
+    for key in (0, 1):
+        a = ref[key]
+        b = got[key]
+        if key:
+            kinds_a = [e[0] for e in a]
+            kinds_b = [e[0] for e in b]
+            same = kinds_a == kinds_b
+            times_a = [e[1] for e in a]
+            times_b = [e[1] for e in b]
+        else:
+            same = len(a) == len(b)
+            times_a = a
+            times_b = b
+        if same:
+            lat += [tb - ta for ta, tb in zip(times_a, times_b)]
+        else:
+            missed += max(0, len(a) - len(b))
+            extra += max(0, len(b) - len(a))
+            if len(a) == len(b):
+                missed += 1     # same count, different events
+    return missed, extra, lat
+
+
+def run_differential():
+    failures = 0
+    totals = {}
+    for name in SCHEMES[1:]:
+        totals[name] = [0, 0, 0, 0]     # missed, extra, max latency, latency sum
+    n_events = 0
+    for name, start_ms, edges in SCENARIOS:
+        out = simulate(start_ms, edges)
+        ref = out["ref_1ms"]
+        n_events += len(ref[0]) + len(ref[1])
+        row = {"events": len(ref[0]) + len(ref[1])}
+        for scheme in SCHEMES[1:]:
+            missed, extra, lat = compare(ref, out[scheme])
+            t = totals[scheme]
+            t[0] += missed
+            t[1] += extra
+            if lat:
+                t[2] = max(t[2], max(lat))
+                t[3] += sum(lat)
+            row[scheme] = "%d missed, %d extra" % (missed, extra)
+            if scheme != "poll_50ms" and (missed or extra):
+                failures += 1
+        report("buttons_" + name, **row)
+    for scheme in SCHEMES[1:]:
+        t = totals[scheme]
+        report("buttons_total_" + scheme, events=n_events, missed=t[0], extra=t[1],
+               max_latency_ms=t[2], mean_latency_ms=t[3] / max(1, n_events - t[0]))
+    return failures
+
+
+def run_timing(opts):
+    calls = opts["calls"]
+    pins = (_SimPin(), _SimPin())
+    size = 2
+    while size <= 2 * calls:    # a power of two holding every edge
+        size <<= 1
+    ev = ButtonEvents(pins[0], pins[1], size=size)
+    t0 = ticks_us()
+    for _ in range(calls):
+        pins[0].set(0)
+        pins[0].set(1)
+    push_us = ticks_diff(ticks_us(), t0) / (2 * calls)
+    t0 = ticks_us()
+    ev.poll()
+    drain_us = ticks_diff(ticks_us(), t0) / (2 * calls)
+    t0 = ticks_us()
+    for _ in range(calls):
+        ev.poll()
+    idle_us = ticks_diff(ticks_us(), t0) / calls
+    report("buttons_timing", us_per_irq=push_us, us_per_edge_decoded=drain_us,
+           us_per_idle_poll=idle_us, overruns=ev.overruns)
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    failures = 0 if ON_DEVICE else run_differential()
+    run_timing(opts)
+    if failures:
+        sys.exit(1)
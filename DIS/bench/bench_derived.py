@@ -0,0 +1,179 @@
+"""
+Derived-values benchmark: accuracy and cost of the fixed-point race math
+(derived.DerivedValues) against a high-precision reference, with the old
+float pipeline from main.py alongside for comparison.
+
+A synthetic race (rpm changing every 250 ms, derive passes every ~50 ms
+with jitter, ticks starting just before the 2**30 wrap) is run through:
+
+  fixed    DerivedValues, integer units
+  legacy   the previous float code: ms ticks, distance += mph * dt / 3600
+           (rounded to float32 on the host, like rp2 MicroPython floats)
+  ref      exact rational arithmetic (fractions.Fraction) on the host,
+           plain floats on the board
+
+and the distance, elapsed time and target speed errors are reported.
+
+    python DIS/bench/bench_derived.py [--seconds N] [--alloc-steps N]
+"""
+import sys
+import benchlib
+from benchlib import AllocMeter, ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "seconds": 600 if ON_DEVICE else 3600,
+    "alloc_steps": 500,
+    "wheel_in": 16,
+    "goal_mi": 40,
+    "goal_min": 60,
+}
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+import math
+from array import array
+from derived import DerivedValues
+
+TICKS_PERIOD = 1 << 30
+START_US = TICKS_PERIOD - 5000000      # wrap five seconds into the race
+
+try:
+    from fractions import Fraction
+except ImportError:     # MicroPython
+    Fraction = float
+
+if ON_DEVICE:
+    def f32(x):
+        return x        # the board's floats are the thing being measured
+else:
+    _f = array("f", [0.0])
+
+    def f32(x):
+        _f[0] = x
+        return _f[0]
+
+
+class _Rand:
+    def __init__(self, seed=4242):
+        self.state = seed
+
+    def below(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return self.state % n
+
+
+def race_steps(seconds):
+    """Yield (t_us, rpm) per derive pass; rpm is the sample seen at that pass."""
+    rnd = _Rand()
+    t = 0
+    rpm = 0
+    next_sample = 0
+    end = seconds * 1000000
+    while t < end:
+        if t >= next_sample:
+            rpm = max(0, min(800, rpm + rnd.below(41) - 15))
+            next_sample += 250000
+        yield t, rpm
+        t += 50000 + rnd.below(3000)
+
+
+def run(opts):
+    wheel = opts["wheel_in"]
+    goal_mi = opts["goal_mi"]
+    goal_s = opts["goal_min"] * 60
+    circ = math.pi * wheel
+    circ_ref = Fraction(circ)           # the same circumference, exactly
+    mph_per_rpm = circ * 60 / 63360.0
+
+    fixed = DerivedValues(wheel, goal_mi, goal_s, now_us=START_US)
+    fixed.start(START_US)
+
+    legacy_dist = 0.0
+    legacy_last_ms = START_US // 1000
+    ref_fwd = Fraction(0)       # rpm held from the start of each interval
+    ref_bwd = Fraction(0)       # rpm of the end of the interval, like legacy
+    prev_t = 0
+    prev_rpm = 0
+
+    max_dist_err = 0.0
+    max_legacy_err = 0.0
+    max_target_err = 0.0
+    steps = 0
+    t0 = ticks_us()
+    for t, rpm in race_steps(opts["seconds"]):
+        now_us = (START_US + t) % TICKS_PERIOD
+        fixed.update(now_us, rpm, 480, 3000)
+
+        # Previous float pipeline
+        now_ms = (START_US + t) // 1000 % TICKS_PERIOD
+        d_ms = (now_ms - legacy_last_ms) % TICKS_PERIOD
+        legacy_last_ms = now_ms
+        mph = f32(rpm * f32(mph_per_rpm))
+        legacy_dist = f32(legacy_dist + f32(mph * f32(d_ms / 1000) / 3600))
+
+        # Exact references
+        dt = t - prev_t
+        ref_fwd += Fraction(prev_rpm * dt) * circ_ref / (60000000 * 63360)
+        ref_bwd += Fraction(rpm * dt) * circ_ref / (60000000 * 63360)
+        prev_t = t
+        prev_rpm = rpm
+
+        if steps % 64 == 0:
+            err = abs(fixed.distance_umi / 1000000 - float(ref_fwd))
+            if err > max_dist_err:
+                max_dist_err = err
+            err = abs(legacy_dist - float(ref_bwd))
+            if err > max_legacy_err:
+                max_legacy_err = err
+            rem_mi = max(goal_mi - float(ref_fwd), 0)
+            rem_s = max(goal_s - t / 1000000, 0.001)
+            target = min(rem_mi / (rem_s / 3600), 999.999) * 1000
+            if target >= 1000:
+                # Relative, since 1 ms of remaining time matters a lot at the end.
+                err = abs(fixed.target_mmph - target) / target
+                if err > max_target_err:
+                    max_target_err = err
+        steps += 1
+    wall_us = ticks_diff(ticks_us(), t0)
+
+    ref_mi = float(ref_fwd)
+    report("derived_accuracy",
+           race_s=opts["seconds"],
+           steps=steps,
+           ref_mi=ref_mi,
+           fixed_err_umi=fixed.distance_umi - ref_mi * 1000000,
+           fixed_max_err_umi=max_dist_err * 1000000,
+           legacy_err_umi=(legacy_dist - float(ref_bwd)) * 1000000,
+           legacy_max_err_umi=max_legacy_err * 1000000,
+           elapsed_err_ms=fixed.elapsed_ms - prev_t // 1000,
+           target_max_err_ppm=max_target_err * 1000000,
+           us_per_step=wall_us / max(steps, 1))
+
+
+def run_alloc(opts):
+    """Heap bytes per DerivedValues.update(), after warm-up."""
+    fixed = DerivedValues(opts["wheel_in"], opts["goal_mi"], opts["goal_min"] * 60, now_us=START_US)
+    fixed.start(START_US)
+    n = opts["alloc_steps"]
+    now = START_US
+    for i in range(50):
+        now = (now + 50000) % TICKS_PERIOD
+        fixed.update(now, 300 + i, 480, 3000)
+    meter = AllocMeter()
+    meter.start()
+    t0 = ticks_us()
+    for i in range(n):
+        now = (now + 50000) % TICKS_PERIOD
+        fixed.update(now, 300 + (i & 63), 480, 3000)
+    dt = ticks_diff(ticks_us(), t0)
+    meter.stop()
+    report("derived_update", steps=n, us_per_update=dt / n,
+           alloc_bytes_per_update=meter.bytes / n)
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    run(opts)
+    run_alloc(opts)
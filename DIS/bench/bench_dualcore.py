@@ -0,0 +1,191 @@
+"""
+Dual-core benchmark: the seqlock in racestate.RaceState under real
+threads, and render/integration throughput on one core and on two.
+
+  torn      a writer thread publishes states whose fields all hold the
+            same counter while the main thread copies them. Every copy is
+            checked field by field; copy_into() must never return a mix of
+            two writes. The same reads without the sequence check are
+            counted too, to show the test does catch torn copies.
+  throughput  the UART parse + race math + publish step (as main.integrate()
+            does it) and a render of the speed screen, either alternating
+            on one thread (single) or with the step on a Core1Loop thread
+            (dual): frames and integration passes per second and the
+            longest gap between two integration passes.
+
+On CPython the "cores" are threads sharing the GIL, with the switch
+interval turned right down so the writer is interrupted mid-publish; the
+dual-core throughput only means something on the board.
+
+    python DIS/bench/bench_dualcore.py [--reads N] [--seconds N]
+"""
+import sys
+import benchlib
+from benchlib import FeedUart, ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "reads": 20000 if ON_DEVICE else 200000,
+    "seconds": 3,
+}
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+from array import array
+import _thread
+import utime as time
+import config
+from dualcore import Core1Loop
+from racestate import (RaceState, RS_SEQ, RS_SAMPLES, RS_MMPH, RS_DISTANCE_UMI, RS_TARGET_MMPH,
+                       RS_PUBLISHED, RS_FIELDS, TIMER_RUNNING)
+from display import DisplayManager
+from derived import DerivedValues
+from uart_manager import UartManager
+from uartrx import SampleQueue
+from dishost.telemetry import encode_frame
+
+
+# ---------------- Torn reads ----------------
+
+def run_torn(opts):
+    snap = RaceState()
+    stop = array("i", [0])
+    writes = array("i", [0])
+    done = _thread.allocate_lock()
+    done.acquire()
+
+    def writer():
+        d = snap.data
+        k = 0
+        while not stop[0]:
+            k = (k + 1) & 0xFFFFFF
+            snap.begin()
+            for i in range(1, RS_PUBLISHED):
+                d[i] = k
+            snap.end()
+            writes[0] += 1
+            if not k & 127:
+                time.sleep_us(50)   # let the reader see a few thousand snapshots
+        done.release()
+
+    _thread.start_new_thread(writer, ())
+    dst = RaceState()
+    raw = array("i", [0] * RS_FIELDS)
+    torn = 0
+    raw_torn = 0
+    changes = 0
+    last = -1
+    t0 = ticks_us()
+    for _ in range(opts["reads"]):
+        snap.copy_into(dst)
+        d = dst.data
+        v = d[1]
+        for i in range(2, RS_PUBLISHED):
+            if d[i] != v:
+                torn += 1
+                break
+        if d[RS_SEQ] & 1:
+            torn += 1
+        if v != last:
+            changes += 1
+            last = v
+        raw[:] = snap.data      # no sequence check
+        v = raw[1]
+        for i in range(2, RS_PUBLISHED):
+            if raw[i] != v:
+                raw_torn += 1
+                break
+    dt = ticks_diff(ticks_us(), t0)
+    stop[0] = 1
+    done.acquire()
+    report("dualcore_torn", reads=opts["reads"], writes=writes[0], distinct_snapshots=changes,
+           torn=torn, retries=snap.retries, unchecked_torn=raw_torn,
+           us_per_read=dt / opts["reads"])
+    return torn
+
+
+# ---------------- Throughput ----------------
+
+class _Pipeline:
+    """UART parse, race math and state publish: core 1's share of main.py."""
+    def __init__(self):
+        # One frame per pass, as from a controller that sends faster than
+        # the integration runs
+        self.uart = FeedUart(encode_frame(1, 0, 480, 3000, 350, 50, 60, 0))
+        self.samples = SampleQueue()
+        self.mgr = UartManager(self.uart, byte_us=config.UART_BYTE_US, samples=self.samples)
+        self.race = DerivedValues(16, 1, 240)
+        self.race.start(time.ticks_us())
+        self.snap = RaceState()
+        self.gap_max = 0
+        self.last = None
+        self.passes = 0
+
+    def step(self, now_us):
+        self.uart.rewind()
+        self.mgr.update()
+        q = self.samples
+        race = self.race
+        i = q.pop()
+        while i >= 0:
+            race.update(q.t_us[i], q.rpm[i], q.voltage_dv[i], q.current_ma[i])
+            i = q.pop()
+        now = time.ticks_us()
+        race.update(now, self.mgr.rpm, self.mgr.voltage_dv, self.mgr.current_ma)
+        s = self.snap
+        s.begin()
+        s.data[RS_SAMPLES] = self.mgr.frames_received
+        s.data[RS_MMPH] = race.mmph
+        s.data[RS_DISTANCE_UMI] = race.distance_umi
+        s.data[RS_TARGET_MMPH] = race.target_mmph
+        s.end()
+        if self.last is not None:
+            gap = ticks_diff(now, self.last)
+            if gap > self.gap_max:
+                self.gap_max = gap
+        self.last = now
+        self.passes += 1
+
+
+def run_throughput(opts, display, dual):
+    p = _Pipeline()
+    state = RaceState()
+    core1 = None
+    if dual:
+        core1 = Core1Loop(p.step, 1)
+        if not core1.start():
+            report("dualcore_throughput_dual", error="no second core/thread")
+            return
+    frames = 0
+    end_us = opts["seconds"] * 1000000
+    t0 = ticks_us()
+    while ticks_diff(ticks_us(), t0) < end_us:
+        if not dual:
+            p.step(ticks_us())
+        p.snap.copy_into(state)
+        # A new value every frame, so each one costs a full draw
+        key = display.milli_key(state.data[RS_MMPH] + frames * 137 % 20000)
+        display.draw_large_key(key, "MPH", frames & 1, TIMER_RUNNING)
+        frames += 1
+    dt = ticks_diff(ticks_us(), t0)
+    if core1:
+        core1.stop()
+    report("dualcore_throughput_" + ("dual" if dual else "single"),
+           frames_per_s=frames * 1e6 / dt, integrations_per_s=p.passes * 1e6 / dt,
+           samples_per_s=p.mgr.frames_received * 1e6 / dt,
+           max_integration_gap_ms=p.gap_max / 1000, state_retries=p.snap.retries)
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    if not ON_DEVICE:
+        sys.setswitchinterval(1e-6)
+    failures = run_torn(opts)
+    if not ON_DEVICE:
+        sys.setswitchinterval(0.005)
+    display = DisplayManager(config.OLED_1inch3(threaded=False))
+    run_throughput(opts, display, False)
+    run_throughput(opts, display, True)
+    if failures:
+        sys.exit(1)
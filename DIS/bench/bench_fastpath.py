@@ -0,0 +1,223 @@
+"""
+fastpath benchmark: the selected implementation (viper on the board) against
+the pure-Python versions, for correctness and speed.
+
+  differential  runs both versions on the same inputs and compares results:
+                sync_page() return values and shadow buffers, framebuffers
+                after drawing every glyph of every .fnt font at clipped and
+                unclipped positions (also against framebuf.blit() of the
+                font_to_py glyph), and every value and counter UartManager
+                parses from a mixed ASCII/binary/noise stream cut into
+                random chunks. Any mismatch is reported and exits non-zero.
+  timing        us per call of each routine, *_ref for the Python version
+                and *_<IMPL> for the selected one
+
+On CPython both sides are the Python versions, so the comparison only
+exercises the harness; run it on the board for the viper results. The host
+checks, with fastpath_viper's source run against independent references,
+are DIS/host/tests/test_fastpath.py.
+
+    python DIS/bench/bench_fastpath.py [--calls N] [--samples N]
+"""
+import sys
+import benchlib
+from benchlib import ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "calls": 200 if ON_DEVICE else 100,
+    "samples": 300 if ON_DEVICE else 1000,
+}
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+from array import array
+import framebuf
+import fastpath
+from binfont import BinFont, font_path
+from uart_manager import UartManager
+from dishost.telemetry import encode_frame, encode_line
+
+W = 128
+H = 64
+STRIDE = W // 8
+FONTS = ("font_digits_large", "font_digits_med", "font_letters_large")
+
+
+class _Rand:
+    def __init__(self, seed=777):
+        self.state = seed
+
+    def below(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return self.state % n
+
+
+# ---------------- Differential checks ----------------
+
+def check_sync_page(rnd):
+    bad = 0
+    size = W * H // 8
+    for trial in range(64):
+        buf = bytearray(rnd.below(256) for _ in range(size))
+        base = bytearray(buf)
+        # Change a few bytes (or none) in the shadow copies
+        for _ in range(trial % 4):
+            base[rnd.below(size)] ^= 1 << rnd.below(8)
+        shadows = (bytearray(base), bytearray(base))
+        for page in range(H):
+            start = page * STRIDE
+            a = fastpath.sync_page(buf, shadows[0], start, STRIDE)
+            b = fastpath.py_sync_page(buf, shadows[1], start, STRIDE)
+            if a != b:
+                bad += 1
+        if shadows[0] != shadows[1] or shadows[0] != buf:
+            bad += 1
+    return bad
+
+
+def check_blit(rnd):
+    bad = 0
+    frames = 0
+    for name in FONTS:
+        module = __import__("fonts." + name, None, None, (name,))
+        fast = BinFont(font_path(name))
+        slow = BinFont(font_path(name))
+        slow._blit_rows = fastpath.py_blit_rows
+        chars = [chr(c) for c in range(module.min_ch(), module.max_ch() + 1)] + ["~"]
+        ht = module.height()
+        for ch in chars:
+            data, gh, gw = module.get_ch(ch)
+            glyph = framebuf.FrameBuffer(bytearray(data), gw, gh, framebuf.MONO_HLSB)
+            for _ in range(12):
+                x = rnd.below(W + 2 * gw) - gw
+                y = rnd.below(H + ht) - ht // 2
+                bg = rnd.below(256)
+                ref = bytearray([bg]) * (W * H // 8)
+                framebuf.FrameBuffer(ref, W, H, framebuf.MONO_HMSB).blit(glyph, x, y, -1)
+                a = bytearray([bg]) * (W * H // 8)
+                b = bytearray([bg]) * (W * H // 8)
+                fast.blit_hmsb(ch, a, STRIDE, H, x, y)
+                slow.blit_hmsb(ch, b, STRIDE, H, x, y)
+                frames += 1
+                if a != b or a != ref:
+                    bad += 1
+        fast.close()
+        slow.close()
+    return frames, bad
+
+
+FIELDS = ("voltage_dv", "current_ma", "rpm", "duty", "throttle", "eco", "new_data",
+          "lines_parsed", "parse_errors", "samples_coalesced", "binary_link",
+          "controller_tick_ms", "frames_received", "frames_dropped", "crc_errors")
+
+
+def make_stream(rnd, samples):
+    out = bytearray()
+    for i in range(samples):
+        values = (480 + i % 20, (i * 37) % 15000 - 2000, i % 600, i % 101, (i * 3) % 101, i % 2)
+        kind = rnd.below(8)
+        if kind < 4:
+            out += encode_frame(i & 0xFF, i * 250, *values)
+        elif kind < 7:
+            out += encode_line(*values)
+        else:
+            # Noise: overlong lines, stray zeros, bad frames. No 's', so a
+            # noise line is never reported as a malformed legacy line.
+            for _ in range(rnd.below(70)):
+                b = rnd.below(256)
+                out.append(b if b != 115 else 116)
+    return bytes(out)
+
+
+def check_scan(rnd, samples):
+    stream = make_stream(rnd, samples)
+    fast = UartManager(None)
+    slow = UartManager(None)
+    slow._scan_line = fastpath.py_scan_line
+    buf = bytearray(64)
+    pos = 0
+    bad = 0
+    chunks = 0
+    while pos < len(stream):
+        n = min(1 + rnd.below(64), len(stream) - pos)
+        buf[:n] = stream[pos:pos + n]
+        pos += n
+        fast.ingest(buf, n)
+        slow.ingest(buf, n)
+        chunks += 1
+        for f in FIELDS:
+            if getattr(fast, f) != getattr(slow, f):
+                bad += 1
+                break
+        fast.new_data = slow.new_data = False
+    return chunks, fast.lines_parsed + fast.frames_received, bad
+
+
+def run_differential(opts):
+    rnd = _Rand()
+    bad_sync = check_sync_page(rnd)
+    frames, bad_blit = check_blit(rnd)
+    chunks, parsed, bad_scan = check_scan(rnd, opts["samples"])
+    report("fastpath_differential", impl=fastpath.IMPL, sync_mismatches=bad_sync,
+           blit_frames=frames, blit_mismatches=bad_blit, scan_chunks=chunks,
+           scan_samples=parsed, scan_mismatches=bad_scan)
+    return bad_sync + bad_blit + bad_scan
+
+
+# ---------------- Timing ----------------
+
+def _time(fn, args, calls):
+    t0 = ticks_us()
+    for _ in range(calls):
+        fn(*args)
+    return ticks_diff(ticks_us(), t0) / calls
+
+
+def run_timing(opts):
+    calls = opts["calls"]
+    buf = bytearray(W * H // 8)
+    shadow = bytearray(buf)
+    for name, fn in (("ref", fastpath.py_sync_page), (fastpath.IMPL, fastpath.sync_page)):
+        us = _time(fn, (buf, shadow, 0, STRIDE), calls)
+        report("fastpath_sync_page_" + name, us_per_page=us, us_per_frame=us * H)
+
+    p = array("i", [0] * fastpath.BLIT_PARAMS)     # a 40x48 glyph at x & 7 == 1
+    p[fastpath.BLIT_STRIDE] = STRIDE
+    p[fastpath.BLIT_NB] = 6
+    p[fastpath.BLIT_DST] = 1
+    p[fastpath.BLIT_SRC] = 0
+    p[fastpath.BLIT_ROWS] = 48
+    p[fastpath.BLIT_LO] = 1
+    p[fastpath.BLIT_HI] = 5
+    p[fastpath.BLIT_M_FIRST] = 0xFE
+    p[fastpath.BLIT_M_LAST] = 0x3F
+    rows = bytearray(6 * 48)
+    for name, fn in (("ref", fastpath.py_blit_rows), (fastpath.IMPL, fastpath.blit_rows)):
+        us = _time(fn, (buf, rows, p), calls)
+        report("fastpath_blit_rows_" + name, us_per_glyph=us)
+
+    line = encode_line(480, 3000, 300, 50, 60, 1)
+    data = (line * (64 // len(line) + 1))[:64]
+    st = array("i", [0] * fastpath.SCAN_STATE)
+    out = bytearray(48)
+    for name, fn in (("ref", fastpath.py_scan_line), (fastpath.IMPL, fastpath.scan_line)):
+        t0 = ticks_us()
+        for _ in range(calls):
+            st[fastpath.SCAN_POS] = 0
+            st[fastpath.SCAN_END] = len(data)
+            st[fastpath.SCAN_MAX] = len(out)
+            while fn(data, out, st) >= 0:
+                st[fastpath.SCAN_LEN] = 0
+                st[fastpath.SCAN_ASCII] = 1
+        us = ticks_diff(ticks_us(), t0) / calls
+        report("fastpath_scan_line_" + name, us_per_64_bytes=us)
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    failures = run_differential(opts)
+    run_timing(opts)
+    if failures:
+        sys.exit(1)
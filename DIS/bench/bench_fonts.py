@@ -0,0 +1,164 @@
+"""
+Font benchmark: font_to_py modules (GlyphCache + framebuf.blit) against the
+precompiled .fnt files (binfont.BinFont, row copies into the MONO_HMSB
+buffer).
+
+  exact   draws the same screens with both font sources on two displays and
+          compares the framebuffers after every call; any mismatch (or a
+          missing .fnt file) exits non-zero
+  blit    time per glyph for each font at the slot positions the dash uses
+  ram     heap taken by loading each font, and by its glyph cache once
+          every character has been drawn at every slot
+
+Build the .fnt files first with python -m dishost.fontpack (on the board,
+copy fonts/*.fnt along with the modules).
+
+    python DIS/bench/bench_fonts.py [--frames N] [--blits N]
+
+On CPython framebuf.blit() is the pure-Python stand-in, so the module times
+are far worse than the board's C blit; compare blit times on the board. Host
+load bytes also include CPython's file buffer.
+"""
+import sys
+import gc
+import benchlib
+from benchlib import AllocMeter, ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "frames": 300 if ON_DEVICE else 150,
+    "blits": 200 if ON_DEVICE else 40,
+}
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+import config
+import display as display_mod
+from display import DisplayManager
+from binfont import BinFont, font_path
+from writer import Writer
+from racestate import TIMER_RUNNING, TIMER_PAUSED
+
+FONTS = ("font_digits_large", "font_digits_med", "font_letters_large")
+# x positions the dash draws each font at (DisplayManager slot layouts)
+SLOTS = {
+    "font_digits_large": ((9, 0), (43, 0), (79, 0), (93, 0), (0, 0), (14, 0), (53, 0), (91, 0)),
+    "font_digits_med": ((-4, 5), (26, 5), (56, 5), (-2, -2), (56, 5), (86, 5)),
+    "font_letters_large": ((10, 0), (30, 0), (50, 0), (10, 24), (30, 24), (50, 24)),
+}
+
+
+def _display(font_files):
+    display_mod.FONT_FILES = font_files
+    try:
+        d = DisplayManager(config.OLED_1inch3())
+        # Writers load their font on first use; load them under this setting
+        d.w_digits_large, d.w_digits_med, d.w_letters_big
+        return d
+    finally:
+        display_mod.FONT_FILES = True
+
+
+def _module(name):
+    return __import__("fonts." + name, None, None, (name,))
+
+
+def run_exact(opts):
+    ref = _display(False)
+    new = _display(True)
+    if not hasattr(new.w_digits_large.font, "blit_hmsb"):
+        print("no .fnt files found; run python -m dishost.fontpack first")
+        return 1
+    alerts = (("TIMER", "RESET"), ("LOW", "BATT"), ("ABCDEFGH", "XYZ"), ("GO", None))
+    calls = (
+        lambda d, i: d.draw_large_num((i * 0.37) % 99.9, "MPH", i & 4, TIMER_RUNNING,
+                                      invert=(i // 30) & 1 == 1, eco=i & 8),
+        lambda d, i: d.draw_time(i * 7.3, "ELAPSED", i & 4, TIMER_PAUSED),
+        lambda d, i: d.draw_demo_distance(i * 0.0031),
+        lambda d, i: d.draw_alert(*alerts[i % len(alerts)]),
+    )
+    frames = 0
+    mismatches = 0
+    for call in calls:
+        for d in (ref, new):
+            d.screen_changed()
+        for i in range(opts["frames"]):
+            for d in (ref, new):
+                call(d, i)
+            frames += 1
+            if ref.oled.buffer != new.oled.buffer:
+                mismatches += 1
+    report("fonts_exact", frames=frames, mismatches=mismatches)
+    return mismatches
+
+
+def run_blit(opts):
+    n = opts["blits"]
+    oled = config.OLED_1inch3()
+    for name in FONTS:
+        slots = SLOTS[name]
+        module = _module(name)
+        chars = "0123456789" if name != "font_letters_large" else "TIMERSAB"
+        timings = {}
+        for label, font in (("module", module), ("fnt", BinFont(font_path(name)))):
+            w = Writer(oled, font, verbose=False)
+            for c in chars:         # warm the caches
+                for x, y in slots:
+                    w.set_textpos(x, y)
+                    w.printstring(c)
+            t0 = ticks_us()
+            count = 0
+            for i in range(n):
+                c = chars[i % len(chars)]
+                for x, y in slots:
+                    w.set_textpos(x, y)
+                    w.printstring(c)
+                    count += 1
+            timings[label] = ticks_diff(ticks_us(), t0) / count
+        report("fonts_blit_" + name, module_us=timings["module"], fnt_us=timings["fnt"],
+               speedup=timings["module"] / timings["fnt"] if timings["fnt"] else 0.0)
+
+
+def run_ram(opts):
+    oled = config.OLED_1inch3()
+    for name in FONTS:
+        full = "fonts." + name
+        sys.modules.pop(full, None)
+        gc.collect()
+        meter = AllocMeter()
+        meter.start()
+        module = _module(name)
+        meter.stop()
+        module_bytes = meter.bytes
+
+        meter.start()
+        font = BinFont(font_path(name))
+        meter.stop()
+        fnt_bytes = meter.bytes
+
+        # Glyph caches after drawing every character at every slot
+        chars = "".join(chr(c) for c in range(module.min_ch(), module.max_ch() + 1))
+        caches = []
+        for f in (module, font):
+            w = Writer(oled, f, verbose=False, cache_bytes=1 << 20)
+            if f is font:
+                font.max_bytes = 1 << 20
+            for c in chars:
+                for x, y in SLOTS[name]:
+                    w.set_textpos(x, y)
+                    w.printstring(c)
+            caches.append(w.cache_stats()["bytes"])
+        # The unbounded .fnt cache keeps a copy per phase; the dash caps it
+        report("fonts_ram_" + name, module_load_bytes=module_bytes, fnt_load_bytes=fnt_bytes,
+               module_cache_bytes=caches[0], fnt_cache_bytes=caches[1],
+               fnt_budget_bytes=display_mod.FNT_CACHE_BYTES[name])
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    failures = run_exact(opts)
+    run_blit(opts)
+    run_ram(opts)
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,202 @@
+"""
+Rendering benchmark for DisplayManager and Writer.
+
+Drives every DisplayManager entry point and the Writer text paths over
+realistic value sequences and reports, per case, the call latency
+distribution, heap bytes allocated per call and SPI bytes per call.
+
+    python DIS/bench/bench_render.py [--calls N] [--save FILE] [--compare FILE] [--threshold X]
+
+On CPython the hardware comes from dishost, so latencies include the
+pure-Python framebuf stand-in and are only comparable between host runs.
+On the board (copy this folder's .py files next to the DIS/device modules)
+the numbers are the real ones; pass arguments by editing DEFAULTS.
+"""
+import sys
+import benchlib
+from benchlib import AllocMeter, CountingSPI, Latency, ON_DEVICE, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "calls": 200 if ON_DEVICE else 120,
+    "alloc_calls": 50 if ON_DEVICE else 20,
+    "save": None,
+    "compare": None,
+    # Host timings share the machine with everything else; be more lenient.
+    "threshold": 0.2 if ON_DEVICE else 0.5,
+}
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+import config
+from display import DisplayManager
+from screens import ScreenRegistry
+from racestate import TIMER_RESET, TIMER_RUNNING, TIMER_PAUSED
+
+
+class _Rand:
+    """Deterministic LCG so host and board see the same sequences."""
+    def __init__(self, seed=12345):
+        self.state = seed
+
+    def uniform(self, lo, hi):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return lo + (hi - lo) * self.state / 0x7FFFFFFF
+
+
+def speed_sequence(n, start=12.0, repeat=5):
+    """
+    Speeds as the loop sees them: telemetry arrives at 4 Hz while the loop
+    draws ~20 times a second, so every value repeats `repeat` times.
+    """
+    rnd = _Rand()
+    out = []
+    v = start
+    while len(out) < n:
+        v = min(99.9, max(0.0, v + rnd.uniform(-0.6, 0.6)))
+        for _ in range(repeat):
+            out.append(v)
+    return out[:n]
+
+
+def build_cases(display, n):
+    oled = display.oled
+    speeds = speed_sequence(n)
+    amps = speed_sequence(n, start=4.0)
+    w_large = display.w_digits_large
+    w_letters = display.w_letters_big
+    states = (TIMER_RUNNING, TIMER_PAUSED, TIMER_RESET)
+
+    def reset_screen():
+        display.screen_changed()
+
+    def large_plain(i):
+        display.draw_large_num(speeds[i], "MPH", (i // 5) & 1, TIMER_RUNNING)
+
+    def large_invert_eco(i):
+        v = speeds[i]
+        display.draw_large_num(v, "MPH", (i // 5) & 1, TIMER_RUNNING,
+                               invert=v < 12.0, eco=(i // 40) & 1 == 1)
+
+    def large_amps(i):
+        display.draw_large_num(amps[i], "AMPS", (i // 5) & 1, TIMER_PAUSED)
+
+    def draw_time(i):
+        display.draw_time(i * 0.05, "ELAPSED", (i // 5) & 1, TIMER_RUNNING)
+
+    def demo_distance(i):
+        display.draw_demo_distance(i * 0.0004)
+
+    def alert(i):
+        display.draw_alert("TIMER", "RESET")
+
+    def alert_start():
+        display.screen_changed()
+        display.show_alert("TIMER", "RESET", 3600)
+
+    def alert_held(i):
+        display.update_alert()      # flushes once, then only checks the time
+
+    def status(i):
+        display.draw_status((i // 5) & 1, states[(i // 20) % 3])
+        oled.show()
+
+    # Screen switches: every call shows the next of three screens, either
+    # redrawn from scratch (label included) or through a ScreenRegistry,
+    # which restores the pre-rendered static layer with one copy.
+    def switch_redraw(i):
+        display.screen_changed()
+        k = i % 3
+        if k == 0:
+            display.draw_large_num(speeds[i], "MPH", 0, TIMER_RUNNING)
+        elif k == 1:
+            display.draw_time(i * 0.05, "ELAPSED", 0, TIMER_RUNNING)
+        else:
+            display.draw_demo_distance(i * 0.0004)
+
+    registry = ScreenRegistry(display)
+    registry.add(lambda s, i, now: display.paint_large_key(display.num_key(speeds[i]), 0,
+                                                           TIMER_RUNNING) or True,
+                 "MPH", display.large_regions)
+    registry.add(lambda s, i, now: display.paint_time(i * 0.05, 0, TIMER_RUNNING) or True,
+                 "ELAPSED", display.time_regions)
+    registry.add(lambda s, i, now: display.paint_distance_key(display.distance_key(i * 0.0004))
+                 or True, "MILES", display.distance_regions)
+
+    def switch_registry(i):
+        registry.draw(i % 3, i, 0)
+
+    def writer_print(i):
+        w_large.set_textpos(9, 0)
+        w_large.printstring("12.3")
+
+    def writer_stringlen(i):
+        w_letters.stringlen("TIMER")
+        w_letters.stringlen("RESET")
+
+    return (
+        ("large_num", reset_screen, large_plain),
+        ("large_num_invert_eco", reset_screen, large_invert_eco),
+        ("large_num_amps", reset_screen, large_amps),
+        ("time", reset_screen, draw_time),
+        ("demo_distance", reset_screen, demo_distance),
+        ("alert", reset_screen, alert),
+        ("alert_held", alert_start, alert_held),
+        ("status", reset_screen, status),
+        ("switch_redraw", reset_screen, switch_redraw),
+        ("switch_registry", reset_screen, switch_registry),
+        ("writer_printstring", reset_screen, writer_print),
+        ("writer_stringlen", reset_screen, writer_stringlen),
+    )
+
+
+def run_case(spi, prepare, call, calls, alloc_calls):
+    prepare()
+    call(0)     # first frame after a screen change is not steady state
+    lat = Latency(calls)
+    spi.reset()
+    for i in range(calls):
+        t0 = ticks_us()
+        call(i)
+        lat.add(ticks_diff(ticks_us(), t0))
+    result = lat.summary()
+    result["spi_bytes"] = spi.bytes / calls
+    result["spi_transactions"] = spi.transactions / calls
+
+    meter = AllocMeter()
+    meter.start()
+    for i in range(alloc_calls):
+        call(i)
+    meter.stop()
+    result["alloc_bytes"] = meter.bytes / alloc_calls
+    return result
+
+
+def run(opts):
+    oled = config.OLED_1inch3()
+    spi = CountingSPI(oled.spi)
+    oled.spi = spi
+    display = DisplayManager(oled)
+
+    results = {}
+    for name, prepare, call in build_cases(display, opts["calls"]):
+        r = run_case(spi, prepare, call, opts["calls"], opts["alloc_calls"])
+        results[name] = r
+        benchlib.report(name, p50_us=r["p50_us"], p99_us=r["p99_us"], max_us=r["max_us"],
+                        alloc_bytes=float(r["alloc_bytes"]), spi_bytes=float(r["spi_bytes"]))
+
+    platform = sys.implementation.name
+    if opts["compare"]:
+        baseline = benchlib.load_json(opts["compare"])
+        if baseline.get("platform") != platform:
+            print("warning: baseline was recorded on", baseline.get("platform"))
+        if benchlib.compare(baseline["cases"], results, opts["threshold"]):
+            sys.exit(1)
+    if opts["save"]:
+        benchlib.save_json(opts["save"], {"platform": platform, "cases": results})
+    return results
+
+
+if __name__ == "__main__":
+    run(benchlib.parse_args(sys.argv, DEFAULTS))
@@ -0,0 +1,187 @@
+"""
+SPI transfer benchmark: OLED_1inch3's frame flush as it was (three
+single-byte command transactions and a sliced data write per page) against
+the batched path (one CS-low transaction per frame, preallocated address
+command, memoryview page data), with and without bulk_write runs.
+
+  legacy   the previous _flush(), reproduced here
+  batched  _flush() with bulk_write off (the default)
+  bulk     _flush() with bulk_write on
+
+Frames: a full frame (shadow invalid, every page sent), the speed digits
+changing, only the status bar blinking, and nothing changed. Per frame:
+CS-low transactions, spi.write() calls, bytes, CPU us, heap bytes, and the
+wire time the bytes take at the driver's 30 MHz.
+
+On the host a model of the SH1107 decodes the stream (page/column commands,
+vertical addressing; bulk runs assume the column advances after the last
+page) and checks the panel RAM equals the framebuffer after every frame
+and that no byte went out with CS high; a mismatch exits non-zero. Host
+times include the Python pin and SPI stand-ins; the board's are the real
+ones.
+
+    python DIS/bench/bench_spi.py [--frames N]
+"""
+import sys
+import benchlib
+from benchlib import AllocMeter, ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "frames": 200 if ON_DEVICE else 300,
+}
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+import config
+from display import DisplayManager
+from racestate import TIMER_RUNNING
+
+SPI_MHZ = 30
+
+
+def legacy_flush(oled, buf, lo, hi):
+    """OLED_1inch3._flush() before batching: a transaction per command and per page."""
+    force = not oled._shadow_valid
+    oled._shadow_valid = True
+    page_bytes = oled._page_bytes
+    shadow = oled._shadow
+    sync_page = oled._sync_page
+    addressed = False
+    for page in range(lo, hi):
+        start_index = page * page_bytes
+        if not sync_page(buf, shadow, start_index, page_bytes) and not force:
+            continue
+        if not addressed:
+            oled.write_cmd(0xB0)
+            addressed = True
+        column = page if oled.rotate == 180 else (63 - page)
+        oled.write_cmd(0x00 + (column & 0x0F))
+        oled.write_cmd(0x10 + (column >> 4))
+        end_index = start_index + page_bytes
+        oled.write_data(buf[start_index:end_index])
+
+
+class _Line:
+    """A CS or DC output that remembers its level and counts CS assertions."""
+    def __init__(self, pin):
+        self.pin = pin
+        self.level = 1
+        self.falls = 0
+
+    def __call__(self, value=None):
+        if value is None:
+            return self.level
+        if self.level and not value:
+            self.falls += 1
+        self.level = 1 if value else 0
+        self.pin(value)
+
+
+class _Panel:
+    """
+    Counts what goes over the bus and, on the host, decodes it into SH1107
+    RAM (16 bytes per column, column-major like the driver's framebuffer).
+    """
+    def __init__(self, oled, decode):
+        self.spi = oled.spi
+        self.cs = oled.cs = _Line(oled.cs)
+        self.dc = oled.dc = _Line(oled.dc)
+        oled.spi = self
+        self.ram = bytearray(len(oled.buffer)) if decode else None
+        self.column = 0
+        self.page = 0
+        self.writes = 0
+        self.bytes = 0
+        self.errors = 0     # bytes sent with CS high
+
+    def write(self, buf):
+        self.writes += 1
+        self.bytes += len(buf)
+        self.spi.write(buf)
+        if self.ram is None:
+            return
+        if self.cs.level:
+            self.errors += len(buf)
+        if not self.dc.level:
+            for b in buf:
+                if 0xB0 <= b <= 0xBF:
+                    self.page = b & 0x0F
+                elif b <= 0x0F:
+                    self.column = (self.column & 0xF0) | b
+                elif b <= 0x17:
+                    self.column = (self.column & 0x0F) | ((b & 0x07) << 4)
+            return
+        ram = self.ram
+        for b in buf:
+            ram[self.column * 16 + self.page] = b
+            self.page += 1
+            if self.page == 16:         # vertical addressing: next column
+                self.page = 0
+                self.column += 1
+
+    def counts(self):
+        return self.cs.falls, self.writes, self.bytes
+
+
+def run_scheme(name, opts):
+    oled = config.OLED_1inch3()
+    display = DisplayManager(oled)
+    panel = _Panel(oled, not ON_DEVICE)
+    if name == "legacy":
+        oled._flush = lambda buf, pages, view, lo, hi: legacy_flush(oled, buf, lo, hi)
+    oled.bulk_write = name == "bulk"
+    frames = opts["frames"]
+    mismatches = 0
+
+    def full(i):
+        oled._shadow_valid = False
+        oled.mark_dirty()
+        oled.show()
+
+    def digits(i):
+        display.draw_large_key(100 + i * 7 % 800, "MPH", 0, TIMER_RUNNING)
+
+    def status(i):
+        display.draw_status(i & 1, TIMER_RUNNING)
+        oled.show()
+
+    def idle(i):
+        oled.mark_dirty()
+        oled.show()
+
+    for case, frame in (("full", full), ("digits", digits), ("status", status), ("idle", idle)):
+        display.screen_changed()
+        digits(0)
+        before = panel.counts()
+        us = 0
+        for i in range(frames):
+            t0 = ticks_us()
+            frame(i)
+            us += ticks_diff(ticks_us(), t0)
+            if panel.ram is not None and panel.ram != oled.buffer:
+                mismatches += 1
+        after = panel.counts()
+        meter = AllocMeter()
+        meter.start()
+        for i in range(min(frames, 50)):
+            frame(i)
+        meter.stop()
+        n_bytes = (after[2] - before[2]) / frames
+        report("spi_%s_%s" % (name, case), transactions=(after[0] - before[0]) / frames,
+               writes=(after[1] - before[1]) / frames, bytes=n_bytes, us_per_frame=us / frames,
+               wire_us=n_bytes * 8 / SPI_MHZ, alloc_bytes=meter.bytes / min(frames, 50))
+    if panel.ram is not None:
+        report("spi_%s_exact" % name, frames=4 * frames, mismatches=mismatches,
+               cs_high_bytes=panel.errors)
+    return mismatches + panel.errors
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    failures = 0
+    for scheme in ("legacy", "batched", "bulk"):
+        failures += run_scheme(scheme, opts)
+    if failures:
+        sys.exit(1)
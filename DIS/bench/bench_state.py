@@ -0,0 +1,231 @@
+"""
+Race state benchmark: the render loop's state handling with racestate.RaceState
+against the module globals main.py used before it.
+
+  globals    the seqlock copy into a bare array (`live`), the screen and
+             timer as module globals, the timer as a string compared by
+             the status bar and mapped to its log code through a dict
+  racestate  one RaceState copied into another with copy_into(); screen
+             and timer are int fields of the same array, and the logger
+             took the whole object (DataLogger.append_state, since
+             replaced by per-sample records)
+
+Each pass does what one frame does with the state: publish the race (as
+integrate() does), copy it for the frame, apply a screen press, pick the
+speed key, draw the status bar and log a record; drawing and logging go to
+stubs so only the state access is timed. Also timed on their own: publish,
+copy_into() and snapshot(), with the bytes each allocates.
+
+    python DIS/bench/bench_state.py [--passes N] [--calls N]
+"""
+import sys
+import benchlib
+from benchlib import AllocMeter, ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "passes": 2000 if ON_DEVICE else 20000,
+    "calls": 2000 if ON_DEVICE else 20000,
+}
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+from array import array
+from racestate import (RaceState, RS_SEQ, RS_SAMPLES, RS_RPM, RS_MMPH, RS_POWER_MW,
+                       RS_DISTANCE_UMI, RS_ELAPSED_MS, RS_REMAINING_UMI, RS_REMAINING_MS,
+                       RS_TARGET_MMPH, RS_VOLTAGE_DV, RS_CURRENT_MA, RS_DUTY, RS_THROTTLE,
+                       RS_ECO, RS_BLINK, RS_PUBLISHED, RS_TIMER, RS_SCREEN, TIMER_RUNNING,
+                       TIMER_PAUSED)
+
+NUM_SCREENS = 6
+
+
+class _Values:
+    """Stand-in for DerivedValues and UartManager: the attributes integrate() reads."""
+    def __init__(self):
+        self.rpm = 300
+        self.mmph = 15000
+        self.power_mw = 120000
+        self.distance_umi = 0
+        self.elapsed_ms = 0
+        self.remaining_umi = 1000000
+        self.remaining_ms = 240000
+        self.target_mmph = 15000
+        self.voltage_dv = 480
+        self.current_ma = 2500
+        self.duty = 50
+        self.throttle = 60
+        self.eco = 0
+        self.uart_blink = 0
+        self.samples = 0
+
+    def step(self, i):
+        self.samples += 1
+        self.mmph = 14000 + (i * 37) % 2000
+        self.distance_umi += 83
+        self.elapsed_ms += 50
+        self.uart_blink = (i >> 3) & 1
+
+
+def publish(state, v):
+    """integrate()'s stores, the same for both layouts."""
+    state.begin()
+    d = state.data
+    d[RS_SAMPLES] = v.samples
+    d[RS_RPM] = v.rpm
+    d[RS_MMPH] = v.mmph
+    d[RS_POWER_MW] = v.power_mw
+    d[RS_DISTANCE_UMI] = v.distance_umi
+    d[RS_ELAPSED_MS] = v.elapsed_ms
+    d[RS_REMAINING_UMI] = v.remaining_umi
+    d[RS_REMAINING_MS] = v.remaining_ms
+    d[RS_TARGET_MMPH] = v.target_mmph
+    d[RS_VOLTAGE_DV] = v.voltage_dv
+    d[RS_CURRENT_MA] = v.current_ma
+    d[RS_DUTY] = v.duty
+    d[RS_THROTTLE] = v.throttle
+    d[RS_ECO] = v.eco
+    d[RS_BLINK] = v.uart_blink
+    state.end()
+
+
+# ---------------- Stubs ----------------
+
+_sink = array("i", [0, 0])
+
+def _draw(key, blink, running, paused):
+    _sink[0] = (_sink[0] + key + blink + running + paused) & 0xFFFFFF
+
+def _append(tick_ms, voltage_dv, current_ma, rpm, duty, throttle, eco, distance_umi, timer_code):
+    _sink[1] = (_sink[1] + distance_umi + timer_code) & 0xFFFFFF
+
+
+# ---------------- Globals (before RaceState) ----------------
+
+TIMER_CODES = {"reset": 0, "running": 1, "paused": 2}
+screen = 0
+last_screen = 0
+timer_state = "running"
+
+class _Snapshot:
+    """The old dualcore.Snapshot: the published fields only, copied whole."""
+    def __init__(self):
+        self.data = array("i", [0] * RS_PUBLISHED)
+
+    def begin(self):
+        self.data[RS_SEQ] += 1
+
+    def end(self):
+        self.data[RS_SEQ] += 1
+
+    def read_into(self, dst):
+        d = self.data
+        while True:
+            seq = d[RS_SEQ]
+            if not seq & 1:
+                dst[:] = d
+                if d[RS_SEQ] == seq:
+                    return
+
+def globals_pass(shared, live, v, i):
+    global screen, last_screen
+    publish(shared, v)
+    shared.read_into(live)
+    screen += 1 if not i & 15 else 0
+    new_screen = screen % NUM_SCREENS
+    if new_screen != last_screen:
+        last_screen = new_screen
+    screen = new_screen
+    mmph = live[RS_MMPH]
+    target = live[RS_TARGET_MMPH]
+    key = mmph // 100 + (target > 0 and mmph < target)
+    _draw(key, live[RS_BLINK], timer_state == "running", timer_state == "paused")
+    _append(i, live[RS_VOLTAGE_DV], live[RS_CURRENT_MA], live[RS_RPM], live[RS_DUTY],
+            live[RS_THROTTLE], live[RS_ECO], live[RS_DISTANCE_UMI],
+            TIMER_CODES.get(timer_state, 0))
+
+
+# ---------------- RaceState ----------------
+
+def _append_state(tick_ms, state):
+    """The former DataLogger.append_state() in front of the _append stub."""
+    d = state.data
+    _append(tick_ms, d[RS_VOLTAGE_DV], d[RS_CURRENT_MA], d[RS_RPM], d[RS_DUTY],
+            d[RS_THROTTLE], d[RS_ECO], d[RS_DISTANCE_UMI], d[RS_TIMER])
+
+def racestate_pass(shared, state, v, i):
+    publish(shared, v)
+    shared.copy_into(state)
+    d = state.data
+    if not i & 15:
+        d[RS_SCREEN] = (d[RS_SCREEN] + 1) % NUM_SCREENS
+    mmph = d[RS_MMPH]
+    target = d[RS_TARGET_MMPH]
+    key = mmph // 100 + (target > 0 and mmph < target)
+    timer = d[RS_TIMER]
+    _draw(key, d[RS_BLINK], timer == TIMER_RUNNING, timer == TIMER_PAUSED)
+    _append_state(i, state)
+
+
+# ---------------- Runs ----------------
+
+def run_loop(opts):
+    passes = opts["passes"]
+    results = {}
+    for name in ("globals", "racestate"):
+        v = _Values()
+        if name == "globals":
+            shared = _Snapshot()
+            dst = array("i", [0] * RS_PUBLISHED)
+            step = globals_pass
+        else:
+            shared = RaceState()
+            dst = RaceState()
+            dst.data[RS_TIMER] = TIMER_RUNNING
+            step = racestate_pass
+        for i in range(50):     # warm up
+            v.step(i)
+            step(shared, dst, v, i)
+        meter = AllocMeter()
+        meter.start()
+        t0 = ticks_us()
+        for i in range(passes):
+            v.step(i)
+            step(shared, dst, v, i)
+        dt = ticks_diff(ticks_us(), t0)
+        meter.stop()
+        results[name] = dt / passes
+        report("state_loop_" + name, passes=passes, us_per_pass=dt / passes,
+               alloc_bytes_per_pass=meter.bytes / passes)
+    report("state_loop_speedup", racestate_vs_globals=results["globals"] / results["racestate"])
+
+
+def run_ops(opts):
+    calls = opts["calls"]
+    v = _Values()
+    src = RaceState()
+    dst = RaceState()
+    for name in ("publish", "copy_into", "snapshot"):
+        meter = AllocMeter()
+        meter.start()
+        t0 = ticks_us()
+        if name == "publish":
+            for i in range(calls):
+                publish(src, v)
+        elif name == "copy_into":
+            for i in range(calls):
+                src.copy_into(dst)
+        else:
+            for i in range(calls):
+                src.snapshot()
+        dt = ticks_diff(ticks_us(), t0)
+        meter.stop()
+        report("state_" + name, calls=calls, us_per_call=dt / calls,
+               alloc_bytes_per_call=meter.bytes / calls)
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    run_loop(opts)
+    run_ops(opts)
@@ -0,0 +1,63 @@
+"""
+UART ingest benchmark: parse throughput and heap allocation per sample,
+for legacy ASCII lines and binary frames.
+
+    python DIS/bench/bench_uart.py [samples]
+"""
+import sys
+from benchlib import AllocMeter, FeedUart, ON_DEVICE, report, ticks_us, ticks_diff
+
+if not ON_DEVICE:
+    import dishost
+    dishost.install()
+
+from dishost.telemetry import encode_frame, encode_line
+from uart_manager import UartManager
+
+
+def make_stream(samples, binary=False):
+    out = bytearray()
+    for i in range(samples):
+        values = (480 + i % 20, (i * 37) % 15000, i % 600, i % 101, (i * 3) % 101, i % 2)
+        if binary:
+            out += encode_frame(i, i * 250, *values)
+        else:
+            out += encode_line(*values)
+    return bytes(out)
+
+
+def run(samples=2000, chunk=64, binary=False):
+    uart = FeedUart(make_stream(samples, binary), chunk)
+    mgr = UartManager(uart)
+
+    # Warm-up pass so first-use allocations are not counted.
+    mgr.update()
+    uart.rewind()
+    mgr.lines_parsed = 0
+    mgr.frames_received = 0
+    mgr.frames_dropped = 0
+    mgr._last_seq = -1
+
+    meter = AllocMeter()
+    meter.start()
+    t0 = ticks_us()
+    while uart.any():
+        mgr.update()
+    dt = ticks_diff(ticks_us(), t0)
+    meter.stop()
+
+    parsed = mgr.frames_received if binary else mgr.lines_parsed
+    report("uart_ingest_binary" if binary else "uart_ingest_ascii",
+           samples=parsed,
+           chunk=chunk,
+           wire_bytes_per_sample=len(uart.data) / max(samples, 1),
+           us_per_sample=dt / max(parsed, 1),
+           alloc_bytes_per_sample=meter.bytes / max(parsed, 1),
+           errors=mgr.parse_errors + mgr.crc_errors,
+           dropped=mgr.frames_dropped)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    run(n)
+    run(n, binary=True)
@@ -0,0 +1,222 @@
+"""
+UART reception benchmark: samples stamped at their arrival (uartrx.py)
+against the polled UART, for distance integration error and backlog.
+
+A simulated controller sends binary frames every --period-ms while the
+loop runs frames of uneven length (20-160 ms, with a 400 ms stall every
+so often, e.g. a flash write). Two pipelines see the same data:
+
+  poll   UartManager.update() once per loop pass, then race.update() at the
+         loop time with the latest sample, as main.py did before: samples
+         in a burst are all stamped with the time they were read and only
+         the last one is integrated.
+  irq    UartReceiver reads each frame from the UART interrupt when it
+         arrives; the loop parses the chunks and integrates every queued
+         sample from its own arrival time.
+
+Both distances are compared with the exact integral of the rpm the
+controller sent (zero-order hold from each frame's arrival), together with
+the stamp error of each sample (stamp - arrival) and how much waited for
+the loop: bytes in the UART, chunks in the receiver, samples in the queue.
+On the board only the timing part runs.
+
+    python DIS/bench/bench_uartrx.py [--seconds N] [--period-ms N] [--calls N]
+"""
+import sys
+import benchlib
+from benchlib import FeedUart, ON_DEVICE, report, ticks_us, ticks_diff
+
+DEFAULTS = {
+    "seconds": 300,
+    "period_ms": 0,     # 0: both 250 ms (today's controller) and 50 ms
+    "calls": 500,
+}
+
+if not ON_DEVICE:
+    import dishost
+    from dishost import clock as clock_mod
+    from dishost.telemetry import ControllerFeed, race_profile
+    dishost.install()
+    import machine
+
+import math
+from derived import DerivedValues
+from uart_manager import UartManager
+from uartrx import UartReceiver, SampleQueue
+from dishost.telemetry import encode_frame
+
+TICKS_PERIOD = 1 << 30
+START_US = TICKS_PERIOD - 10000000      # ticks_us wraps ten seconds in
+STEP_US = 200                           # clock step inside a loop pass
+WHEEL_IN = 16
+BYTE_US = 10 * 1000000 // 115200
+
+try:
+    from fractions import Fraction
+except ImportError:
+    Fraction = float
+
+
+class _Rand:
+    def __init__(self, seed=2024):
+        self.state = seed
+
+    def below(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return self.state % n
+
+
+def pulse_glide(t_s):
+    """Eco-marathon driving: 6 s burn from 250 to 450 rpm, 14 s glide back."""
+    phase = t_s % 20
+    if phase < 6:
+        rpm = 250 + int(200 * phase / 6)
+    else:
+        rpm = 450 - int(200 * (phase - 6) / 14)
+    burn = phase < 6
+    return 480, 9000 if burn else 0, rpm, 100 if burn else 0, 100 if burn else 0, False
+
+
+class _Pipeline:
+    def __init__(self, uart_id, profile, period_ms, irq):
+        self.uart = machine.UART(uart_id)
+        self.uart.attach(ControllerFeed(profile, period_ms, start_ms=period_ms // 2))
+        self.samples = SampleQueue(64)
+        self.mgr = UartManager(self.uart, byte_us=BYTE_US if irq else 0, samples=self.samples)
+        self.rx = UartReceiver(self.uart, BYTE_US) if irq else None
+        self.race = DerivedValues(WHEEL_IN, 100, 36000)
+        self.stamps = []        # (stamp, time integrated) per sample
+        self.integrated = 0     # samples that reached race.update()
+        self.max_bytes = 0      # waiting in the UART when the loop read it
+
+    def loop_pass(self, now):
+        rx = self.rx
+        if rx:
+            i = rx.peek()
+            while i >= 0:
+                self.mgr.ingest(rx.view(i), rx.length(i), rx.t_us(i))
+                rx.release()
+                i = rx.peek()
+        else:
+            waiting = self.uart.any()
+            if waiting > self.max_bytes:
+                self.max_bytes = waiting
+            self.mgr.update()
+        q = self.samples
+        i = q.pop()
+        if i >= 0 and not rx:
+            self.integrated += 1    # only the latest of the burst
+        while i >= 0:
+            self.stamps.append((q.t_us[i], now))
+            if rx:
+                self.race.update(q.t_us[i], q.rpm[i], q.voltage_dv[i], q.current_ma[i])
+                self.integrated += 1
+            i = q.pop()
+        mgr = self.mgr
+        self.race.update(now, mgr.rpm, mgr.voltage_dv, mgr.current_ma)
+
+
+def exact_umi(profile, period_ms, end_us):
+    """Distance from the rpm of every frame sent before end_us, held until the next."""
+    umi_per_rev = Fraction(math.pi * WHEEL_IN) * 1000000 / 63360
+    t = period_ms // 2 * 1000
+    times = []
+    revs = 0
+    while t < end_us:
+        nxt = t + period_ms * 1000
+        rpm = profile(t // 1000 / 1000)[2]
+        revs += Fraction(rpm * (min(nxt, end_us) - t), 60000000)
+        times.append(t)
+        t = nxt
+    return float(revs * umi_per_rev), times
+
+
+def run_integration(name, profile, period_ms, seconds):
+    clock = clock_mod.Clock(speed=0, start_ms=START_US // 1000)
+    clock_mod.set_clock(clock)
+    machine.reset_registry()
+    base_us = clock.ticks_us()
+    poll = _Pipeline(2, profile, period_ms, False)
+    irq = _Pipeline(3, profile, period_ms, True)
+    start = clock.ticks_us()
+    poll.race.start(start)
+    irq.race.start(start)
+
+    rnd = _Rand()
+    end_us = seconds * 1000000
+    passes = 0
+    while True:
+        now = clock.ticks_us()
+        poll.loop_pass(now)
+        irq.loop_pass(now)
+        passes += 1
+        frame_us = (400 if passes % 37 == 0 else 20 + rnd.below(141)) * 1000
+        if clock.elapsed_us() + frame_us > end_us:
+            break
+        for _ in range(frame_us // STEP_US):
+            clock.advance_us(STEP_US)
+    end = clock.elapsed_us()
+
+    ref, times = exact_umi(profile, period_ms, end)
+    for label, p in (("poll", poll), ("irq", irq)):
+        err = p.race.distance_umi - ref
+        stamp = [0, 0]      # abs sum, max
+        age = 0
+        for k in range(min(len(times), len(p.stamps))):
+            true = (base_us + times[k]) & (TICKS_PERIOD - 1)
+            e = abs(clock_mod.ticks_diff(p.stamps[k][0], true))
+            stamp[0] += e
+            stamp[1] = max(stamp[1], e)
+            age = max(age, clock_mod.ticks_diff(p.stamps[k][1], true))
+        n = max(1, len(p.stamps))
+        extra = {}
+        if p.rx:
+            extra["rx_chunks_max"] = p.rx.max_backlog
+            extra["rx_full"] = p.rx.full
+            extra["queue_max"] = p.samples.max_depth
+            extra["queue_dropped"] = p.samples.dropped
+        else:
+            extra["uart_bytes_max"] = p.max_bytes
+        report("uartrx_%s_%dms_%s" % (name, period_ms, label), samples=len(p.stamps),
+               sent=len(times), integrated=p.integrated,
+               distance_err_umi=err, distance_err_ppm=err * 1e6 / ref if ref else 0.0,
+               stamp_err_mean_us=stamp[0] / n, stamp_err_max_us=stamp[1],
+               age_max_ms=age // 1000, overrun_bytes=p.uart.overrun_bytes, **extra)
+
+
+def run_timing(opts):
+    """us per interrupt read of one frame, and per sample parsed, queued and integrated."""
+    calls = opts["calls"]
+    frame = encode_frame(1, 0, 480, 3000, 400, 50, 60, 0)
+    uart = FeedUart(frame, len(frame))
+    rx = UartReceiver(uart, BYTE_US)    # FeedUart has no irq(); poll() stands in for it
+    samples = SampleQueue()
+    mgr = UartManager(None, byte_us=BYTE_US, samples=samples)
+    race = DerivedValues(WHEEL_IN, 100, 36000)
+    race.start(ticks_us())
+    read_us = 0
+    parse_us = 0
+    for _ in range(calls):
+        uart.rewind()
+        t0 = ticks_us()
+        rx.poll()
+        t1 = ticks_us()
+        i = rx.peek()
+        mgr.ingest(rx.view(i), rx.length(i), rx.t_us(i))
+        rx.release()
+        i = samples.pop()
+        race.update(samples.t_us[i], samples.rpm[i], samples.voltage_dv[i], samples.current_ma[i])
+        read_us += ticks_diff(t1, t0)
+        parse_us += ticks_diff(ticks_us(), t1)
+    report("uartrx_timing", frames=mgr.frames_received, us_per_irq_read=read_us / calls,
+           us_per_sample=parse_us / calls)
+
+
+if __name__ == "__main__":
+    opts = benchlib.parse_args(sys.argv, DEFAULTS)
+    if not ON_DEVICE:
+        periods = (opts["period_ms"],) if opts["period_ms"] else (250, 50)
+        for period in periods:
+            run_integration("race", race_profile, period, opts["seconds"])
+            run_integration("pulse", pulse_glide, period, opts["seconds"])
+    run_timing(opts)
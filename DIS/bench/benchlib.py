@@ -0,0 +1,216 @@
+"""
+Small helpers shared by the benchmarks in this folder.
+Everything here runs on CPython and on MicroPython, so a benchmark can be
+copied to the board next to the DIS/device modules and run there as well.
+"""
+import sys
+import gc
+import json
+from array import array
+
+try:
+    import os
+    _here = os.path.dirname(os.path.abspath(__file__))
+    DEVICE_DIR = os.path.join(_here, "..", "device")
+    HOST_DIR = os.path.join(_here, "..", "host")
+    for _p in (DEVICE_DIR, HOST_DIR):
+        if _p not in sys.path:
+            sys.path.insert(0, _p)
+except (ImportError, AttributeError):
+    # On the board the device modules (and dishost/telemetry.py, for the
+    # stream encoders) sit next to the benchmark files.
+    DEVICE_DIR = HOST_DIR = None
+
+ON_DEVICE = sys.implementation.name == "micropython"
+
+if ON_DEVICE:
+    import utime as _time
+
+    def ticks_us():
+        return _time.ticks_us()
+
+    def ticks_diff(a, b):
+        return _time.ticks_diff(a, b)
+else:
+    import time as _time
+    import tracemalloc
+
+    def ticks_us():
+        return int(_time.perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+class AllocMeter:
+    """
+    Counts heap bytes allocated between start() and stop().
+    On the board this is exact (gc.mem_alloc with the collector disabled).
+    On CPython it is the tracemalloc peak, which also counts the int and
+    float objects MicroPython would keep as small ints, so treat it as an
+    upper bound.
+    """
+    def __init__(self):
+        self.bytes = 0
+
+    def start(self):
+        gc.collect()
+        if ON_DEVICE:
+            gc.disable()
+            self._base = gc.mem_alloc()
+        else:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        if ON_DEVICE:
+            self.bytes = gc.mem_alloc() - self._base
+            gc.enable()
+        else:
+            self.bytes = tracemalloc.get_traced_memory()[1] - self._base
+            tracemalloc.stop()
+        return self.bytes
+
+
+class FeedUart:
+    """Minimal UART stand-in that serves a fixed byte string in chunks."""
+    def __init__(self, data, chunk=64):
+        self.data = data
+        self.chunk = chunk
+        self.pos = 0
+
+    def rewind(self):
+        self.pos = 0
+
+    def any(self):
+        return len(self.data) - self.pos
+
+    def read(self, n=None):
+        n = self.chunk if n is None else min(n, self.chunk)
+        out = self.data[self.pos:self.pos + n]
+        self.pos += len(out)
+        return out or None
+
+    def readinto(self, buf, n=None):
+        n = min(len(buf) if n is None else n, self.chunk, len(self.data) - self.pos)
+        if n <= 0:
+            return None
+        buf[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+class CountingSPI:
+    """Wraps an SPI object and counts what goes over the bus."""
+    def __init__(self, spi):
+        self.spi = spi
+        self.bytes = 0
+        self.transactions = 0
+
+    def write(self, buf):
+        self.bytes += len(buf)
+        self.transactions += 1
+        self.spi.write(buf)
+
+    def reset(self):
+        self.bytes = 0
+        self.transactions = 0
+
+
+class Latency:
+    """Per-call durations in a preallocated array, summarised on demand."""
+    def __init__(self, capacity):
+        self.samples = array("I", [0] * capacity)
+        self.n = 0
+
+    def add(self, us):
+        if self.n < len(self.samples):
+            self.samples[self.n] = us
+            self.n += 1
+
+    def summary(self):
+        n = self.n
+        if not n:
+            return {"n": 0}
+        s = sorted(self.samples[:n])
+        return {
+            "n": n,
+            "mean_us": sum(s) / n,
+            "p50_us": s[n // 2],
+            "p90_us": s[min(n - 1, n * 9 // 10)],
+            "p99_us": s[min(n - 1, n * 99 // 100)],
+            "max_us": s[-1],
+        }
+
+
+def parse_args(argv, defaults):
+    """
+    Tiny --key value parser (argparse is not available on the board).
+    Values are converted to the type of the default.
+    """
+    opts = dict(defaults)
+    i = 1
+    while i < len(argv):
+        key = argv[i]
+        if key.startswith("--") and key[2:].replace("-", "_") in opts:
+            name = key[2:].replace("-", "_")
+            default = opts[name]
+            if isinstance(default, bool):
+                opts[name] = True
+            else:
+                i += 1
+                opts[name] = argv[i] if default is None else type(default)(argv[i])
+        i += 1
+    return opts
+
+
+def save_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+    print("saved baseline to", path)
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Metrics where a larger value is worse, checked against the threshold.
+COMPARE_KEYS = ("p50_us", "p99_us", "mean_us", "alloc_bytes", "spi_bytes")
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare {case: {metric: value}} results against a saved baseline.
+    Returns the list of regressions (relative increase above threshold).
+    Latency increases under 20 us are ignored as timer noise.
+    """
+    regressions = []
+    for case in sorted(current):
+        base = baseline.get(case)
+        if base is None:
+            continue
+        for key in COMPARE_KEYS:
+            if key not in base or key not in current[case]:
+                continue
+            old = base[key]
+            new = current[case][key]
+            if key.endswith("_us") and new - old < 20:
+                continue
+            limit = old * (1 + threshold)
+            if new > limit and new - old > 0.5:
+                regressions.append((case, key, old, new))
+    for case, key, old, new in regressions:
+        print("REGRESSION {} {}: {:.1f} -> {:.1f}".format(case, key, old, new))
+    if not regressions:
+        print("no regressions above {:.0f}%".format(threshold * 100))
+    return regressions
+
+
+def report(name, **values):
+    parts = [name]
+    for key in sorted(values):
+        v = values[key]
+        parts.append("{}={}".format(key, "{:.2f}".format(v) if isinstance(v, float) else v))
+    print("  ".join(parts))
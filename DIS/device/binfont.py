@@ -0,0 +1,198 @@
+from array import array
+import fastpath
+from fastpath import (BLIT_STRIDE, BLIT_NB, BLIT_DST, BLIT_SRC, BLIT_ROWS, BLIT_LO,
+                      BLIT_HI, BLIT_M_FIRST, BLIT_M_LAST, BLIT_PARAMS)
+
+# ---------------- File format ----------------
+# Header: b"DFNT", version, height, max_width, min_ch, max_ch, glyph count,
+# 6 reserved bytes. Then one glyph id (u8) per character min_ch..max_ch,
+# and per glyph its data offset (u32 LE), width (u8) and a reserved byte.
+# Glyph 0 is the font's default glyph, used for anything outside the table.
+# A glyph's data holds it eight times, pre-shifted for each x & 7: phase p
+# has (p + width + 7) >> 3 bytes per row, LSB = leftmost pixel, so its rows
+# drop straight into a MONO_HMSB framebuffer. dishost/fontpack.py writes
+# these files from the font_to_py modules in fonts/.
+MAGIC = b"DFNT"
+VERSION = 1
+HEADER_LEN = 16
+GLYPH_LEN = 6
+
+try:
+    _DIR = __file__.rsplit("/", 1)[0] + "/" if "/" in __file__ else ""
+except NameError:
+    _DIR = ""
+
+def font_path(name):
+    """Path of fonts/<name>.fnt next to this module."""
+    return _DIR + "fonts/" + name + ".fnt"
+
+def _phase_offset(width, height, phase):
+    """Offset of a phase's rows within a glyph's data."""
+    off = 0
+    for p in range(phase):
+        off += ((p + width + 7) >> 3) * height
+    return off
+
+class BinFont:
+    """
+    A font read from a .fnt file. Only the header and the width/offset table
+    stay in RAM; glyph rows are read from the file when first drawn and kept
+    in a small LRU cache bounded by max_bytes, like writer.GlyphCache. The
+    cache holds a copy per x phase a glyph is drawn at, so the default
+    leaves room for all ten digits in the speed screen's tenths slot.
+
+    blit_hmsb() draws a glyph opaquely into a MONO_HMSB buffer, giving the
+    same pixels as blitting the font_to_py glyph with key -1: every row is a
+    byte copy, with only the first and last byte merged under a mask. The
+    row loop is fastpath.blit_rows().
+    """
+    def __init__(self, path, max_bytes=4096):
+        self.path = path
+        self._file = open(path, "rb")
+        head = self._file.read(HEADER_LEN)
+        if len(head) < HEADER_LEN or head[:4] != MAGIC or head[4] != VERSION:
+            raise ValueError("not a DFNT font")
+        self._height = head[5]
+        self._max_width = head[6]
+        self._min_ch = head[7]
+        self._max_ch = head[8]
+        n = head[9]
+        self._ids = self._file.read(self._max_ch - self._min_ch + 1)
+        table = self._file.read(n * GLYPH_LEN)
+        self._offsets = [table[i] | (table[i + 1] << 8) | (table[i + 2] << 16) | (table[i + 3] << 24)
+                         for i in range(0, len(table), GLYPH_LEN)]
+        self._widths = bytes(table[i + 4] for i in range(0, len(table), GLYPH_LEN))
+
+        self._params = array("i", [0] * BLIT_PARAMS)
+        self._blit_rows = fastpath.blit_rows
+        self.max_bytes = max_bytes
+        self._glyphs = {}   # glyph id * 8 + phase -> [rows, bytes per row, last_use]
+        self._bytes = 0
+        self._clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---- font_to_py module interface ----
+
+    def height(self):
+        return self._height
+
+    def max_width(self):
+        return self._max_width
+
+    def hmap(self):
+        return True
+
+    def reverse(self):
+        return False
+
+    # ---- Glyphs ----
+
+    def _id(self, c):
+        oc = ord(c)
+        if self._min_ch <= oc <= self._max_ch:
+            return self._ids[oc - self._min_ch]
+        return 0
+
+    def width(self, c):
+        return self._widths[self._id(c)]
+
+    def _rows(self, gid, phase):
+        """Cached rows of glyph gid at phase, read from the file on a miss."""
+        self._clock += 1
+        key = gid * 8 + phase
+        entry = self._glyphs.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry[2] = self._clock
+            return entry
+
+        self.misses += 1
+        wd = self._widths[gid]
+        ht = self._height
+        nb = (phase + wd + 7) >> 3
+        rows = bytearray(nb * ht)
+        while self._glyphs and self._bytes + len(rows) > self.max_bytes:
+            self._evict()
+        self._file.seek(self._offsets[gid] + _phase_offset(wd, ht, phase))
+        self._file.readinto(rows)
+        entry = [rows, nb, self._clock]
+        self._glyphs[key] = entry
+        self._bytes += len(rows)
+        return entry
+
+    def _evict(self):
+        oldest = None
+        oldest_use = 0
+        for key, entry in self._glyphs.items():
+            if oldest is None or entry[2] < oldest_use:
+                oldest = key
+                oldest_use = entry[2]
+        self._bytes -= len(self._glyphs.pop(oldest)[0])
+        self.evictions += 1
+
+    def blit_hmsb(self, c, buf, stride, height, x, y):
+        """
+        Draw c with its top-left corner at (x, y) into buf, a MONO_HMSB
+        buffer of stride bytes per row and height rows. Returns the width.
+        """
+        gid = self._id(c)
+        wd = self._widths[gid]
+        if not wd:
+            return 0
+        ht = self._height
+        phase = x & 7
+        entry = self._rows(gid, phase)
+        rows = entry[0]
+        nb = entry[1]
+
+        # Clip to the buffer: rows r0..r1-1 and glyph bytes k0..k1-1.
+        xb = x >> 3
+        r0 = -y if y < 0 else 0
+        r1 = height - y if y + ht > height else ht
+        k0 = -xb if xb < 0 else 0
+        k1 = stride - xb if xb + nb > stride else nb
+        if r0 >= r1 or k0 >= k1:
+            return wd
+
+        m_first = (0xFF << phase) & 0xFF
+        m_last = 0xFF >> (7 - ((phase + wd - 1) & 7))
+        if nb == 1:
+            m_first &= m_last
+        # Byte 0 and byte nb-1 are partial and merged under their masks if
+        # they survived clipping; the bytes between are copied whole.
+        lo = k0
+        hi = k1
+        if k0 == 0:
+            lo = 1
+        else:
+            m_first = 0
+        if k1 == nb and nb > 1:
+            hi = nb - 1
+        else:
+            m_last = 0
+        p = self._params
+        p[BLIT_STRIDE] = stride
+        p[BLIT_NB] = nb
+        p[BLIT_DST] = (y + r0) * stride + xb
+        p[BLIT_SRC] = r0 * nb
+        p[BLIT_ROWS] = r1 - r0
+        p[BLIT_LO] = lo
+        p[BLIT_HI] = hi
+        p[BLIT_M_FIRST] = m_first
+        p[BLIT_M_LAST] = m_last
+        self._blit_rows(buf, rows, p)
+        return wd
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "glyphs": len(self._glyphs),
+            "bytes": self._bytes,
+        }
+
+    def close(self):
+        self._file.close()
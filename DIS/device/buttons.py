@@ -0,0 +1,154 @@
+from array import array
+import utime as time
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+KEY0 = 0
+KEY1 = 1
+
+class ButtonEvents:
+    """
+    Interrupt-driven replacement for OLED_1inch3.check_button().
+
+    Both edges of KEY0 and KEY1 raise a hard IRQ that stores the time and the
+    new pin level in a preallocated ring. The ring is lock-free: only the
+    IRQ moves _head and only poll() moves _tail. poll() decodes the edges
+    at their own timestamps with the same debounce, long-press and release
+    rules as check_button() and returns the same tuple, so a press is never
+    lost to a slow frame and its timing does not depend on when poll() runs.
+
+    poll() reports at most one KEY1 event per call (toggle, reset or clear,
+    in that order of occurrence) and leaves later edges queued; pending_ms()
+    tells the caller when to poll again. If the ring overflows, the edges
+    are dropped and counted in overruns.
+    """
+    def __init__(self, key0, key1, debounce_ms=150, longpress_ms=3000, size=32):
+        self._mask = size - 1       # size must be a power of two
+        self._times = array("i", [0] * size)
+        self._codes = bytearray(size)   # key << 1 | level
+        self._head = 0
+        self._tail = 0
+        self.overruns = 0
+        self.flag = asyncio.ThreadSafeFlag() if asyncio else None
+
+        self._debounce_ms = debounce_ms
+        self._longpress_ms = longpress_ms
+        now = time.ticks_ms()
+        self._last_key0 = key0.value()
+        self._last_key1 = key1.value()
+        self._last_time_k0 = now
+        self._last_time_k1 = now
+        self._k1_press_start = None
+        self._k1_reset_fired = False
+
+        trigger = key0.IRQ_FALLING | key0.IRQ_RISING
+        key0.irq(self._irq_key0, trigger, hard=True)
+        key1.irq(self._irq_key1, trigger, hard=True)
+
+    # ---------------- IRQ side ----------------
+
+    def _irq_key0(self, pin):
+        self._push(pin.value())
+
+    def _irq_key1(self, pin):
+        self._push(2 | pin.value())
+
+    def _push(self, code):
+        h = self._head
+        n = (h + 1) & self._mask
+        if n == self._tail:
+            self.overruns += 1
+            return
+        self._times[h] = time.ticks_ms()
+        self._codes[h] = code
+        self._head = n      # publish after the slot is written
+        if self.flag is not None:
+            self.flag.set()
+
+    # ---------------- Decoder ----------------
+
+    def _held_ms(self, t):
+        """How long KEY1 has been held at t, or -1 if no long press is pending."""
+        start = self._k1_press_start
+        if start is None or self._k1_reset_fired or self._last_key1 != 0:
+            return -1
+        return time.ticks_diff(t, start)
+
+    def poll(self, now=None):
+        """
+        Decode queued edges. Returns (screen_delta, timer_toggle,
+        timer_reset, clear_alert) like check_button().
+        """
+        if now is None:
+            now = time.ticks_ms()
+        screen_delta = 0
+        timer_toggle = False
+        timer_reset = False
+        clear_alert = False
+        times = self._times
+        codes = self._codes
+        while self._tail != self._head:
+            i = self._tail
+            t = times[i]
+            if self._held_ms(t) > self._longpress_ms:
+                # Held past the long-press time before this edge arrived
+                # (a release exactly at it counts as too short, as in
+                # check_button); the edge is decoded on the next call.
+                timer_reset = True
+                self._k1_reset_fired = True
+                break
+            code = codes[i]
+            self._tail = (i + 1) & self._mask
+            level = code & 1
+
+            if not code & 2:
+                # KEY0 short press: falling edge with debounce
+                if self._last_key0 == 1 and level == 0:
+                    if time.ticks_diff(t, self._last_time_k0) > self._debounce_ms:
+                        screen_delta += 1
+                        self._last_time_k0 = t
+                self._last_key0 = level
+                continue
+
+            last = self._last_key1
+            self._last_key1 = level
+            if last == 1 and level == 0:
+                # KEY1 press start
+                if time.ticks_diff(t, self._last_time_k1) > self._debounce_ms:
+                    self._k1_press_start = t
+                    self._k1_reset_fired = False
+            elif last == 0 and level == 1 and self._k1_press_start is not None:
+                # KEY1 release: short press toggles, release after a reset clears
+                press_ms = time.ticks_diff(t, self._k1_press_start)
+                if not self._k1_reset_fired and press_ms < self._longpress_ms:
+                    timer_toggle = True
+                if self._k1_reset_fired:
+                    clear_alert = True
+                    self._k1_reset_fired = False
+                self._k1_press_start = None
+                self._last_time_k1 = t
+                if timer_toggle or clear_alert:
+                    break
+
+        if not (timer_toggle or timer_reset or clear_alert) and self._held_ms(now) >= self._longpress_ms:
+            timer_reset = True
+            self._k1_reset_fired = True
+        return screen_delta, timer_toggle, timer_reset, clear_alert
+
+    def pending_ms(self, now=None):
+        """
+        ms until poll() has something to do: 0 with edges queued, the time
+        left to a long press while KEY1 is held, None when idle.
+        """
+        if self._tail != self._head:
+            return 0
+        if now is None:
+            now = time.ticks_ms()
+        held = self._held_ms(now)
+        if held < 0:
+            return None
+        left = self._longpress_ms - held
+        return left if left > 0 else 0
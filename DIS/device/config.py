@@ -1,6 +1,12 @@
 from machine import Pin, SPI, UART
 import framebuf, time
 import micropython
+import fastpath
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
 
 # ------- Pins -------
 DC, RST, MOSI, SCK, CS = 8, 12, 11, 10, 9
@@ -10,11 +16,43 @@ KEY0 = Pin(15, Pin.IN, Pin.PULL_UP)
 KEY1 = Pin(17, Pin.IN, Pin.PULL_UP)
 
 # UART (unchanged)
-uart = UART(1, baudrate=115200, tx=Pin(4), rx=Pin(5))
+UART_BAUD = 115200
+UART_BYTE_US = 10 * 1000000 // UART_BAUD    # start + 8 data + stop bits
+uart = UART(1, baudrate=UART_BAUD, tx=Pin(4), rx=Pin(5))
+
+# SH1107 power-up sequence, sent as one command transaction by init_display().
+# Multi-byte commands are just consecutive bytes with DC low, same as before.
+_SEG_REMAP = 9      # index of the segment remap byte, patched for rotate
+_INIT_CMDS = bytes((
+    0xAE,           # display off
+    0x00, 0x10,     # column address 0
+    0xB0,           # page address 0
+    0xDC, 0x00,     # display start line 0
+    0x81, 0x6F,     # contrast
+    0x21,           # memory addressing mode
+    0xA1,           # segment remap (0xA0 for rotate 0)
+    0xC0,           # COM scan direction
+    0xA4,           # entire display on: off
+    0xA6,           # normal (not inverted)
+    0xA8, 0x3F,     # multiplex ratio, duty 1/64
+    0xD3, 0x60,     # display offset
+    0xD5, 0x41,     # oscillator division
+    0xD9, 0x22,     # pre-charge period
+    0xDB, 0x35,     # VCOMH
+    0xAD, 0x8A,     # DC-DC enable
+    0xAF,           # display on
+))
+
+# Send runs of consecutive changed pages (a full frame: all 64) as one data
+# write each, relying on the SH1107 vertical addressing mode set above
+# (0x21) to carry on into the next column after the last page of one.
+# Rotate 180 only (columns run the same way as pages). Off until checked
+# on the panel; per-page addressing works whatever the wrap behaviour.
+BULK_WRITE = False
 
 # OLED Display Setup
 class OLED_1inch3(framebuf.FrameBuffer):
-    def __init__(self):
+    def __init__(self, threaded=False):
         self.width = 128
         self.height = 64
         self.rotate = 180
@@ -27,10 +65,45 @@ class OLED_1inch3(framebuf.FrameBuffer):
         self.spi = SPI(1,30000_000,polarity=0, phase=0,sck=Pin(SCK),mosi=Pin(MOSI),miso=None)
         self.dc = Pin(DC,Pin.OUT)
         self.dc(1)
+        self._cmd = bytearray(1)    # reused by write_cmd()
         self.buffer = bytearray(self.height * self.width // 8)
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_HMSB)
+
+        # -------- Dirty page tracking ----------
+        # Each 16-byte buffer row is sent to the panel as one column page.
+        # _shadow mirrors what the panel currently shows so show() can skip
+        # pages that did not change; _dirty_lo/_dirty_hi bound the rows that
+        # may have been drawn into since the last flush (see mark_dirty()).
+        self._page_bytes = self.width // 8
+        self._shadow = bytearray(len(self.buffer))
+        self._shadow_valid = False
+        self._dirty_lo = 0
+        self._dirty_hi = self.height
+        self._sync_page = fastpath.sync_page    # (buf, shadow, start, n) -> changed
+
+        # -------- Transfer buffers ----------
+        # _flush() sends a frame in one CS-low transaction: per run of
+        # changed pages an address command from _addr (page 0, column low,
+        # column high; after the first run just the column, as the page
+        # wraps back to 0) and the page data as a memoryview of the frame,
+        # so nothing is allocated or copied per page.
+        self._addr = bytearray((0xB0, 0x00, 0x10))
+        self._addr_col = memoryview(self._addr)[1:]
+        self._pages = self._page_views(self.buffer)
+        self._view = memoryview(self.buffer)
+        self.bulk_write = BULK_WRITE
         self.init_display()
 
+        # -------- Background flush (core 1) ----------
+        # In threaded mode show() copies the frame into _front and hands it
+        # to a worker on the second core, so the caller can start building
+        # the next frame while SPI runs. _idle is held by the worker while it
+        # owns _front; _ready is released by show() to signal a new frame.
+        self.last_show_us = 0   # time the caller spent in the last show()
+        self._threaded = False
+        if threaded:
+            self.start_flush_worker()
+
         # -------- Button state ----------
         now = time.ticks_ms()
         self.key0 = KEY0
@@ -45,9 +118,19 @@ class OLED_1inch3(framebuf.FrameBuffer):
         self._k1_press_start = None
         self._k1_reset_fired = False
         
+    def _page_views(self, buf):
+        pb = self._page_bytes
+        mv = memoryview(buf)
+        return tuple(mv[p * pb:(p + 1) * pb] for p in range(self.height))
+
     def write_cmd(self, cmd):
+        self._cmd[0] = cmd
+        self.write_cmds(self._cmd)
+
+    def write_cmds(self, cmds):
+        """Send a run of command bytes in one CS-low transaction."""
         self.cs(1); self.dc(0); self.cs(0)
-        self.spi.write(bytearray([cmd]))
+        self.spi.write(cmds)
         self.cs(1)
 
     def write_data(self, buf):
@@ -66,59 +149,173 @@ class OLED_1inch3(framebuf.FrameBuffer):
         time.sleep(0.01)
         self.rst(1)
         
-        self.write_cmd(0xAE)#turn off OLED display
-
-        self.write_cmd(0x00)   #set lower column address
-        self.write_cmd(0x10)   #set higher column address 
-
-        self.write_cmd(0xB0)   #set page address 
-      
-        self.write_cmd(0xdc)    #et display start line 
-        self.write_cmd(0x00) 
-        self.write_cmd(0x81)    #contract control 
-        self.write_cmd(0x6f)    #128
-        self.write_cmd(0x21)    # Set Memory addressing mode (0x20/0x21) #
-        if self.rotate == 0:
-            self.write_cmd(0xa0)    #set segment remap
-        elif self.rotate == 180:
-            self.write_cmd(0xa1)
-        self.write_cmd(0xc0)    #Com scan direction
-        self.write_cmd(0xa4)   #Disable Entire Display On (0xA4/0xA5) 
-
-        self.write_cmd(0xa6)    #normal / reverse
-        self.write_cmd(0xa8)    #multiplex ratio 
-        self.write_cmd(0x3f)    #duty = 1/64
-  
-        self.write_cmd(0xd3)    #set display offset 
-        self.write_cmd(0x60)
-
-        self.write_cmd(0xd5)    #set osc division 
-        self.write_cmd(0x41)
-    
-        self.write_cmd(0xd9)    #set pre-charge period
-        self.write_cmd(0x22)   
-
-        self.write_cmd(0xdb)    #set vcomh 
-        self.write_cmd(0x35)  
-    
-        self.write_cmd(0xad)    #set charge pump enable 
-        self.write_cmd(0x8a)    #Set DC-DC enable (a=0:disable; a=1:enable)
-        self.write_cmd(0XAF)
+        if self.rotate == 180:
+            self.write_cmds(_INIT_CMDS)
+        else:
+            cmds = bytearray(_INIT_CMDS)
+            cmds[_SEG_REMAP] = 0xA0
+            self.write_cmds(cmds)
+
+        # Panel RAM content is unknown after a reset: resend everything.
+        self._shadow_valid = False
+        self.mark_dirty()
+
+    def mark_dirty(self, y=0, h=None):
+        """
+        Hint that rows y .. y+h-1 of the framebuffer were drawn into.
+        With no arguments the whole frame is marked dirty.
+        """
+        if h is None:
+            y, h = 0, self.height
+        end = y + h
+        if y < 0: y = 0
+        if end > self.height: end = self.height
+        if y >= end:
+            return
+        if y < self._dirty_lo: self._dirty_lo = y
+        if end > self._dirty_hi: self._dirty_hi = end
 
     def show(self):
-        self.write_cmd(0xB0)
-        for page in range(0, 64):
-            column = page if self.rotate == 180 else (63 - page)
-            self.write_cmd(0x00 + (column & 0x0F))
-            self.write_cmd(0x10 + (column >> 4))
-            # OPTIMIZATION: Slice the buffer and send 16 bytes at once
-            # instead of looping 16 times for 1 byte.
-            start_index = page * 16
-            end_index = start_index + 16
-            self.write_data(self.buffer[start_index:end_index])
+        """
+        Flush the framebuffer to the panel.
+        Only pages inside the dirty range that differ from the shadow copy are
+        transmitted; an untouched or identical frame costs no SPI traffic.
+        In threaded mode this only waits for the previous flush to finish and
+        queues the frame for the worker.
+        """
+        lo = self._dirty_lo
+        hi = self._dirty_hi
+        if lo >= hi:
+            self.last_show_us = 0
+            return
+        t0 = time.ticks_us()
+        self._dirty_lo = self.height
+        self._dirty_hi = 0
+
+        if not self._threaded:
+            self._flush(self.buffer, self._pages, self._view, lo, hi)
+        else:
+            self._idle.acquire()            # worker is done with _front
+            self._front[:] = self.buffer
+            self._pending_lo = lo
+            self._pending_hi = hi
+            self._ready.release()           # hand the frame over
+        self.last_show_us = time.ticks_diff(time.ticks_us(), t0)
+
+    def _flush(self, buf, pages, view, lo, hi):
+        """
+        Transmit the changed pages lo .. hi-1 of buf, with CS held low from
+        the first one to the end. pages holds a memoryview of each page of
+        buf and view one of all of it (used by bulk_write runs).
+        """
+        force = not self._shadow_valid
+        self._shadow_valid = True
+        page_bytes = self._page_bytes
+        shadow = self._shadow
+        sync_page = self._sync_page
+        bulk = self.bulk_write and self.rotate == 180
+        selected = False
+        run = -1            # first page of the run not sent yet (bulk_write)
+        for page in range(lo, hi):
+            if not sync_page(buf, shadow, page * page_bytes, page_bytes) and not force:
+                if run >= 0:
+                    self._send(run, pages[run] if page - run == 1
+                               else view[run * page_bytes:page * page_bytes], cmd)
+                    cmd = self._addr_col
+                    run = -1
+                continue
+            if not selected:
+                self.cs(1); self.cs(0)
+                selected = True
+                cmd = self._addr
+            if not bulk:
+                self._send(page, pages[page], cmd)
+                cmd = self._addr_col
+            elif run < 0:
+                run = page
+        if run >= 0:
+            self._send(run, pages[run] if hi - run == 1
+                       else view[run * page_bytes:hi * page_bytes], cmd)
+        if selected:
+            self.cs(1)
+
+    def _send(self, page, data, cmd):
+        """
+        Address the column of page and send data, inside _flush()'s
+        transaction. cmd is _addr or its column-only tail _addr_col.
+        """
+        column = page if self.rotate == 180 else (63 - page)
+        addr = self._addr
+        addr[1] = column & 0x0F
+        addr[2] = 0x10 | (column >> 4)
+        self.dc(0)
+        self.spi.write(cmd)
+        self.dc(1)
+        self.spi.write(data)
+
+    def start_flush_worker(self):
+        """
+        Switch to threaded mode and start the flush worker on core 1.
+        Stays synchronous if threads are unavailable or core 1 is taken.
+        """
+        if self._threaded or _thread is None:
+            return self._threaded
+        self._front = bytearray(len(self.buffer))
+        self._front_pages = self._page_views(self._front)
+        self._front_view = memoryview(self._front)
+        self._pending_lo = 0
+        self._pending_hi = 0
+        self._idle = _thread.allocate_lock()
+        self._ready = _thread.allocate_lock()
+        self._ready.acquire()
+        self._worker_running = True
+        try:
+            _thread.start_new_thread(self._flush_worker, ())
+        except Exception as e:
+            print("Flush worker unavailable, using synchronous show():", e)
+            self._front = None
+            self._front_pages = None
+            self._front_view = None
+            return False
+        self._threaded = True
+        return True
+
+    def stop_flush_worker(self):
+        """Finish the pending flush, stop the worker and go back to synchronous mode."""
+        if not self._threaded:
+            return
+        self._idle.acquire()
+        self._threaded = False
+        self._worker_running = False
+        self._ready.release()           # wake the worker so it can exit
+        self._idle.acquire()            # worker releases _idle on its way out
+        self._idle.release()
+        self._front = None
+        self._front_pages = None
+        self._front_view = None
+
+    def wait_flush(self):
+        """Block until the worker has finished sending the last queued frame."""
+        if self._threaded:
+            self._idle.acquire()
+            self._idle.release()
+
+    def _flush_worker(self):
+        while True:
+            self._ready.acquire()
+            if not self._worker_running:
+                self._idle.release()
+                return
+            try:
+                self._flush(self._front, self._front_pages, self._front_view,
+                            self._pending_lo, self._pending_hi)
+            except Exception as e:
+                print("Flush error:", e)
+            self._idle.release()
 
     def set_invert(self, invert):
         """Set the display to inverted mode using a hardware command."""
+        self.wait_flush()  # keep commands off the bus while the worker is sending
         if invert:
             self.write_cmd(0xa7)  # Inverted display
         else:
@@ -0,0 +1,316 @@
+from array import array
+import os
+import utime as time
+
+# ---------------- File format ----------------
+# A log file is a sequence of BLOCK_SIZE blocks, one flash page each. Every
+# block stands on its own, so a block torn by a power cut only loses itself:
+#
+#   magic 'D' 'L', version, record count, used bytes (u16 LE), records...,
+#   0xFF padding (the erased flash value) up to BLOCK_SIZE.
+#
+# A record is NUM_FIELDS zigzag varints, each the difference from the same
+# field of the previous record in the block (from 0 for the first record).
+# Fields, in order: tick_ms, voltage_dv, current_ma, rpm, duty, throttle,
+# flags, distance_umi. tick_ms deltas use ticks_diff(), so they survive the
+# 2**30 wrap; flags holds eco (bit 0) and the timer state (bits 1-2).
+# dishost/datalog.py decodes these files on the host.
+MAGIC0 = 0x44       # 'D'
+MAGIC1 = 0x4C       # 'L'
+VERSION = 1
+HEADER_LEN = 6
+BLOCK_SIZE = 512
+NUM_FIELDS = 8
+RECORD_MAX = NUM_FIELDS * 5     # worst case, every field a 32-bit varint
+RECORD_ARGS = 9                 # append()'s arguments, as RecordQueue stores them
+
+FLAG_ECO = 0x01
+TIMER_SHIFT = 1        # the code is racestate's TIMER_* value
+
+class DataLogger:
+    """
+    Appends telemetry samples to rotating binary files on flash.
+
+    append() packs a record into a preallocated batch of page-sized blocks
+    and never touches the filesystem. flush(budget_us) writes whole blocks
+    until the next one would not fit in the budget, so it can run between
+    frames without stalling rendering. When every block in the batch is
+    waiting to be written, new samples are dropped and counted.
+    """
+    def __init__(self, directory="log", prefix="race", batch_blocks=4,
+                 max_file_bytes=256 * 1024, max_files=8, max_age_ms=5000):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes - max_file_bytes % BLOCK_SIZE
+        self.max_files = max_files
+        self.max_age_ms = max_age_ms     # a partial block older than this is written anyway
+
+        # Batch buffer: batch_blocks blocks used as a ring. _fill is the block
+        # being appended to; blocks from _head up to _fill are sealed and wait
+        # for flush(). Views are made once so writing never slices.
+        self._batch = bytearray(batch_blocks * BLOCK_SIZE)
+        mv = memoryview(self._batch)
+        self._views = [mv[i * BLOCK_SIZE:(i + 1) * BLOCK_SIZE] for i in range(batch_blocks)]
+        self._nblocks = batch_blocks
+        self._head = 0          # oldest sealed block
+        self._sealed = 0        # sealed blocks waiting for flush
+        self._fill = 0          # block being filled
+        self._pos = HEADER_LEN  # write offset inside the fill block
+        self._count = 0         # records in the fill block
+        self._opened_ms = 0     # when the fill block got its first record
+        self._prev = [0] * NUM_FIELDS
+        self._start_block(0)
+
+        self._file = None
+        self._file_bytes = 0
+        self.file_index = -1
+        self.path = None
+
+        self.records = 0
+        self.dropped = 0            # samples lost because the batch was full
+        self.blocks_written = 0
+        self.bytes_written = 0
+        self.block_us_max = 0       # slowest single block write seen
+        self._block_us_est = 0      # decaying peak, used to plan flushes
+        self.over_budget = 0        # flushes that had to exceed the budget
+        self.errors = 0
+
+    # ---------------- Packing ----------------
+
+    def _start_block(self, b):
+        base = b * BLOCK_SIZE
+        buf = self._batch
+        for i in range(base, base + BLOCK_SIZE):
+            buf[i] = 0xFF
+        buf[base] = MAGIC0
+        buf[base + 1] = MAGIC1
+        buf[base + 2] = VERSION
+        self._pos = HEADER_LEN
+        self._count = 0
+        prev = self._prev
+        for i in range(NUM_FIELDS):
+            prev[i] = 0
+
+    def _seal(self):
+        """Finish the fill block and start the next one, if there is room."""
+        base = self._fill * BLOCK_SIZE
+        buf = self._batch
+        buf[base + 3] = self._count
+        buf[base + 4] = self._pos & 0xFF
+        buf[base + 5] = self._pos >> 8
+        self._sealed += 1
+        self._fill = (self._fill + 1) % self._nblocks
+        if self._sealed < self._nblocks:
+            self._start_block(self._fill)
+
+    def _put(self, field, value):
+        prev = self._prev
+        if field == 0:
+            d = time.ticks_diff(value, prev[0]) if self._count else value
+        else:
+            d = value - prev[field]
+        prev[field] = value
+        v = d << 1 if d >= 0 else ((-d) << 1) - 1
+        buf = self._batch
+        p = self._fill * BLOCK_SIZE + self._pos
+        while v >= 0x80:
+            buf[p] = (v & 0x7F) | 0x80
+            v >>= 7
+            p += 1
+        buf[p] = v
+        self._pos = p + 1 - self._fill * BLOCK_SIZE
+
+    def append(self, tick_ms, voltage_dv, current_ma, rpm, duty, throttle, eco,
+               distance_umi, timer_state):
+        """
+        Add one sample; timer_state is a racestate TIMER_* value. Returns
+        False if it was dropped (batch full).
+        """
+        if self._sealed >= self._nblocks:
+            self.dropped += 1
+            return False
+        if self._pos + RECORD_MAX > BLOCK_SIZE or self._count == 255:
+            self._seal()
+            if self._sealed >= self._nblocks:
+                self.dropped += 1
+                return False
+        if not self._count:
+            self._opened_ms = time.ticks_ms()
+
+        flags = FLAG_ECO if eco else 0
+        flags |= (timer_state & 0x03) << TIMER_SHIFT
+        self._put(0, tick_ms)
+        self._put(1, voltage_dv)
+        self._put(2, current_ma)
+        self._put(3, rpm)
+        self._put(4, duty)
+        self._put(5, throttle)
+        self._put(6, flags)
+        self._put(7, distance_umi)
+        self._count += 1
+        self.records += 1
+        return True
+
+    # ---------------- Writing ----------------
+
+    def pending(self):
+        """Sealed blocks waiting to be written."""
+        return self._sealed
+
+    def flush(self, budget_us=5000, seal=False):
+        """
+        Write sealed blocks while the next one is expected to fit in budget_us
+        (None = no limit). A partial block is sealed first if it is older than
+        max_age_ms, or if seal is set (e.g. when the timer stops). If the
+        batch is full, one block is written even over budget so the logger
+        keeps up.
+        """
+        t0 = time.ticks_us()
+        if self._count and self._sealed < self._nblocks and (
+                seal or time.ticks_diff(time.ticks_ms(), self._opened_ms) >= self.max_age_ms):
+            self._seal()
+
+        wrote = False
+        while self._sealed:
+            elapsed = time.ticks_diff(time.ticks_us(), t0)
+            if budget_us is not None and elapsed + self._block_us_est > budget_us:
+                if wrote or self._sealed < self._nblocks:
+                    break
+                self.over_budget += 1
+            t1 = time.ticks_us()
+            if not self._write_block(self._views[self._head]):
+                break
+            dt = time.ticks_diff(time.ticks_us(), t1)
+            if dt > self.block_us_max:
+                self.block_us_max = dt
+            # An occasional slow write (a flash erase) should not block
+            # flushing for good, so the estimate decays back down.
+            est = self._block_us_est
+            self._block_us_est = dt if dt > est else est - (est >> 3)
+            wrote = True
+            was_full = self._sealed >= self._nblocks
+            self._head = (self._head + 1) % self._nblocks
+            self._sealed -= 1
+            if was_full:
+                # The fill block was waiting for this slot.
+                self._start_block(self._fill)
+        if wrote and self._file is not None:
+            self._file.flush()
+
+    def _write_block(self, view):
+        try:
+            if self._file is None or self._file_bytes + BLOCK_SIZE > self.max_file_bytes:
+                self._rotate()
+            self._file.write(view)
+        except OSError as e:
+            self.errors += 1
+            print("Log write failed:", e)
+            self._close()
+            return False
+        self._file_bytes += BLOCK_SIZE
+        self.blocks_written += 1
+        self.bytes_written += BLOCK_SIZE
+        return True
+
+    # ---------------- Files ----------------
+
+    def _log_files(self):
+        """Indices of this logger's files in the directory, oldest first."""
+        head = self.prefix + "_"
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith(head) and name.endswith(".bin"):
+                try:
+                    found.append(int(name[len(head):-4]))
+                except ValueError:
+                    pass
+        found.sort()
+        return found
+
+    def _name(self, index):
+        return f"{self.directory}/{self.prefix}_{index:04d}.bin"
+
+    def _rotate(self):
+        """Close the current file and open the next one, deleting the oldest past max_files."""
+        self._close()
+        try:
+            os.mkdir(self.directory)
+        except OSError:
+            pass    # already there
+        existing = self._log_files()
+        if self.file_index < 0:
+            self.file_index = existing[-1] + 1 if existing else 0
+        else:
+            self.file_index += 1
+        while len(existing) >= self.max_files:
+            os.remove(self._name(existing.pop(0)))
+        self.path = self._name(self.file_index)
+        self._file = open(self.path, "wb")
+        self._file_bytes = 0
+
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def close(self):
+        """Write everything still buffered and close the file."""
+        self.flush(budget_us=None, seal=True)
+        self._close()
+
+    def summary(self):
+        return (f"Log {self.records} rec, {self.blocks_written} blk, pending {self._sealed},"
+                f" dropped {self.dropped}, blk max {self.block_us_max}us")
+
+
+class RecordQueue:
+    """
+    Samples on their way to a DataLogger, each with the distance and timer
+    state it was integrated at, from the code that integrates the race to
+    the one that owns the logger (core 1 to core 0 with DUAL_CORE). One
+    producer, one consumer; a record put on a full queue is dropped and
+    counted.
+    """
+    def __init__(self, size=32):
+        self._rec = array("i", [0] * (size * RECORD_ARGS))
+        self._idx = array("i", [0, 0])  # head (producer), tail (consumer)
+        self._mask = size - 1           # size must be a power of two
+        self.dropped = 0
+
+    def put(self, tick_ms, voltage_dv, current_ma, rpm, duty, throttle, eco,
+            distance_umi, timer_state):
+        """Queue the arguments of one DataLogger.append() call."""
+        idx = self._idx
+        h = idx[0]
+        n = (h + 1) & self._mask
+        if n == idx[1]:
+            self.dropped += 1
+            return
+        r = self._rec
+        p = h * RECORD_ARGS
+        r[p] = tick_ms
+        r[p + 1] = voltage_dv
+        r[p + 2] = current_ma
+        r[p + 3] = rpm
+        r[p + 4] = duty
+        r[p + 5] = throttle
+        r[p + 6] = eco
+        r[p + 7] = distance_umi
+        r[p + 8] = timer_state
+        idx[0] = n          # publish after the slot is written
+
+    def drain(self, logger):
+        """Append every queued record to logger, oldest first; returns how many."""
+        idx = self._idx
+        r = self._rec
+        count = 0
+        while idx[1] != idx[0]:
+            p = idx[1] * RECORD_ARGS
+            logger.append(r[p], r[p + 1], r[p + 2], r[p + 3], r[p + 4], r[p + 5], r[p + 6],
+                          r[p + 7], r[p + 8])
+            idx[1] = (idx[1] + 1) & self._mask
+            count += 1
+        return count
@@ -0,0 +1,152 @@
+import math
+import utime as time
+
+# Units: speed in milli-mph, power in milliwatts, distance in micro-miles,
+# times in ms with a us remainder. Every intermediate stays below 2**30 so
+# it is a MicroPython small int and never touches the heap.
+US_PER_MIN = 60_000_000
+_MAX_STEP_US = 250_000      # rpm * step must stay a small int up to ~4000 rpm
+_MAX_TARGET_MMPH = 999_999
+
+class DerivedValues:
+    """
+    Speed, power, distance, elapsed time and target speed in fixed point.
+
+    Distance is integrated as whole wheel revolutions plus a remainder in
+    rpm*us, so it is exact for the rpm samples it was given: nothing is
+    rounded away between calls and a long race does not drift. The speed of
+    each interval is the rpm that was current at its start (zero-order
+    hold), and the integration uses us ticks, not ms. Convert to display
+    units (floats) only when rendering.
+
+    With a pace table (pacing.PaceTable) the target speed is looked up by
+    distance and elapsed time instead of dividing what is left evenly.
+    """
+    def __init__(self, wheel_diameter_in, goal_distance_mi, goal_time_s, now_us=None, pace=None):
+        circ_in = math.pi * wheel_diameter_in
+        # Per-revolution constants, fixed once here
+        self._mmph_q10 = int(circ_in * 60 * 1000 / 63360 * 1024 + 0.5)    # mmph per rpm, Q10
+        umi_per_rev = circ_in * 1000000 / 63360
+        self._umi_rev = int(umi_per_rev)                                  # whole umi per rev
+        self._umi_rev_q12 = int((umi_per_rev - self._umi_rev) * 4096 + 0.5)
+        self._umi_rev_q4 = int(umi_per_rev * 16 + 0.5)                    # for the partial rev
+
+        self.goal_umi = int(goal_distance_mi * 1000000 + 0.5)
+        self.goal_ms = int(goal_time_s * 1000)
+
+        self.rpm = 0
+        self.mmph = 0
+        self.power_mw = 0
+        self.running = False
+        self.elapsed_ms = 0
+        self._elapsed_us = 0    # sub-ms remainder
+        self._revs = 0
+        self._rev_acc = 0       # partial revolution, rpm*us (< US_PER_MIN)
+        self.distance_umi = 0
+        self.remaining_umi = self.goal_umi
+        self.remaining_ms = self.goal_ms
+        self.target_mmph = 0
+        self.pace = pace
+        self.last_us = time.ticks_us() if now_us is None else now_us
+
+    # ---------------- Integration ----------------
+
+    def _advance(self, now_us):
+        """Integrate from last_us to now_us at the current rpm."""
+        dt = time.ticks_diff(now_us, self.last_us)
+        if dt < 0:
+            # A sample that arrived before the last update (say, a timer
+            # start): it only sets the rpm from here on.
+            return
+        self.last_us = now_us
+        if not dt or not self.running:
+            return
+        us = self._elapsed_us + dt
+        ms = us // 1000
+        self.elapsed_ms += ms
+        self._elapsed_us = us - ms * 1000
+
+        rpm = self.rpm
+        if rpm > 0:
+            acc = self._rev_acc
+            while dt > 0:
+                step = dt if dt < _MAX_STEP_US else _MAX_STEP_US
+                acc += rpm * step
+                dt -= step
+                if acc >= US_PER_MIN:
+                    revs = acc // US_PER_MIN
+                    self._revs += revs
+                    acc -= revs * US_PER_MIN
+            self._rev_acc = acc
+
+    def _refresh(self):
+        revs = self._revs
+        self.distance_umi = (revs * self._umi_rev + ((revs * self._umi_rev_q12) >> 12)
+                             + (self._rev_acc // 1000) * self._umi_rev_q4 // 960000)
+
+        rem = self.goal_umi - self.distance_umi
+        self.remaining_umi = rem if rem > 0 else 0
+        t = self.goal_ms - self.elapsed_ms
+        if t < 1:
+            t = 1
+        self.remaining_ms = t
+        if self.pace is not None:
+            self.target_mmph = (self.pace.target_mmph(self.distance_umi, self.elapsed_ms)
+                                if self.remaining_umi else 0)
+            return
+        # target = remaining_umi * 3600 / t mmph, split so nothing overflows
+        a = self.remaining_umi * 36
+        q = a // t
+        if q >= _MAX_TARGET_MMPH // 100:
+            self.target_mmph = _MAX_TARGET_MMPH
+        else:
+            self.target_mmph = q * 100 + (a - q * t) * 100 // t
+
+    # ---------------- Updates ----------------
+
+    def update(self, now_us, rpm, voltage_dv, current_ma):
+        """
+        Integrate up to now_us, then take the latest sample. Passing each
+        queued sample with its arrival time (uartrx.SampleQueue) changes
+        the rpm exactly when the controller reported it.
+        """
+        self._advance(now_us)
+        self.rpm = rpm
+        self.mmph = (rpm * self._mmph_q10) >> 10
+        self.power_mw = voltage_dv * current_ma // 10
+        self._refresh()
+
+    def start(self, now_us):
+        self._advance(now_us)
+        self.running = True
+
+    def stop(self, now_us):
+        self._advance(now_us)
+        self.running = False
+        self._refresh()
+
+    def reset(self, now_us):
+        self._advance(now_us)
+        self.running = False
+        self.elapsed_ms = 0
+        self._elapsed_us = 0
+        self._revs = 0
+        self._rev_acc = 0
+        self._refresh()
+
+    # ---------------- Display units (render time only) ----------------
+
+    def elapsed_us(self):
+        return self.elapsed_ms * 1000 + self._elapsed_us
+
+    def mph(self):
+        return self.mmph / 1000
+
+    def target_mph(self):
+        return self.target_mmph / 1000
+
+    def distance_mi(self):
+        return self.distance_umi / 1000000
+
+    def elapsed_s(self):
+        return self.elapsed_ms / 1000
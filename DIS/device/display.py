@@ -1,7 +1,51 @@
 from writer import Writer
-from fonts import font_digits_large, font_digits_med, font_letters_large
+from binfont import BinFont, font_path
+from racestate import TIMER_RUNNING, TIMER_PAUSED
+import framebuf
 import time
 
+# Shared one-character strings so slot memo updates never allocate.
+_DIGITS = ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9")
+
+# Rows taken by the digit slots, in every layout (the large digits are 48
+# rows tall, the time digits end at row 45).
+NUMBER_H = 48
+
+# Draw with the precompiled fonts/*.fnt files (python -m dishost.fontpack).
+# They give the same pixels as the font_to_py modules, which are only
+# imported when this is off or a file is missing.
+FONT_FILES = True
+# Glyph cache budget of each .fnt font (BinFont max_bytes). A glyph is kept
+# once per x phase it is drawn at, so every digit in every slot would take
+# 19920 bytes for font_digits_large where the module path's Writer cache
+# needs 4320. Together these stay within the module path's 3 x 3072 bytes;
+# glyphs beyond them are read back from flash.
+FNT_CACHE_BYTES = {
+    "font_digits_large": 4096,
+    "font_digits_med": 3072,
+    "font_letters_large": 2048,
+}
+
+def load_font(name):
+    if FONT_FILES:
+        try:
+            return BinFont(font_path(name), FNT_CACHE_BYTES[name])
+        except (OSError, ValueError) as e:
+            print("Font file for", name, "unavailable, using the module:", e)
+    return __import__("fonts." + name, None, None, (name,))
+
+# Alert frames kept by prerender_alert() / the first show of an alert. Once
+# this many are cached, other alerts are drawn into the scratch frame.
+ALERT_CACHE = 4
+
+class _Frame(framebuf.FrameBuffer):
+    """An off-screen frame the size of the panel, for Writer to draw into."""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.buffer = bytearray(width * height // 8)
+        super().__init__(self.buffer, width, height, framebuf.MONO_HMSB)
+
 class DisplayManager:
     def __init__(self, oled_driver):
         self.oled = oled_driver
@@ -9,12 +53,11 @@ class DisplayManager:
         self.height = oled_driver.height
 
         # --- Custom Font Writers ----
-        self.w_digits_large = Writer(self.oled, font_digits_large, verbose=False)
-        self.w_digits_med = Writer(self.oled, font_digits_med, verbose=False)
-        self.w_letters_big = Writer(self.oled, font_letters_large, verbose=False)
-
-        self.w_digits_large.set_wrap(False)
-        self.w_digits_med.set_wrap(False)
+        # Loaded the first time a screen draws with them (see the properties
+        # below), so boot only pays for the font the first frame uses.
+        self._w_digits_large = None
+        self._w_digits_med = None
+        self._w_letters_big = None
 
         # ---- Precompute fixed slot positions for DD.D ----
         self._big_slot_x0 = 9  # tens
@@ -23,78 +66,219 @@ class DisplayManager:
         self._big_slot_x2 = 93  # tenths
         self._big_slot_y = 0
 
-        # ---- Precompute fixed slot positions for MM:SS ----
-        dmed = self.w_digits_med.stringlen("0")
-        colon_w = self.w_digits_med.stringlen(":")
-        x0m = -4
-        self._time_x_m10 = x0m
-        self._time_x_m1 = self._time_x_m10 + dmed - 4
-        self._time_x_colon = self._time_x_m1 + dmed - 4
-        self._time_x_s10 = self._time_x_colon + colon_w - 22
-        self._time_x_s1 = self._time_x_s10 + dmed - 4
-        self._time_y = 5
+        # ---- Slot layouts: (x, y) per character, drawn left to right ----
+        y = self._big_slot_y
+        self._big_slots = ((self._big_slot_x0, y), (self._big_slot_x1, y),
+                           (self._big_slot_xdot, y), (self._big_slot_x2, y))
+        self._time_slots = None     # needs the medium font's widths; see w_digits_med
+        y = self._big_slot_y
+        self._dist_slots = ((0, y), (14, y), (53, y), (91, y))
+
+        # ---- Regions (x, y, w, h) each layout draws into, for ScreenRegistry ----
+        w = self.width
+        number = (0, 0, w, NUMBER_H)                  # digit slots of every layout
+        eco = (0, self.height - 12, w, 1)             # eco line
+        status = (0, self.height - 9, 40, 9)          # "U" and the REC box
+        self.large_regions = (number, eco, status)
+        self.time_regions = (number, status)
+        self.distance_regions = (number,)
+
+        # ---- Slot memo: which glyph each slot of the current layout shows ----
+        self._slot_layout = None   # layout the memo belongs to; None = invalid
+        self._slot_chars = [None] * 5
+        self._slot_next = [None] * 5
 
         #--------- Alert State ----------------
         self._msg_top = None
         self._msg_bottom = None
         self._msg_until = 0  # ms timestamp; 0 means no active message
+        self._msg_new = False       # set by show_alert(), cleared once flushed
+        # Alert frames are rendered off screen, once, and copied over the
+        # frame; the frame they cover is saved and put back afterwards.
+        self._alerts = {}           # (top, bottom) -> rendered frame
+        self._alert_scratch = None  # _Frame, created with the first alert
+        self._w_alert = None
+        self._saved = None          # screen frame under the alert
+        self._saved_invert = False
+        self._alert_shown = False   # the alert frame is in the framebuffer
+        self.alert_flushes = 0
         self._is_inverted = False
         self._screen_changed = True
 
+    # ---- Font writers, created on first use ----
+
+    @property
+    def w_digits_large(self):
+        w = self._w_digits_large
+        if w is None:
+            w = self._w_digits_large = Writer(self.oled, load_font("font_digits_large"), verbose=False)
+            w.set_wrap(False)
+        return w
+
+    @property
+    def w_digits_med(self):
+        w = self._w_digits_med
+        if w is None:
+            w = self._w_digits_med = Writer(self.oled, load_font("font_digits_med"), verbose=False)
+            w.set_wrap(False)
+
+            # ---- Fixed slot positions for MM:SS ----
+            dmed = w.stringlen("0")
+            colon_w = w.stringlen(":")
+            x0m = -4
+            self._time_x_m10 = x0m
+            self._time_x_m1 = self._time_x_m10 + dmed - 4
+            self._time_x_colon = self._time_x_m1 + dmed - 4
+            self._time_x_s10 = self._time_x_colon + colon_w - 22
+            self._time_x_s1 = self._time_x_s10 + dmed - 4
+            self._time_y = 5
+            y = self._time_y
+            self._time_slots = ((self._time_x_m10, y), (self._time_x_m1, y),
+                                (self._time_x_colon, y - 7),
+                                (self._time_x_s10, y), (self._time_x_s1, y))
+        return w
+
+    @property
+    def w_letters_big(self):
+        w = self._w_letters_big
+        if w is None:
+            w = self._w_letters_big = Writer(self.oled, load_font("font_letters_large"), verbose=False)
+        return w
+
+    # ---- Visible values as ints, for comparing frames without drawing ----
+
+    @staticmethod
+    def num_key(num):
+        """What draw_large_num() shows for num, as DD.D * 10."""
+        if num < 0: num = 0.0
+        if num > 99.9: num = 99.9
+        return int(num) * 10 + int((num * 10) % 10)
+
+    @staticmethod
+    def milli_key(milli):
+        """num_key() for a value in thousandths (e.g. milli-mph), without floats."""
+        if milli < 0: return 0
+        key = milli // 100
+        return key if key < 999 else 999
+
+    @staticmethod
+    def time_key(seconds):
+        """What draw_time() shows for seconds, as whole seconds."""
+        if seconds < 0: seconds = 0
+        total = int(seconds)
+        return total if total < 99 * 60 + 59 else 99 * 60 + 59
+
+    @staticmethod
+    def distance_key(distance):
+        """What draw_demo_distance() shows, in thousandths of a mile."""
+        return max(0, min(int(distance * 1000), 999))
+
     def _set_inversion(self, invert):
         """Internal helper to manage hardware inversion state."""
         if invert != self._is_inverted:
             self.oled.set_invert(invert)
             self._is_inverted = invert
+            self._slot_layout = None
 
     def screen_changed(self):
         """Signals that the screen has changed and a full redraw is needed."""
         self._screen_changed = True
+        self._slot_layout = None
+
+    def needs_redraw(self):
+        """True until a draw_* call or restore() has repainted the whole frame."""
+        return self._screen_changed
+
+    def draw_label(self, label, fb=None):
+        """Draw a screen label in the bottom right corner of fb (default: the display)."""
+        if fb is None:
+            fb = self.oled
+        fb.text(label, self.width - len(label) * 8, self.height - 8, 1)
+
+    def restore(self, static):
+        """Replace the whole frame with a pre-rendered static layer (one copy)."""
+        self.oled.buffer[:] = static
+        self.oled.mark_dirty()
+        self._screen_changed = False
+        self._slot_layout = None
+
+    def show_regions(self, regions):
+        """Flush the rows of regions, as drawn by one of the paint_* methods."""
+        oled = self.oled
+        for r in regions:
+            oled.mark_dirty(r[1], r[3])
+        oled.show()
+        self._screen_changed = False
+
+    def _clear_with_label(self, label):
+        self.oled.fill(0)
+        self.oled.mark_dirty()
+        self.draw_label(label)
+
+    def _draw_slots(self, writer, slots, area_h):
+        """
+        Print self._slot_next[i] into slots[i], skipping slots that already
+        show that character. Glyphs overlap their right-hand neighbour, so
+        once one slot changes every slot after it is repainted too, in the
+        same order as a full redraw. None leaves a slot blank.
+        """
+        memo = self._slot_chars
+        chars = self._slot_next
+        n = len(slots)
+        if self._slot_layout is not slots:
+            # Unknown contents: clear the whole number area and draw all slots.
+            self.oled.fill_rect(0, 0, self.width, area_h, 0)
+            self.oled.mark_dirty(0, area_h)
+            self._slot_layout = slots
+            first = 0
+        else:
+            first = n
+            for i in range(n):
+                if memo[i] is not chars[i]:
+                    first = i
+                    break
+
+        w = writer.font.max_width()
+        h = writer.height
+        for i in range(first, n):
+            x, y = slots[i]
+            c = chars[i]
+            self.oled.fill_rect(x, y, w, h, 0)
+            self.oled.mark_dirty(y, h)
+            if c is not None:
+                writer.set_textpos(x, y)
+                writer.printstring(c)
+            memo[i] = c
 
     def draw_large_num(self, num, label, uart_blink, timer_state, invert=False, eco=False):
         """
         Draw speed as fixed DD.D using precomputed slots.
         Set invert=True to flip colors before showing.
         """
-        self._set_inversion(invert)
+        self.draw_large_key(self.num_key(num), label, uart_blink, timer_state, invert, eco)
 
+    def draw_large_key(self, key, label, uart_blink, timer_state, invert=False, eco=False):
+        """draw_large_num() for a num_key()/milli_key() value (DD.D * 10)."""
         if self._screen_changed:
-            self.oled.fill(0)
-            label_x = self.width - len(label) * 8
-            label_y = self.height - 8
-            self.oled.text(label, label_x, label_y, 1)
+            self._clear_with_label(label)
+        self.paint_large_key(key, uart_blink, timer_state, invert, eco)
+        self.show_regions(self.large_regions)
 
-        # Clamp range
-        if num < 0: num = 0.0
-        if num > 99.9: num = 99.9
+    def paint_large_key(self, key, uart_blink, timer_state, invert=False, eco=False):
+        """The changing parts of draw_large_key(), inside large_regions, without show()."""
+        self._set_inversion(invert)
 
-        int_part = int(num)
-        tenths = int((num * 10) % 10)
-        ones = int_part % 10
-        tens = int_part // 10
+        tenths = key % 10
+        ones = (key // 10) % 10
+        tens = key // 100
 
         # --- DYNAMIC: Number Area ---
-        number_height = self.w_digits_large.height
-        self.oled.fill_rect(0, 0, self.width, number_height, 0)
-
-        y = self._big_slot_y
-
-        # Tens digit (only if >= 10.0)
-        if tens > 0:
-            self.w_digits_large.set_textpos(self._big_slot_x0, y)
-            self.w_digits_large.printstring(str(tens))
-
-        # Ones digit
-        self.w_digits_large.set_textpos(self._big_slot_x1, y)
-        self.w_digits_large.printstring(str(ones))
-
-        # Decimal point
-        self.w_digits_large.set_textpos(self._big_slot_xdot, y)
-        self.w_digits_large.printstring(".")
-
-        # Tenths digit
-        self.w_digits_large.set_textpos(self._big_slot_x2, y)
-        self.w_digits_large.printstring(str(tenths))
+        chars = self._slot_next
+        chars[0] = _DIGITS[tens] if tens > 0 else None  # tens only if >= 10.0
+        chars[1] = _DIGITS[ones]
+        chars[2] = "."
+        chars[3] = _DIGITS[tenths]
+        self._draw_slots(self.w_digits_large, self._big_slots, self.w_digits_large.height)
 
         # --- DYNAMIC: Status Area ---
         self.draw_status(uart_blink, timer_state)
@@ -104,27 +288,21 @@ class DisplayManager:
         self.oled.hline(0, eco_line_y, self.width, 0)
         if eco:
             self.oled.line(0, eco_line_y, self.width, eco_line_y, 1)
-
-        self.oled.show()
-        self._screen_changed = False
+        self.oled.mark_dirty(eco_line_y, 1)
 
     def draw_time(self, seconds, label, uart_blink, timer_state):
         """
         Draw elapsed time as MM:SS using the medium digit font.
         """
-        self._set_inversion(False)
         if self._screen_changed:
-            self.oled.fill(0)
-            label_x = self.width - len(label) * 8
-            label_y = self.height - 8
-            self.oled.text(label, label_x, label_y, 1)
-
-        if seconds < 0: seconds = 0
-        total = int(seconds)
-
-        max_total = 99 * 60 + 59
-        if total > max_total: total = max_total
+            self._clear_with_label(label)
+        self.paint_time(seconds, uart_blink, timer_state)
+        self.show_regions(self.time_regions)
 
+    def paint_time(self, seconds, uart_blink, timer_state):
+        """The changing parts of draw_time(), inside time_regions, without show()."""
+        self._set_inversion(False)
+        total = self.time_key(seconds)
         mins = total // 60
         secs = total % 60
 
@@ -134,95 +312,108 @@ class DisplayManager:
         s1 = secs % 10
 
         # --- DYNAMIC: Time Area ---
-        time_height = self.w_digits_med.height
-        self.oled.fill_rect(0, 0, self.width, time_height, 0)
-
-        y = self._time_y
-
-        # Minutes (tens and ones)
-        self.w_digits_med.set_textpos(self._time_x_m10, y)
-        self.w_digits_med.printstring(str(m10))
-        self.w_digits_med.set_textpos(self._time_x_m1, y)
-        self.w_digits_med.printstring(str(m1))
-
-        # Colon
-        self.w_digits_med.set_textpos(self._time_x_colon, y - 7)
-        self.w_digits_med.printstring(":")
-
-        # Seconds (tens and ones)
-        self.w_digits_med.set_textpos(self._time_x_s10, y)
-        self.w_digits_med.printstring(str(s10))
-        self.w_digits_med.set_textpos(self._time_x_s1, y)
-        self.w_digits_med.printstring(str(s1))
+        chars = self._slot_next
+        chars[0] = _DIGITS[m10]
+        chars[1] = _DIGITS[m1]
+        chars[2] = ":"
+        chars[3] = _DIGITS[s10]
+        chars[4] = _DIGITS[s1]
+        writer = self.w_digits_med     # sets up _time_slots on first use
+        self._draw_slots(writer, self._time_slots, writer.height)
 
         # --- DYNAMIC: Status Area ---
         self.draw_status(uart_blink, timer_state)
-        self.oled.show()
-        self._screen_changed = False
 
     def draw_demo_distance(self, distance):
         """Draw distance that caps at out .999 for demo purposes only"""
-        # This screen has no other dynamic elements, so a full redraw is simpler.
-        self._set_inversion(False)
-        self.oled.fill(0)
-        distance = max(0, min(int(distance * 1000), 999))
+        self.draw_distance_key(self.distance_key(distance))
+
+    def draw_distance_key(self, distance):
+        """draw_demo_distance() for a distance_key() value (thousandths of a mile)."""
+        if self._screen_changed:
+            self._clear_with_label("MILES")
+        self.paint_distance_key(distance)
+        self.show_regions(self.distance_regions)
 
+    def paint_distance_key(self, distance):
+        """The changing parts of draw_distance_key(), inside distance_regions, without show()."""
+        self._set_inversion(False)
         n1 = distance // 100
         n2 = (distance // 10) % 10
         n3 = distance % 10
 
-        y = self._big_slot_y
-
-        self.w_digits_large.set_textpos(0, y)
-        self.w_digits_large.printstring(".")
-        self.w_digits_large.set_textpos(14, y)
-        self.w_digits_large.printstring(str(n1))
-        self.w_digits_large.set_textpos(53, y)
-        self.w_digits_large.printstring(str(n2))
-        self.w_digits_large.set_textpos(91, y)
-        self.w_digits_large.printstring(str(n3))
-
-        label = "MILES"
-        label_x = self.width - len(label) * 8
-        label_y = self.height - 8
-        self.oled.text(label, label_x, label_y, 1)
-
-        self.oled.show()
-        self._screen_changed = False
+        chars = self._slot_next
+        chars[0] = "."
+        chars[1] = _DIGITS[n1]
+        chars[2] = _DIGITS[n2]
+        chars[3] = _DIGITS[n3]
+        self._draw_slots(self.w_digits_large, self._dist_slots, self.w_digits_large.height)
 
     def draw_status(self, uart_blink, timer_state):
         """
-        Draw UART and timer indicators on the bottom row.
+        Draw UART and timer indicators on the bottom row. timer_state is a
+        racestate TIMER_* value.
         """
         y = self.height - 8
-        self.oled.fill_rect(0, y, 40, 8, 0)
+        # The REC box reaches one row above the text line, so clear that too.
+        self.oled.fill_rect(0, y - 1, 40, 9, 0)
+        self.oled.mark_dirty(y - 1, 9)
 
         if uart_blink:
             self.oled.text("U", 0, y, 1)
 
         x_rec = 11
-        if timer_state == "running":
+        if timer_state == TIMER_RUNNING:
             self.oled.fill_rect(x_rec - 1, y - 1, 26, 10, 1)
             self.oled.text("REC", x_rec, y, 0)
-        elif timer_state == "paused":
+        elif timer_state == TIMER_PAUSED:
             self.oled.text("REC", x_rec, y, 1)
 
-    def draw_alert(self, top, bottom):
+    def _render_alert(self, top, bottom):
         """
-        Draw two words in the letter font, centered.
+        Draw two words in the letter font, centered, into the scratch frame
+        and return its buffer.
         """
-        self._set_inversion(False)
-        self.oled.fill(0)
+        fb = self._alert_scratch
+        if fb is None:
+            fb = self._alert_scratch = _Frame(self.width, self.height)
+            self._w_alert = Writer(fb, self.w_letters_big.font, verbose=False)
+        w = self._w_alert
+        fb.fill(0)
         if top:
             top = top.upper()
-            x_top = max(0, (self.width - self.w_letters_big.stringlen(top)) // 2)
-            self.w_letters_big.set_textpos(x_top, 0)
-            self.w_letters_big.printstring(top)
+            w.set_textpos(max(0, (self.width - w.stringlen(top)) // 2), 0)
+            w.printstring(top)
         if bottom:
             bottom = bottom.upper()
-            x_bottom = max(0, (self.width - self.w_letters_big.stringlen(bottom)) // 2)
-            self.w_letters_big.set_textpos(x_bottom, 24)
-            self.w_letters_big.printstring(bottom)
+            w.set_textpos(max(0, (self.width - w.stringlen(bottom)) // 2), 24)
+            w.printstring(bottom)
+        return fb.buffer
+
+    def _alert_frame(self, top, bottom):
+        """The rendered frame for an alert, from the cache if it is there."""
+        key = (top, bottom)
+        frame = self._alerts.get(key)
+        if frame is None:
+            frame = self._render_alert(top, bottom)
+            if len(self._alerts) < ALERT_CACHE:
+                frame = self._alerts[key] = bytes(frame)
+        return frame
+
+    def prerender_alert(self, top, bottom):
+        """Render an alert ahead of time, so showing it is a single copy."""
+        self._alert_frame(top, bottom)
+
+    def draw_alert(self, top, bottom):
+        """
+        Draw two words in the letter font, centered, over the whole frame.
+        """
+        self._set_inversion(False)
+        self.oled.buffer[:] = self._alert_frame(top, bottom)
+        self.oled.mark_dirty()
+        # The alert wipes the whole frame; the next screen must redraw fully.
+        self._screen_changed = True
+        self._slot_layout = None
         self.oled.show()
 
     def show_alert(self, top, bottom, seconds):
@@ -234,6 +425,7 @@ class DisplayManager:
         self._msg_top = top
         self._msg_bottom = bottom
         self._msg_until = time.ticks_add(now, ms)
+        self._msg_new = True
         print(f"Alert: {top or ''} {bottom or ''}")
 
     def clear_alert(self):
@@ -241,18 +433,49 @@ class DisplayManager:
         self._msg_top = None
         self._msg_bottom = None
         self._msg_until = 0
+        self._msg_new = False
+
+    def _flush_alert(self):
+        """Save the screen under the alert, copy the alert frame over it and flush once."""
+        oled = self.oled
+        if not self._alert_shown:
+            if self._saved is None:
+                self._saved = bytearray(len(oled.buffer))
+            self._saved[:] = oled.buffer
+            self._saved_invert = self._is_inverted
+            self._alert_shown = True
+        # Not _set_inversion(): the slot memo still describes the saved frame.
+        if self._is_inverted:
+            oled.set_invert(False)
+            self._is_inverted = False
+        oled.buffer[:] = self._alert_frame(self._msg_top, self._msg_bottom)
+        oled.mark_dirty()
+        oled.show()
+        self._msg_new = False
+        self.alert_flushes += 1
+
+    def _restore_alert(self):
+        """Put back the screen the alert covered; the next screen draw flushes it."""
+        oled = self.oled
+        oled.buffer[:] = self._saved
+        oled.mark_dirty()
+        if self._saved_invert:
+            oled.set_invert(True)
+            self._is_inverted = True
+        self._alert_shown = False
 
     def update_alert(self):
         """
-        If an alert is active, draw it and return True. Otherwise, return False.
+        If an alert is active return True, after flushing its frame the
+        first time; later calls only check whether it has expired. Otherwise
+        return False, once the frame under a finished alert is restored.
         """
-        if self._msg_top is None:
-            return False
-
-        now = time.ticks_ms()
-        if time.ticks_diff(self._msg_until, now) <= 0:
+        if self._msg_top is not None:
+            if time.ticks_diff(self._msg_until, time.ticks_ms()) > 0:
+                if self._msg_new:
+                    self._flush_alert()
+                return True
             self.clear_alert()
-            return False
-
-        self.draw_alert(self._msg_top, self._msg_bottom)
-        return True
\ No newline at end of file
+        if self._alert_shown:
+            self._restore_alert()
+        return False
@@ -0,0 +1,120 @@
+from array import array
+import utime as time
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+# Core 1 publishes the race into a racestate.RaceState and the render loop
+# copies it out with copy_into(). Timer commands go the other way, render
+# core -> integrating core:
+CMD_START = 1
+CMD_STOP = 2
+CMD_RESET = 3
+# and so do DEBUG_SIMULATE_SPEED's rpm steps, so only the integrating core
+# writes the rpm:
+CMD_RPM_UP = 4
+CMD_RPM_DOWN = 5
+
+class CommandQueue:
+    """
+    Commands with the ticks_us they were given at, from one producer
+    to one consumer (possibly on the other core). Indices live in an array
+    so each side only ever stores its own. A full queue drops the command
+    and counts it.
+    """
+    def __init__(self, size=8):
+        self._code = array("i", [0] * size)
+        self._t = array("i", [0] * size)
+        self._idx = array("i", [0, 0])  # head (producer), tail (consumer)
+        self._mask = size - 1           # size must be a power of two
+        self.dropped = 0
+
+    def put(self, code, t_us):
+        idx = self._idx
+        h = idx[0]
+        n = (h + 1) & self._mask
+        if n == idx[1]:
+            self.dropped += 1
+            return
+        self._code[h] = code
+        self._t[h] = t_us
+        idx[0] = n          # publish after the slot is written
+
+    def peek_t(self):
+        """ticks_us of the oldest command, or None."""
+        idx = self._idx
+        return self._t[idx[1]] if idx[0] != idx[1] else None
+
+    def get(self):
+        """Code of the oldest command (removed), or 0. Its time is peek_t()."""
+        idx = self._idx
+        i = idx[1]
+        if i == idx[0]:
+            return 0
+        idx[1] = (i + 1) & self._mask
+        return self._code[i]
+
+
+class Core1Loop:
+    """
+    Calls step(now_us) every period_ms on core 1 until stop(). The worker
+    keeps its own counters, read with summary(); an exception in step() is
+    printed and the loop carries on. start() returns False if threads are
+    unavailable or core 1 is already in use (e.g. by the threaded flush).
+    """
+    def __init__(self, step, period_ms=2):
+        self.step = step
+        self.period_ms = period_ms
+        self.running = False
+        self.passes = 0
+        self.busy_us = 0
+        self.max_us = 0
+        self.errors = 0
+
+    def start(self):
+        if self.running or _thread is None:
+            return self.running
+        self._done = _thread.allocate_lock()
+        self._done.acquire()
+        self.running = True
+        try:
+            _thread.start_new_thread(self._run, ())
+        except Exception as e:
+            print("Core 1 unavailable:", e)
+            self.running = False
+        return self.running
+
+    def stop(self):
+        """Finish the current pass and end the worker."""
+        if not self.running:
+            return
+        self.running = False
+        self._done.acquire()
+        self._done.release()
+
+    def _run(self):
+        while self.running:
+            t0 = time.ticks_us()
+            try:
+                self.step(t0)
+            except Exception as e:
+                self.errors += 1
+                print("Core 1 error:", e)
+            dt = time.ticks_diff(time.ticks_us(), t0)
+            self.passes += 1
+            self.busy_us += dt
+            if dt > self.max_us:
+                self.max_us = dt
+            time.sleep_ms(self.period_ms)
+        self._done.release()
+
+    def reset_counts(self):
+        self.passes = 0
+        self.busy_us = 0
+        self.max_us = 0
+
+    def summary(self):
+        avg = self.busy_us // self.passes if self.passes else 0
+        return f"Core1 {self.passes} passes, avg {avg}us, max {self.max_us}us, errors {self.errors}"
@@ -0,0 +1,148 @@
+import sys
+
+# Inner loops of the display flush, glyph drawing and UART parsing. Each
+# routine has a pure-Python version here and a viper version in
+# fastpath_viper.py with the same signature and results; the viper ones are
+# used when running on MicroPython with the native emitters available, and
+# IMPL says which set was picked. Callers bind the routines once (e.g. in
+# __init__), so a differential test can swap in the py_* versions.
+#
+# Arguments that would push a routine past the emitters' four-argument
+# limit are passed in a preallocated array('i') instead.
+
+# blit_rows() parameters, array('i', BLIT_PARAMS)
+BLIT_STRIDE = 0     # destination bytes per row
+BLIT_NB = 1         # source bytes per row
+BLIT_DST = 2        # destination index of the first row's byte 0
+BLIT_SRC = 3        # source index of the first row's byte 0
+BLIT_ROWS = 4       # rows to copy
+BLIT_LO = 5         # bytes lo..hi-1 of each row are copied whole
+BLIT_HI = 6
+BLIT_M_FIRST = 7    # mask merging byte 0 of each row; 0 = byte 0 not drawn
+BLIT_M_LAST = 8     # mask merging byte nb-1; 0 = not drawn
+BLIT_PARAMS = 9
+
+# scan_line() state, array('i', SCAN_STATE)
+SCAN_POS = 0        # next byte of buf to look at
+SCAN_END = 1        # bytes available in buf
+SCAN_LEN = 2        # bytes collected in line
+SCAN_OVER = 3       # 1 if the line overflowed
+SCAN_ASCII = 4      # 1 while only printable bytes were seen
+SCAN_MAX = 5        # capacity of line
+SCAN_LF = 6         # the '\r' or '\n' skipped just before, else 0
+SCAN_STATE = 7
+
+
+def py_sync_page(buf, shadow, start, n):
+    """Copy buf[start:start+n] into shadow; return 1 if anything differed."""
+    changed = 0
+    for i in range(start, start + n):
+        b = buf[i]
+        if shadow[i] != b:
+            shadow[i] = b
+            changed = 1
+    return changed
+
+
+def py_blit_rows(dst, src, p):
+    """Copy glyph rows from src into dst as described by the BLIT_* params."""
+    stride = p[BLIT_STRIDE]
+    nb = p[BLIT_NB]
+    d = p[BLIT_DST]
+    s = p[BLIT_SRC]
+    lo = p[BLIT_LO]
+    hi = p[BLIT_HI]
+    m_first = p[BLIT_M_FIRST]
+    m_last = p[BLIT_M_LAST]
+    for _ in range(p[BLIT_ROWS]):
+        if m_first:
+            dst[d] = (dst[d] & (m_first ^ 0xFF)) | src[s]
+        for k in range(lo, hi):
+            dst[d + k] = src[s + k]
+        if m_last:
+            k = nb - 1
+            dst[d + k] = (dst[d + k] & (m_last ^ 0xFF)) | src[s + k]
+        d += stride
+        s += nb
+    return 0
+
+
+def py_scan_line(buf, line, st):
+    """
+    Collect bytes from buf into line, from st[SCAN_POS] up to st[SCAN_END],
+    until a terminator: 0x00 always, '\\n' while the line is all printable.
+    A '\\r' or '\\n' before anything was collected is a blank line and is
+    skipped. Otherwise the first byte decides: a message starting with a
+    control byte (a binary frame's COBS code byte) is binary and ends only
+    at 0x00, or at a '\\n' once it has overflowed, so a noise byte on an
+    ASCII-only link costs a few lines rather than the link. A frame's code
+    byte may itself be 0x0A or 0x0D, so the '\\r' or '\\n' skipped right
+    before a binary message stays in st[SCAN_LF] and is kept as its first
+    byte; the frame decoder tells which it was. Spaces in printable lines are dropped and
+    bytes past the capacity set the overflow flag. Returns the terminator
+    (st[SCAN_POS] is just past it) or -1 once buf is used up.
+    """
+    i = st[SCAN_POS]
+    n = st[SCAN_END]
+    ln = st[SCAN_LEN]
+    over = st[SCAN_OVER]
+    asc = st[SCAN_ASCII]
+    cap = st[SCAN_MAX]
+    lf = st[SCAN_LF]
+    term = -1
+    while i < n:
+        b = buf[i]
+        i += 1
+        if b == 0:
+            term = 0
+            break
+        if asc:
+            if b == 10 or b == 13:
+                if not ln:
+                    lf = b
+                    continue
+                if b == 10:
+                    term = 10
+                    break
+            elif b < 32 or b > 126:
+                asc = 0
+                if lf:                  # only set while nothing is collected
+                    line[0] = lf
+                    ln = 1
+            else:
+                lf = 0
+                if b == 32:
+                    continue
+        elif b == 10 and over:
+            term = 10
+            break
+        if ln < cap:
+            line[ln] = b
+            ln += 1
+        else:
+            over = 1
+    st[SCAN_POS] = i
+    st[SCAN_LEN] = ln
+    st[SCAN_OVER] = over
+    st[SCAN_ASCII] = asc
+    st[SCAN_LF] = lf
+    return term
+
+
+sync_page = py_sync_page
+blit_rows = py_blit_rows
+scan_line = py_scan_line
+IMPL = "python"
+
+# Set to False to keep the interpreted versions on the board as well.
+USE_VIPER = True
+
+if USE_VIPER and sys.implementation.name == "micropython":
+    try:
+        import fastpath_viper
+        sync_page = fastpath_viper.sync_page
+        blit_rows = fastpath_viper.blit_rows
+        scan_line = fastpath_viper.scan_line
+        IMPL = "viper"
+    except Exception as e:      # no emitter on this port or build
+        print("fastpath: using Python versions:", e)
@@ -0,0 +1,103 @@
+import micropython
+
+# Viper versions of the routines in fastpath.py; see there for what each
+# one does. Only imported on MicroPython. Indices into the parameter and
+# state arrays are the BLIT_* and SCAN_* constants of fastpath.py.
+
+@micropython.viper
+def sync_page(buf, shadow, start: int, n: int) -> int:
+    b = ptr8(buf)
+    s = ptr8(shadow)
+    changed = 0
+    i = start
+    end = start + n
+    while i < end:
+        v = b[i]
+        if s[i] != v:
+            s[i] = v
+            changed = 1
+        i += 1
+    return changed
+
+
+@micropython.viper
+def blit_rows(dst, src, params) -> int:
+    p = ptr32(params)
+    o = ptr8(dst)
+    g = ptr8(src)
+    stride = p[0]
+    nb = p[1]
+    d = p[2]
+    s = p[3]
+    rows = p[4]
+    lo = p[5]
+    hi = p[6]
+    m_first = p[7]
+    m_last = p[8]
+    last = nb - 1
+    r = 0
+    while r < rows:
+        if m_first:
+            o[d] = (o[d] & (m_first ^ 0xFF)) | g[s]
+        k = lo
+        while k < hi:
+            o[d + k] = g[s + k]
+            k += 1
+        if m_last:
+            o[d + last] = (o[d + last] & (m_last ^ 0xFF)) | g[s + last]
+        d += stride
+        s += nb
+        r += 1
+    return 0
+
+
+@micropython.viper
+def scan_line(buf, line, state) -> int:
+    st = ptr32(state)
+    b8 = ptr8(buf)
+    l8 = ptr8(line)
+    i = st[0]
+    n = st[1]
+    ln = st[2]
+    over = st[3]
+    asc = st[4]
+    cap = st[5]
+    lf = st[6]
+    term = -1
+    while i < n:
+        b = b8[i]
+        i += 1
+        if b == 0:
+            term = 0
+            break
+        if asc:
+            if b == 10 or b == 13:
+                if not ln:
+                    lf = b
+                    continue
+                if b == 10:
+                    term = 10
+                    break
+            elif b < 32 or b > 126:
+                asc = 0
+                if lf:
+                    l8[0] = lf
+                    ln = 1
+            else:
+                lf = 0
+                if b == 32:
+                    continue
+        elif b == 10 and over:
+            term = 10
+            break
+        if ln < cap:
+            l8[ln] = b
+            ln += 1
+        else:
+            over = 1
+    st[0] = i
+    st[2] = ln
+    st[3] = over
+    st[4] = asc
+    st[6] = lf
+    return term
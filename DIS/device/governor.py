@@ -0,0 +1,107 @@
+import utime as time
+from array import array
+
+# Packed visible flags, compared as one int
+FLAG_BLINK = 0x01
+FLAG_ECO = 0x02
+FLAG_INVERT = 0x04
+
+class RenderGovernor:
+    """
+    Decides whether the current screen needs to be drawn this frame.
+
+    The caller passes what the screen would visibly show: an int key for the
+    digits (see DisplayManager.num_key() and friends), uart_blink,
+    timer_state, eco and invert. A frame is rendered when any of them differ
+    from the last rendered frame, but never faster than the screen's max_hz;
+    with min_hz > 0 it is also refreshed at least that often when nothing
+    changed. Counts rendered and skipped frames, overall and per screen.
+
+    A gap up to slack_ms short of a limit still counts as reaching it. The
+    caller's frame times jitter; without slack, max_hz equal to the frame
+    rate holds a change back a whole frame whenever one wakes a ms early.
+    """
+    def __init__(self, num_screens, max_hz=20, min_hz=1, slack_ms=0):
+        self.num_screens = num_screens
+        self.slack_ms = slack_ms
+        self._min_gap_ms = array("I", [0] * num_screens)    # from max_hz
+        self._max_gap_ms = array("I", [0] * num_screens)    # from min_hz, 0 = never
+        for s in range(num_screens):
+            self.set_rates(s, max_hz, min_hz)
+
+        # Inputs of the last rendered frame
+        self._valid = False
+        self._screen = -1
+        self._value = 0
+        self._flags = 0
+        self._state = None
+        self._last_ms = 0
+
+        self.rendered = 0           # since the last reset_counts()
+        self.skipped = 0
+        self.screen_rendered = array("I", [0] * num_screens)
+        self.screen_skipped = array("I", [0] * num_screens)
+
+    def set_rates(self, screen, max_hz=None, min_hz=None):
+        """Limit a screen to max_hz and refresh it at least min_hz (0 = only on change)."""
+        if max_hz is not None:
+            self._min_gap_ms[screen] = 1000 // max_hz if max_hz > 0 else 0
+        if min_hz is not None:
+            self._max_gap_ms[screen] = 1000 // min_hz if min_hz > 0 else 0
+
+    def invalidate(self):
+        """Force the next frame to render, e.g. after a screen change or an alert."""
+        self._valid = False
+
+    def should_render(self, screen, value, uart_blink=False, timer_state=None,
+                      eco=False, invert=False, now_ms=None):
+        """
+        Return True if the frame must be drawn, and record it as rendered;
+        otherwise count it as skipped.
+        """
+        if now_ms is None:
+            now_ms = time.ticks_ms()
+        flags = 0
+        if uart_blink:
+            flags |= FLAG_BLINK
+        if eco:
+            flags |= FLAG_ECO
+        if invert:
+            flags |= FLAG_INVERT
+
+        if not self._valid or screen != self._screen:
+            render = True
+        else:
+            gap = time.ticks_diff(now_ms, self._last_ms) + self.slack_ms
+            if (value != self._value or flags != self._flags
+                    or timer_state != self._state):
+                render = gap >= self._min_gap_ms[screen]
+            else:
+                max_gap = self._max_gap_ms[screen]
+                render = max_gap > 0 and gap >= max_gap
+
+        if render:
+            self._valid = True
+            self._screen = screen
+            self._value = value
+            self._flags = flags
+            self._state = timer_state
+            self._last_ms = now_ms
+            self.rendered += 1
+            self.screen_rendered[screen] += 1
+        else:
+            self.skipped += 1
+            self.screen_skipped[screen] += 1
+        return render
+
+    def reset_counts(self):
+        self.rendered = 0
+        self.skipped = 0
+        for s in range(self.num_screens):
+            self.screen_rendered[s] = 0
+            self.screen_skipped[s] = 0
+
+    def summary(self):
+        total = self.rendered + self.skipped
+        pct = self.rendered * 100 // total if total else 0
+        return f"Render {self.rendered}/{total} frames ({pct}%), skipped {self.skipped}"
@@ -1,61 +1,195 @@
-import config
 import utime as time
+# Boot-to-first-frame: ticks_ms() counts from reset, so this also tells how
+# long the firmware and the imports below took. Logged by render_task().
+BOOT_MAIN_US = time.ticks_us()
+import asyncio
+import config
 from display import DisplayManager
-from performance import PerformanceMonitor
+from governor import RenderGovernor
+from screens import ScreenRegistry
+from derived import DerivedValues
+from uartrx import SampleQueue
+from dualcore import CommandQueue, CMD_START, CMD_STOP, CMD_RESET, CMD_RPM_UP, CMD_RPM_DOWN
+from racestate import (RaceState, RS_SAMPLES, RS_RPM, RS_MMPH, RS_POWER_MW, RS_DISTANCE_UMI,
+                       RS_ELAPSED_MS, RS_REMAINING_UMI, RS_REMAINING_MS, RS_TARGET_MMPH,
+                       RS_VOLTAGE_DV, RS_CURRENT_MA, RS_DUTY, RS_THROTTLE, RS_ECO, RS_BLINK,
+                       RS_TIMER, RS_SCREEN, TIMER_RESET, TIMER_RUNNING, TIMER_PAUSED)
+from buttons import ButtonEvents
 from uart_manager import UartManager
-import math
+# Modules behind a flag below (datalog, uartcapture, pacing, performance,
+# UartReceiver and Core1Loop) are imported where the flag is checked, so a
+# build without them does not load them.
+
+# --- Display Flags ---
+# Flush frames from core 1 so SPI transfers overlap with the next loop pass.
+# The hand-off is covered by host/tests/test_flush.py; off until it has run
+# on the board.
+DISPLAY_THREADED_FLUSH = False
+# Alerts rendered right after the first frame, so showing one is a copy.
+PRERENDERED_ALERTS = (("TIMER", "RESET"),)
+
+# --- Core 1 ---
+# Run UART parsing, the race math and the timer on core 1 (dualcore.py) so
+# a slow frame cannot slow the integration; the render loop reads their
+# results from a seqlock (racestate.RaceState). Core 1 runs either this or the threaded
+# flush, so DUAL_CORE turns DISPLAY_THREADED_FLUSH off.
+DUAL_CORE = False
+CORE1_PERIOD_MS = 2     # core 1 polls the UART and integrates this often
+
+# --- Task Rates ---
+RENDER_PERIOD_MS = 50   # fixed-rate render task (20 Hz)
+BUTTON_PERIOD_MS = 10   # button polling; debounce is handled in check_button()
+# Timestamp button edges from pin interrupts (buttons.ButtonEvents) instead
+# of polling check_button(); the button task then only wakes on an edge or
+# to time a long press.
+BUTTON_IRQ = True
+# Read the UART from its receive interrupt (uartrx.UartReceiver) so every
+# sample keeps its arrival time however late the parser runs; otherwise
+# the UART task polls a StreamReader and stamps samples when it reads them.
+UART_IRQ = True
+LOG_PERIOD_MS = 500     # perf_monitor.update() prints on its own interval
 
 # --- Hardware Setup ---
-oled_driver = config.OLED_1inch3()
+oled_driver = config.OLED_1inch3(threaded=DISPLAY_THREADED_FLUSH and not DUAL_CORE)
 display = DisplayManager(oled_driver)
+buttons = ButtonEvents(config.KEY0, config.KEY1) if BUTTON_IRQ else None
+
+# --- Data Logging ---
+# Every sample is logged to rotating files under LOG_DIR with its arrival
+# time and the distance it was integrated at; the log task writes them out
+# within LOG_FLUSH_BUDGET_US per pass.
+DATA_LOGGING = True
+LOG_DIR = "log"
+LOG_FLUSH_BUDGET_US = 4000
+# Record raw UART reads for replay on the host (python -m dishost.replay).
+UART_CAPTURE = False
+CAPTURE_PATH = "uart.cap"
 
 # --- Debug Flags ---
 DEBUG_PERFORMANCE = True
 DEBUG_VERBOSE = True
 DEBUG_SIMULATE_SPEED = True
-perf_monitor = (
-    PerformanceMonitor(verbose=DEBUG_VERBOSE) if DEBUG_PERFORMANCE else None
-)
+# Without DEBUG_PERFORMANCE perf_monitor is None and the tasks skip their
+# timing. A frame counts as an overrun once it is 10% later than the render
+# period.
+perf_monitor = None
+if DEBUG_PERFORMANCE:
+    from performance import (PerformanceMonitor, SEC_UART, SEC_BUTTONS, SEC_DERIVE,
+                             SEC_DRAW, SEC_FLUSH, SEC_LOG, SEC_WAKE)
+    perf_monitor = PerformanceMonitor(verbose=DEBUG_VERBOSE, budget_us=RENDER_PERIOD_MS * 1100)
 
 # Debug value
 below = True
 
 # ---------------------- Main Program -----------------------
 
-def simulate_speed_data(uart_manager, current_mph, target_mph, below_state):
+def simulate_speed_data(commands, current_mmph, target_mmph, below_state):
     """
     Simulates RPM fluctuations around a target speed for testing without UART.
-    Returns the new 'below' state.
+    Speeds are in milli-mph. The rpm steps go through the command queue to
+    the code that integrates the race. Returns the new 'below' state.
     """
     if below_state:
-        if current_mph < target_mph + 2:
-            uart_manager.rpm += 1
+        if current_mmph < target_mmph + 2000:
+            commands.put(CMD_RPM_UP, time.ticks_us())
         else:
             below_state = False
     else:  # not below
-        if current_mph > target_mph - 2:
-            uart_manager.rpm -= 1
+        if current_mmph > target_mmph - 2000:
+            commands.put(CMD_RPM_DOWN, time.ticks_us())
         else:
             below_state = True
     return below_state
 
 # --- Managers ---
-uart_manager = UartManager(config.uart)
-
-# Live values
-screen = 0
-last_screen = screen
-NUM_SCREENS = 6
-distance = 0
-timer_running = False
-timer_state = 'reset'
-timer_elapsed_ms = 0
-timer_start_ms = time.ticks_ms()
-target_mph = 0.0
-mph = 0.0
-last_print_ticks = time.ticks_ms() #Demo for time and distance reamining 
-timer_start_ticks = 0
+# Samples are integrated in arrival order at their arrival times by
+# update_derived(), not at the time of the frame that picks them up.
+samples = SampleQueue()
+uart_manager = UartManager(config.uart, byte_us=config.UART_BYTE_US, samples=samples)
+# Core 1 polls the UART itself, so only the single-core loop uses the IRQ.
+uart_rx = None
+if UART_IRQ and not DUAL_CORE:
+    from uartrx import UartReceiver
+    uart_rx = UartReceiver(config.uart, config.UART_BYTE_US)
+    if not uart_rx.irq:
+        print("No UART.irq() on this port; polling the UART")
+        uart_rx = None
+# integrate() queues each sample's log record; update_derived() appends them
+# on core 0, which owns the logger.
+data_logger = None
+records = None
+if DATA_LOGGING:
+    from datalog import DataLogger, RecordQueue
+    data_logger = DataLogger(LOG_DIR)
+    records = RecordQueue()
+uart_capture = None
+if UART_CAPTURE:
+    from uartcapture import UartCapture
+    uart_capture = UartCapture(CAPTURE_PATH)
+
+# --- Screens ---
+# KEY0 steps through them in the order they are added. Each one paints
+# only the regions it declares; its label is pre-rendered (screens.py).
+# Keys are the ints each screen shows; the governor compares them and the
+# paint_* methods render them, so no float is made per frame.
 
+def speed_screen(screen, state, now_ms):
+    d = state.data
+    blink = d[RS_BLINK]
+    timer_state = d[RS_TIMER]
+    mmph = d[RS_MMPH]
+    target = d[RS_TARGET_MMPH]
+    eco = d[RS_ECO]
+    key = display.milli_key(mmph)
+    invert_speed = target > 0 and mmph < target
+    if governor.should_render(screen, key, blink, timer_state, eco, invert_speed, now_ms):
+        display.paint_large_key(key, blink, timer_state, invert=invert_speed, eco=eco)
+        return True
+    return False
+
+def elapsed_screen(screen, state, now_ms):
+    d = state.data
+    seconds = d[RS_ELAPSED_MS] // 1000
+    if governor.should_render(screen, display.time_key(seconds), d[RS_BLINK], d[RS_TIMER],
+                              now_ms=now_ms):
+        display.paint_time(seconds, d[RS_BLINK], d[RS_TIMER])
+        return True
+    return False
+
+def distance_screen(screen, state, now_ms):
+    key = state.data[RS_DISTANCE_UMI] // 1000   # thousandths of a mile, shown as .DDD
+    if key > 999: key = 999
+    if governor.should_render(screen, key, now_ms=now_ms):
+        display.paint_distance_key(key)
+        return True
+    return False
+
+def milli_screen(field, scale=1):
+    """A large-digit screen for state field, which is in thousandths once multiplied by scale."""
+    def render(screen, state, now_ms):
+        d = state.data
+        key = display.milli_key(d[field] * scale)
+        if governor.should_render(screen, key, d[RS_BLINK], d[RS_TIMER], now_ms=now_ms):
+            display.paint_large_key(key, d[RS_BLINK], d[RS_TIMER])
+            return True
+        return False
+    return render
+
+screens = ScreenRegistry(display)
+screens.add(speed_screen, "MPH", display.large_regions)
+SCREEN_ELAPSED = screens.add(elapsed_screen, "ELAPSED", display.time_regions)
+screens.add(milli_screen(RS_CURRENT_MA), "AMPS", display.large_regions)
+screens.add(milli_screen(RS_VOLTAGE_DV, 100), "VOLTS", display.large_regions)
+screens.add(distance_screen, "MILES", display.distance_regions)
+screens.add(milli_screen(RS_TARGET_MMPH), "TARGET MPH", display.large_regions)
+
+# Only draw when something visible changed. Refresh at most at the render
+# task rate and at least once a second; the time screen changes at 1 Hz, so
+# it needs no keep-alive refresh. The render task wakes a ms or so either
+# side of its period (sleep_ms() truncates), which the slack absorbs.
+governor = RenderGovernor(len(screens), max_hz=1000 // RENDER_PERIOD_MS, min_hz=1,
+                          slack_ms=2)
+governor.set_rates(SCREEN_ELAPSED, min_hz=0)
 
 # Race targets
 RACE_DISTANCE_MI = 1
@@ -65,115 +199,326 @@ goal_time_sec = RACE_TIME_MIN * 60
 
 # Wheel parameters
 wheel_diameter_in = 16
-wheel_circumference_in = math.pi * wheel_diameter_in  # inches
 
-print("Waiting for UART data...\n")
+# Energy-optimal target speeds solved offline for the course
+# (python -m dishost.pacing). Without the file the target is the even pace
+# for the distance and time left; None skips the file.
+PACE_TABLE = "pace.bin"
 
-# ----------------- TIME VARIABLES -----------------
-last_sample_time = time.ticks_ms()
-elapsed_time = 0.0
-sample_dt = 0.0
-# ---------------------------------------------------
+def load_pace_table(path):
+    from pacing import PaceTable
+    try:
+        pace = PaceTable(path)
+    except (OSError, ValueError) as e:
+        if DEBUG_VERBOSE:
+            print("No pace table:", e)
+        return None
+    if (abs(pace.length_umi - goal_distance_mi * 1000000) > pace.dist_step_umi
+            or abs(pace.duration_ms - goal_time_sec * 1000) > pace.time_step_ms):
+        print("Pace table is for %d umi in %d ms, not this race; ignored"
+              % (pace.length_umi, pace.duration_ms))
+        return None
+    return pace
 
-while True:
-    # Time Calculation always runs
-    current_time = time.ticks_ms()
-    sample_dt = time.ticks_diff(current_time, last_sample_time) / 1000
-    last_sample_time = current_time
+# Speed, power, distance, elapsed and target speed, all in integer units;
+# floats only appear when a value is drawn or printed.
+race = DerivedValues(wheel_diameter_in, goal_distance_mi, goal_time_sec,
+                     pace=load_pace_table(PACE_TABLE) if PACE_TABLE else None)
 
-    # -------- Input Handling ---------------
-    uart_manager.update()
+# integrate() publishes the race into `shared` (on core 1 with DUAL_CORE,
+# from update_derived() otherwise). Each frame copies it into `state`, which
+# also holds the timer and the screen set by the buttons; `state` is the one
+# object the screens read. Timer commands go the other way through a queue,
+# stamped when pressed.
+shared = RaceState()
+state = RaceState()
+commands = CommandQueue()
+seen_samples = 0
+race_timer = TIMER_RESET    # the timer as integrate() has applied it
 
-    # --------- Derived Values (runs even with stale data)
-    power = uart_manager.voltage * uart_manager.current
-    mph = uart_manager.rpm * wheel_circumference_in * 60 / 63360.0
-    if timer_running:
-        distance += mph * sample_dt / 3600  # distance in miles
+print("Waiting for UART data...\n")
 
-    # -------- Simulate Speed if no UART data ---------------
-    if DEBUG_SIMULATE_SPEED and not uart_manager.new_data:
-        below = simulate_speed_data(uart_manager, mph, target_mph, below)
+# ----------------- TIME VARIABLES -----------------
+log_seal = False    # set on timer stop/reset; the log task writes the partial block
+# ---------------------------------------------------
 
-    # --------- Button Handling via config -------------
-    screen_delta, timer_toggle, timer_reset, clear_alert_signal = oled_driver.check_button()
+def handle_buttons():
+    """Apply one check_button() result: alert, timer toggle/reset and screen."""
+    global log_seal
+    if buttons:
+        screen_delta, timer_toggle, timer_reset, clear_alert_signal = buttons.poll()
+    else:
+        screen_delta, timer_toggle, timer_reset, clear_alert_signal = oled_driver.check_button()
 
     if clear_alert_signal:
         display.clear_alert()
 
+    d = state.data
     if timer_toggle:
-        if timer_running:
-            timer_elapsed_ms += time.ticks_diff(current_time, timer_start_ms)
-            timer_running = False
-            timer_state = 'paused'
+        if d[RS_TIMER] == TIMER_RUNNING:
+            commands.put(CMD_STOP, time.ticks_us())
+            d[RS_TIMER] = TIMER_PAUSED
+            log_seal = True
             print("Timer stopped")
         else:
-            timer_start_ms = current_time
-            timer_running = True
-            timer_state = 'running'
+            commands.put(CMD_START, time.ticks_us())
+            d[RS_TIMER] = TIMER_RUNNING
             print("Timer started")
 
     if timer_reset:
-        timer_elapsed_ms = 0
-        distance = 0
-        timer_running = False
-        timer_state = 'reset'
-        timer_start_ms = current_time
+        commands.put(CMD_RESET, time.ticks_us())
+        d[RS_TIMER] = TIMER_RESET
+        log_seal = True
         display.show_alert("TIMER", "RESET", 3)
 
     if screen_delta:
-        screen += screen_delta
-
-    # Wrap screen
-    new_screen = screen % NUM_SCREENS
-    if new_screen != last_screen:
-        print("screen: ", new_screen)
-        last_screen = new_screen
-        display.screen_changed()
-    screen = new_screen
-
-    # --------- Timer Calculation ----------------------
-    if timer_running:
-        elapsed_time = (timer_elapsed_ms + time.ticks_diff(current_time, timer_start_ms)) / 1000
-    else:
-        elapsed_time = timer_elapsed_ms / 1000
-    
-    # --------- Target Speed Calculation ----------------------
-    remaining_distance = max(goal_distance_mi - distance, 0)
-    if timer_running:
-        remaining_time_sec = max(goal_time_sec - elapsed_time, 0.001)
-    else:
-        remaining_time_sec = max(goal_time_sec - elapsed_time, 0.001)
-    target_mph = (remaining_distance / (remaining_time_sec / 3600)) if remaining_time_sec > 0 else 0
+        new_screen = (d[RS_SCREEN] + screen_delta) % len(screens)
+        if new_screen != d[RS_SCREEN]:
+            print("screen: ", new_screen)
+            d[RS_SCREEN] = new_screen
+            governor.invalidate()
 
-    # --------- DISPLAY (always runs) ------------------
+def integrate(now_us):
+    """
+    Apply the timer commands and queued samples in time order, advance the
+    race to now_us and publish the results. Each sample is queued for the
+    log with its arrival time and the distance it was integrated at.
+    """
+    global race_timer
+    now_ms = time.ticks_ms()
+    t_cmd = commands.peek_t()
+    i = samples.peek()
+    while t_cmd is not None or i >= 0:
+        if i >= 0 and (t_cmd is None or time.ticks_diff(samples.t_us[i], t_cmd) <= 0):
+            t = samples.t_us[i]
+            race.update(t, samples.rpm[i], samples.voltage_dv[i], samples.current_ma[i])
+            if records:
+                records.put(time.ticks_add(now_ms, time.ticks_diff(t, now_us) // 1000),
+                            samples.voltage_dv[i], samples.current_ma[i], samples.rpm[i],
+                            samples.duty[i], samples.throttle[i], samples.eco[i],
+                            race.distance_umi, race_timer)
+            samples.pop()
+        else:
+            cmd = commands.get()
+            if cmd == CMD_START:
+                race.start(t_cmd)
+                race_timer = TIMER_RUNNING
+            elif cmd == CMD_STOP:
+                race.stop(t_cmd)
+                race_timer = TIMER_PAUSED
+            elif cmd == CMD_RESET:
+                race.reset(t_cmd)
+                race_timer = TIMER_RESET
+            elif cmd == CMD_RPM_UP or cmd == CMD_RPM_DOWN:
+                uart_manager.rpm += 1 if cmd == CMD_RPM_UP else -1
+                race.update(t_cmd, uart_manager.rpm, uart_manager.voltage_dv,
+                            uart_manager.current_ma)
+        t_cmd = commands.peek_t()
+        i = samples.peek()
+    race.update(now_us, uart_manager.rpm, uart_manager.voltage_dv, uart_manager.current_ma)
+
+    shared.begin()
+    d = shared.data
+    d[RS_SAMPLES] = uart_manager.lines_parsed + uart_manager.frames_received
+    d[RS_RPM] = race.rpm
+    d[RS_MMPH] = race.mmph
+    d[RS_POWER_MW] = race.power_mw
+    d[RS_DISTANCE_UMI] = race.distance_umi
+    d[RS_ELAPSED_MS] = race.elapsed_ms
+    d[RS_REMAINING_UMI] = race.remaining_umi
+    d[RS_REMAINING_MS] = race.remaining_ms
+    d[RS_TARGET_MMPH] = race.target_mmph
+    d[RS_VOLTAGE_DV] = uart_manager.voltage_dv
+    d[RS_CURRENT_MA] = uart_manager.current_ma
+    d[RS_DUTY] = uart_manager.duty
+    d[RS_THROTTLE] = uart_manager.throttle
+    d[RS_ECO] = uart_manager.eco
+    d[RS_BLINK] = uart_manager.uart_blink
+    shared.end()
+
+def core1_step(now_us):
+    # Samples read here are queued with their arrival times and integrated
+    # on the next pass.
+    integrate(now_us)
+    uart_manager.update()
+
+def update_derived():
+    """Speed, distance, elapsed time and target speed, copied into `state`."""
+    global below, seen_samples
+    if not core1:
+        integrate(time.ticks_us())
+    shared.copy_into(state)
+    if records:
+        records.drain(data_logger)
+
+    d = state.data
+    n = d[RS_SAMPLES]
+    # -------- Simulate Speed if no UART data ---------------
+    if n == seen_samples and DEBUG_SIMULATE_SPEED:
+        below = simulate_speed_data(commands, d[RS_MMPH], d[RS_TARGET_MMPH], below)
+    seen_samples = n
+
+def draw_screen(state, current_time):
+    """
+    Draw the current screen (or the active alert) and flush it, if the
+    governor says it changed. Returns True if show() ran.
+    """
+    flushes = display.alert_flushes
     if display.update_alert():
-        continue
-
-    if perf_monitor: perf_monitor.start()
-
-    if screen == 0:
-        invert_speed = target_mph > 0 and mph < target_mph
-        display.draw_large_num(mph, "MPH", uart_manager.uart_blink, timer_state, invert=invert_speed, eco=uart_manager.eco)
-    elif screen == 1:
-        display.draw_time(elapsed_time, "ELAPSED", uart_manager.uart_blink, timer_state)
-    elif screen == 2:
-        display.draw_large_num(uart_manager.current, "AMPS", uart_manager.uart_blink, timer_state)
-    elif screen == 3:
-        display.draw_large_num(uart_manager.voltage, "VOLTS", uart_manager.uart_blink, timer_state)
-    elif screen == 4:
-        display.draw_demo_distance(distance)
-    elif screen == 5:
-        display.draw_large_num(target_mph, "TARGET MPH", uart_manager.uart_blink, timer_state)
-
-    if perf_monitor: perf_monitor.stop()
-
-    # --------- DEBUG LOGGING ----------------------
+        # The alert frame is flushed once and then only timed; the screen
+        # under it is restored when it ends and redrawn where it changed.
+        governor.invalidate()
+        return display.alert_flushes != flushes
+
+    return screens.draw(state.data[RS_SCREEN], state, current_time)
+
+# ---------------------- Tasks -----------------------
+# Every task times its own work with perf_monitor.record(), and only reads
+# the clock for it when there is a perf_monitor. The render task also
+# records how late it woke (SEC_WAKE), which is the latency any other task
+# adds to a frame. The render task is the "loop" frame_start() times.
+
+def ingest_uart(buf, n, t_us):
+    """Parse (and capture) n bytes whose last one arrived at t_us."""
+    if perf_monitor:
+        t0 = time.ticks_us()
+    if uart_capture:
+        uart_capture.add(buf, n, t_us)
+    uart_manager.ingest(buf, n, t_us)
     if perf_monitor:
-        if timer_running:
+        perf_monitor.record(SEC_UART, time.ticks_diff(time.ticks_us(), t0))
+
+async def uart_task():
+    """Parse controller bytes as soon as the UART has them."""
+    if uart_rx:
+        while True:
+            await uart_rx.flag.wait()
+            i = uart_rx.peek()
+            while i >= 0:
+                ingest_uart(uart_rx.view(i), uart_rx.length(i), uart_rx.t_us(i))
+                uart_rx.release()
+                i = uart_rx.peek()
+    reader = asyncio.StreamReader(config.uart)
+    buf = bytearray(64)
+    while True:
+        n = await reader.readinto(buf)
+        ingest_uart(buf, n, time.ticks_us())
+
+async def button_task():
+    while True:
+        if perf_monitor:
+            t0 = time.ticks_us()
+        handle_buttons()
+        if perf_monitor:
+            perf_monitor.record(SEC_BUTTONS, time.ticks_diff(time.ticks_us(), t0))
+        if not buttons:
+            await asyncio.sleep_ms(BUTTON_PERIOD_MS)
+            continue
+        wait = buttons.pending_ms()
+        if wait is None:
+            await buttons.flag.wait()
+        elif wait:
+            try:
+                await asyncio.wait_for_ms(buttons.flag.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+boot_first_frame_ms = None     # reset to first frame on the panel, once known
+
+def log_first_frame():
+    global boot_first_frame_ms
+    oled_driver.wait_flush()
+    boot_first_frame_ms = time.ticks_ms()
+    main_ms = time.ticks_diff(time.ticks_us(), BOOT_MAIN_US) // 1000
+    print("Boot: first frame %d ms after reset (%d ms in main.py)"
+          % (boot_first_frame_ms, main_ms))
+    # After the first frame, so the letter font does not delay it.
+    for top, bottom in PRERENDERED_ALERTS:
+        display.prerender_alert(top, bottom)
+
+async def render_task():
+    period_us = RENDER_PERIOD_MS * 1000
+    due = time.ticks_us()
+    while True:
+        if perf_monitor:
+            late = time.ticks_diff(time.ticks_us(), due)
+            perf_monitor.frame_start()
+            perf_monitor.record(SEC_WAKE, late if late > 0 else 0)
+
+        update_derived()
+        if perf_monitor:
+            perf_monitor.mark(SEC_DERIVE)
+
+        drawn = draw_screen(state, time.ticks_ms())
+        # Every draw_* ends in show(); charge that part to the flush stage.
+        if perf_monitor:
+            perf_monitor.mark_split(SEC_DRAW, SEC_FLUSH,
+                                    oled_driver.last_show_us if drawn else 0)
+        if boot_first_frame_ms is None and drawn:
+            log_first_frame()
+
+        # Fixed rate: schedule from the previous due time, but never try to
+        # catch up on frames missed after an overrun.
+        due = time.ticks_add(due, period_us)
+        delay = time.ticks_diff(due, time.ticks_us())
+        if delay < 0:
+            due = time.ticks_us()
+            delay = 0
+        await asyncio.sleep_ms(delay // 1000)
+
+async def log_task():
+    global log_seal
+    while True:
+        await asyncio.sleep_ms(LOG_PERIOD_MS)
+        if perf_monitor:
+            t0 = time.ticks_us()
+        if data_logger:
+            # Seal the partial block when the timer stops so a stopped car
+            # has its data on flash without waiting for max_age_ms.
+            data_logger.flush(LOG_FLUSH_BUDGET_US, log_seal)
+            log_seal = False
+        if uart_capture:
+            uart_capture.flush()
+        if not perf_monitor:
+            printed = False
+        elif state.data[RS_TIMER] == TIMER_RUNNING:
             # Pass race data when the timer is active
-            perf_monitor.update(
-                remaining_time=remaining_time_sec, remaining_dist=remaining_distance
+            printed = perf_monitor.update(
+                remaining_time=state.data[RS_REMAINING_MS] / 1000,
+                remaining_dist=state.data[RS_REMAINING_UMI] / 1000000
             )
         else:
             # Otherwise, just update for performance stats
-            perf_monitor.update()
+            printed = perf_monitor.update()
+        if printed:
+            print(governor.summary())
+            if data_logger:
+                print(data_logger.summary() + ", queue dropped %d" % records.dropped)
+            if uart_rx:
+                print("UART rx backlog max %d chunks, %d full; samples queued max %d, dropped %d"
+                      % (uart_rx.max_backlog, uart_rx.full, samples.max_depth, samples.dropped))
+            if core1:
+                print(core1.summary() + ", state retries %d" % shared.retries)
+                core1.reset_counts()
+            governor.reset_counts()
+        if perf_monitor:
+            perf_monitor.record(SEC_LOG, time.ticks_diff(time.ticks_us(), t0))
+
+core1 = None
+if DUAL_CORE:
+    if uart_capture:
+        print("UART capture is not available with DUAL_CORE")
+        uart_capture = None
+    from dualcore import Core1Loop
+    core1 = Core1Loop(core1_step, CORE1_PERIOD_MS)
+    if not core1.start():
+        core1 = None
+
+async def main():
+    if not core1:
+        asyncio.create_task(uart_task())
+    asyncio.create_task(button_task())
+    asyncio.create_task(log_task())
+    await render_task()
+
+asyncio.run(main())
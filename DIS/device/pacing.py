@@ -0,0 +1,74 @@
+from array import array
+
+# ---------------- File format ----------------
+# Header: b"PACE", version, reserved byte, n_dist (u16 LE), n_time (u16 LE),
+# dist_step_umi (u32 LE), time_step_ms (u32 LE). Then n_dist * n_time target
+# speeds in milli-mph (u16 LE), one row of elapsed times per distance.
+# dishost/pacing.py builds these files offline from a course profile.
+MAGIC = b"PACE"
+VERSION = 1
+HEADER_LEN = 18
+
+def _u16(b, i):
+    return b[i] | (b[i + 1] << 8)
+
+def _u32(b, i):
+    return _u16(b, i) | (_u16(b, i + 2) << 16)
+
+class PaceTable:
+    """
+    Energy-optimal target speed by distance and elapsed time, interpolated
+    from a table solved offline. A lookup is four array reads and a bilinear
+    blend in Q8 fixed point: no division by the remaining time and no floats.
+    Outside the table the nearest edge is used.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            head = f.read(HEADER_LEN)
+            if len(head) < HEADER_LEN or head[:4] != MAGIC or head[4] != VERSION:
+                raise ValueError("not a pace table")
+            n_dist = _u16(head, 6)
+            n_time = _u16(head, 8)
+            self.dist_step_umi = _u32(head, 10)
+            self.time_step_ms = _u32(head, 14)
+            if n_dist < 2 or n_time < 2 or not self.dist_step_umi or not self.time_step_ms:
+                raise ValueError("bad pace table header")
+            self._table = array("H", bytes(2 * n_dist * n_time))
+            if f.readinto(self._table) != 2 * n_dist * n_time:
+                raise ValueError("pace table truncated")
+        self.n_dist = n_dist
+        self.n_time = n_time
+        self.length_umi = self.dist_step_umi * (n_dist - 1)
+        self.duration_ms = self.time_step_ms * (n_time - 1)
+
+    def target_mmph(self, distance_umi, elapsed_ms):
+        # Cell and Q8 position within it, clamped to the table
+        i = distance_umi // self.dist_step_umi
+        if i >= self.n_dist - 1:
+            i = self.n_dist - 2
+            fd = 256
+        elif i < 0:
+            i = 0
+            fd = 0
+        else:
+            fd = ((distance_umi - i * self.dist_step_umi) << 8) // self.dist_step_umi
+        j = elapsed_ms // self.time_step_ms
+        if j >= self.n_time - 1:
+            j = self.n_time - 2
+            ft = 256
+        elif j < 0:
+            j = 0
+            ft = 0
+        else:
+            ft = ((elapsed_ms - j * self.time_step_ms) << 8) // self.time_step_ms
+
+        tab = self._table
+        k = i * self.n_time + j
+        v00 = tab[k]
+        v01 = tab[k + 1]
+        k += self.n_time
+        v10 = tab[k]
+        v11 = tab[k + 1]
+        a = v00 + (((v01 - v00) * ft) >> 8)
+        b = v10 + (((v11 - v10) * ft) >> 8)
+        return a + (((b - a) * fd) >> 8)
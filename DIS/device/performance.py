@@ -1,28 +1,194 @@
 import utime as time
+from array import array
+
+# Loop stages, used as section ids in PerformanceMonitor.mark()
+SEC_UART = 0
+SEC_BUTTONS = 1
+SEC_DERIVE = 2
+SEC_DRAW = 3
+SEC_FLUSH = 4
+SEC_LOG = 5
+SEC_LOOP = 6        # whole loop period, recorded by frame_start()
+SEC_WAKE = 7        # how late a fixed-rate task woke up
+SECTION_NAMES = ("uart", "buttons", "derive", "draw", "flush", "log", "loop", "wake")
+NUM_SECTIONS = len(SECTION_NAMES)
+
+# Histogram buckets: exact below 8us, then 4 buckets per power of two
+# (about 25% resolution) up to ~2 s; anything slower lands in the last one.
+NUM_BUCKETS = 80
+
+def _bucket(us):
+    if us < 8:
+        return us if us > 0 else 0
+    shift = 0
+    while us >= 8:
+        us >>= 1
+        shift += 1
+    b = 4 + shift * 4 + us - 4
+    return b if b < NUM_BUCKETS else NUM_BUCKETS - 1
+
+def _bucket_upper(b):
+    """Largest duration (us) that falls into bucket b."""
+    if b < 8:
+        return b
+    shift = (b - 4) // 4
+    v = 4 + (b - 4) % 4
+    return ((v + 1) << shift) - 1
 
 class PerformanceMonitor:
-    """A simple class to monitor and report performance metrics."""
-    def __init__(self, print_interval_ms=5000, verbose=False):
+    """
+    Per-stage timing for the main loop.
+
+    Call frame_start() at the top of every loop pass and mark(section) after
+    each stage; the time since the previous mark is charged to that section.
+    A section marked more than once in a pass is summed, and each pass adds
+    one sample per touched section to a fixed-bucket histogram, so p50/p99
+    reflect whole frames. All storage is preallocated; with enabled=False
+    every call returns immediately, so the calls can stay in race builds.
+    """
+    def __init__(self, print_interval_ms=5000, verbose=False, enabled=True, budget_us=50000):
         self.print_interval_ms = print_interval_ms
         self.verbose = verbose
+        self.enabled = enabled
+        self.budget_us = budget_us
         self.last_perf_print_ms = time.ticks_ms()
-        self.draw_start_us = 0
 
-        self.total_draw_time_us = 0
-        self.draw_count = 0
+        self._hist = array("I", [0] * (NUM_SECTIONS * NUM_BUCKETS))
+        self._count = array("I", [0] * NUM_SECTIONS)
+        self._total = array("I", [0] * NUM_SECTIONS)
+        self._max = array("I", [0] * NUM_SECTIONS)
+        self._worst = array("I", [0] * NUM_SECTIONS)   # never reset
+        self._frame = array("I", [0] * NUM_SECTIONS)   # current pass
+        self._touched = 0                              # bitmask of sections in _frame
+
+        self._frame_start_us = 0
+        self._mark_us = 0
+        self._last_period_us = -1
+        self._jitter_total_us = 0
+        self._jitter_count = 0
+        self.overruns = 0           # since the last print
+        self.total_overruns = 0     # since boot
+        self.frames = 0
+
+    # ---------------- Recording ----------------
+
+    def frame_start(self):
+        """Close the previous loop pass and start timing a new one."""
+        if not self.enabled:
+            return
+        now = time.ticks_us()
+        if self._touched:
+            frame = self._frame
+            for sec in range(NUM_SECTIONS):
+                if self._touched & (1 << sec):
+                    self._record(sec, frame[sec])
+                    frame[sec] = 0
+            self._touched = 0
+        if self.frames:
+            period = time.ticks_diff(now, self._frame_start_us)
+            self._record(SEC_LOOP, period)
+            if period > self.budget_us:
+                self.overruns += 1
+                self.total_overruns += 1
+            if self._last_period_us >= 0:
+                d = period - self._last_period_us
+                self._jitter_total_us += d if d >= 0 else -d
+                self._jitter_count += 1
+            self._last_period_us = period
+        self.frames += 1
+        self._frame_start_us = now
+        self._mark_us = now
+
+    def mark(self, section):
+        """Charge the time since the last mark (or frame_start) to section."""
+        if not self.enabled:
+            return
+        now = time.ticks_us()
+        self._frame[section] += time.ticks_diff(now, self._mark_us)
+        self._touched |= 1 << section
+        self._mark_us = now
 
-    def start(self):
-        """Start the timer for a measurement."""
-        self.draw_start_us = time.ticks_us()
+    def mark_split(self, section, sub_section, sub_us):
+        """Like mark(section), but sub_us of that time goes to sub_section."""
+        if not self.enabled:
+            return
+        now = time.ticks_us()
+        dt = time.ticks_diff(now, self._mark_us)
+        if sub_us > dt:
+            sub_us = dt
+        self._frame[section] += dt - sub_us
+        self._frame[sub_section] += sub_us
+        self._touched |= (1 << section) | (1 << sub_section)
+        self._mark_us = now
 
-    def stop(self):
-        """Stop the timer and record the measurement."""
-        draw_duration_us = time.ticks_diff(time.ticks_us(), self.draw_start_us)
-        self.total_draw_time_us += draw_duration_us
-        self.draw_count += 1
+    def record(self, section, us):
+        """Add one sample directly, for work timed outside the frame (e.g. other tasks)."""
+        if self.enabled:
+            self._record(section, us)
+
+    def skip(self):
+        """Drop the time since the last mark (e.g. waiting that is not work)."""
+        if self.enabled:
+            self._mark_us = time.ticks_us()
+
+    def _record(self, sec, us):
+        self._hist[sec * NUM_BUCKETS + _bucket(us)] += 1
+        self._count[sec] += 1
+        self._total[sec] += us
+        if us > self._max[sec]:
+            self._max[sec] = us
+        if us > self._worst[sec]:
+            self._worst[sec] = us
+
+    # ---------------- Statistics ----------------
+
+    def percentile(self, section, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        n = self._count[section]
+        if not n:
+            return 0
+        target = (n * q + 99) // 100
+        base = section * NUM_BUCKETS
+        seen = 0
+        for b in range(NUM_BUCKETS):
+            seen += self._hist[base + b]
+            if seen >= target:
+                upper = _bucket_upper(b)
+                return upper if upper < self._max[section] else self._max[section]
+        return self._max[section]
+
+    def stats(self, section):
+        n = self._count[section]
+        return {
+            "n": n,
+            "mean_us": self._total[section] // n if n else 0,
+            "p50_us": self.percentile(section, 50),
+            "p99_us": self.percentile(section, 99),
+            "max_us": self._max[section],
+            "worst_us": self._worst[section],
+        }
+
+    def jitter_us(self):
+        """Mean absolute change between consecutive loop periods."""
+        return self._jitter_total_us // self._jitter_count if self._jitter_count else 0
+
+    def reset_window(self):
+        for i in range(len(self._hist)):
+            self._hist[i] = 0
+        for sec in range(NUM_SECTIONS):
+            self._count[sec] = 0
+            self._total[sec] = 0
+            self._max[sec] = 0
+        self._jitter_total_us = 0
+        self._jitter_count = 0
+        self.overruns = 0
+
+    # ---------------- Reporting ----------------
 
     def update(self, remaining_time=None, remaining_dist=None):
-        """Check if it's time to print stats and do so if needed."""
+        """Check if it's time to print stats and do so if needed. Returns True if printed."""
+        if not self.enabled:
+            return False
         if time.ticks_diff(time.ticks_ms(), self.last_perf_print_ms) > self.print_interval_ms:
             self.last_perf_print_ms = time.ticks_ms()
 
@@ -33,14 +199,23 @@ class PerformanceMonitor:
                 verbose_str = f"rem_t: {remaining_time:.0f}s, rem_d: {remaining_dist:.3f}mi"
                 log_parts.append(verbose_str)
 
-            # Always add performance part
-            avg_us = (self.total_draw_time_us / self.draw_count) if self.draw_count > 0 else 0
-            perf_str = f"Draw: {avg_us:.0f}us (n={self.draw_count})"
-            log_parts.append(perf_str)
+            # Loop period, jitter and frames over budget
+            n = self._count[SEC_LOOP]
+            loop_str = (f"Loop p50 {self.percentile(SEC_LOOP, 50)}us p99 {self.percentile(SEC_LOOP, 99)}us"
+                        f" max {self._max[SEC_LOOP]}us jitter {self.jitter_us()}us"
+                        f" over {self.overruns}/{n}")
+            log_parts.append(loop_str)
+
+            # Per-stage p50/p99/max for every stage that ran
+            for sec in range(NUM_SECTIONS):
+                if sec != SEC_LOOP and self._count[sec]:
+                    log_parts.append(f"{SECTION_NAMES[sec]} {self.percentile(sec, 50)}/"
+                                     f"{self.percentile(sec, 99)}/{self._max[sec]}us")
 
             # Print the combined log line
             print(" | ".join(log_parts))
 
             # Reset for the next interval
-            self.total_draw_time_us = 0
-            self.draw_count = 0
\ No newline at end of file
+            self.reset_window()
+            return True
+        return False
@@ -0,0 +1,86 @@
+from array import array
+
+# ---------------- Layout ----------------
+# Everything the screens and the logger read about the race, as ints in one
+# array('i'). Fields RS_SAMPLES .. RS_BLINK come from the race math and are
+# published with begin()/end(); RS_TIMER and RS_SCREEN belong to the button
+# handling and are never copied by copy_into().
+RS_SEQ = 0              # seqlock counter, odd while a write is in progress
+RS_SAMPLES = 1          # telemetry samples parsed so far
+RS_RPM = 2
+RS_MMPH = 3
+RS_POWER_MW = 4
+RS_DISTANCE_UMI = 5
+RS_ELAPSED_MS = 6
+RS_REMAINING_UMI = 7
+RS_REMAINING_MS = 8
+RS_TARGET_MMPH = 9
+RS_VOLTAGE_DV = 10
+RS_CURRENT_MA = 11
+RS_DUTY = 12
+RS_THROTTLE = 13
+RS_ECO = 14
+RS_BLINK = 15
+RS_PUBLISHED = 16       # fields below this are published and copied
+RS_TIMER = 16           # TIMER_* below
+RS_SCREEN = 17
+RS_FIELDS = 18
+
+# Timer states. The values are also the timer code in the data log flags.
+TIMER_RESET = 0
+TIMER_RUNNING = 1
+TIMER_PAUSED = 2
+TIMER_NAMES = ("reset", "running", "paused")
+
+_SEQ_MASK = 0x3FFFFFFF  # keeps the counter a small int; the period is even
+
+class RaceState:
+    """
+    The race as one preallocated array('i') (data, indexed by the RS_*
+    constants) instead of module globals: reading a field is an array
+    index, and the whole state can be copied without allocating.
+
+    The published fields form a seqlock. The one writer brackets its
+    stores with begin() and end(), which leave the counter odd during the
+    write; copy_into() copies them and retries until the counter was even
+    and unchanged across the copy, so a reader (also on the other core)
+    takes no lock and never sees half of one write and half of the next.
+    Both RP2040 cores see plain stores to SRAM in program order.
+    """
+    __slots__ = ("data", "retries", "_pub")
+
+    def __init__(self):
+        self.data = array("i", [0] * RS_FIELDS)
+        self.retries = 0        # copy_into() side only
+        self._pub = memoryview(self.data)[:RS_PUBLISHED]
+
+    def begin(self):
+        d = self.data
+        d[RS_SEQ] = (d[RS_SEQ] + 1) & _SEQ_MASK
+
+    def end(self):
+        d = self.data
+        d[RS_SEQ] = (d[RS_SEQ] + 1) & _SEQ_MASK
+
+    def copy_into(self, dst):
+        """Copy a consistent set of published fields into dst (another RaceState)."""
+        d = self.data
+        pub = dst._pub
+        while True:
+            seq = d[RS_SEQ]
+            if not seq & 1:
+                pub[:] = self._pub
+                if d[RS_SEQ] == seq:
+                    return
+            self.retries += 1
+
+    def snapshot(self):
+        """A new RaceState holding a consistent copy of every field (allocates)."""
+        s = RaceState()
+        self.copy_into(s)
+        s.data[RS_TIMER] = self.data[RS_TIMER]
+        s.data[RS_SCREEN] = self.data[RS_SCREEN]
+        return s
+
+    def timer_name(self):
+        return TIMER_NAMES[self.data[RS_TIMER]]
@@ -0,0 +1,52 @@
+import framebuf
+
+class ScreenRegistry:
+    """
+    The dash screens, in the order KEY0 steps through them; add() registers
+    one and returns its index.
+
+    A screen is a static layer and a render call. The static layer holds
+    what never changes (the label, from DisplayManager.draw_label(), plus
+    anything static(fb) draws) and is rendered once, into a framebuffer of
+    its own, when the screen is added. render(screen, state, now_ms) paints
+    the changing parts and returns True if it drew anything; it may only
+    draw inside regions, the (x, y, w, h) rectangles it declared.
+
+    draw() puts the static layer back with one buffer copy whenever the
+    frame holds something else (another screen, an alert, a fresh boot),
+    and after a render flushes just the rows of the declared regions. So a
+    screen needs no mark_dirty() or show() calls of its own.
+    """
+    def __init__(self, display):
+        self.display = display
+        self._static = []
+        self._render = []
+        self._regions = []
+        self._shown = -1        # screen whose static layer is in the frame
+
+    def __len__(self):
+        return len(self._render)
+
+    def add(self, render, label=None, regions=(), static=None):
+        oled = self.display.oled
+        buf = bytearray(len(oled.buffer))
+        fb = framebuf.FrameBuffer(buf, oled.width, oled.height, framebuf.MONO_HMSB)
+        if label:
+            self.display.draw_label(label, fb)
+        if static:
+            static(fb)
+        self._static.append(buf)
+        self._render.append(render)
+        self._regions.append(regions)
+        return len(self._render) - 1
+
+    def draw(self, screen, state, now_ms):
+        """Render screen from state. Returns True if the frame was flushed."""
+        display = self.display
+        if screen != self._shown or display.needs_redraw():
+            display.restore(self._static[screen])
+            self._shown = screen
+        if not self._render[screen](screen, state, now_ms):
+            return False
+        display.show_regions(self._regions[screen])
+        return True
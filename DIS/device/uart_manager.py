@@ -1,17 +1,88 @@
+from array import array
+import utime as time
+import fastpath
+from fastpath import (SCAN_POS, SCAN_END, SCAN_LEN, SCAN_OVER, SCAN_ASCII, SCAN_MAX, SCAN_LF,
+                      SCAN_STATE)
+
+LINE_MAX = 48       # longest line or frame kept
+LEGACY_LEN = 20     # s VVV CCCCCC RRR DDD TTT E
+
+# Binary frames (see Motor_Code/telemetry.h): COBS encoded payload ending in
+# a 0x00 byte. Payload v1 is 17 bytes: version, seq, tick_ms(4), voltage_dv(2),
+# current_ma(2, signed), rpm(2), duty, throttle, flags, crc16(2).
+FRAME_V1_LEN = 17
+FLAG_ECO = 0x01
+
+def _make_crc_table():
+    table = array("H", [0] * 256)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+_CRC_TABLE = _make_crc_table()
+
 class UartManager:
-    def __init__(self, uart_instance):
+    def __init__(self, uart_instance, rx_size=64, byte_us=0, samples=None):
         self.uart = uart_instance
-        self.buffer = ""
 
-        # Live values
-        self.voltage = 0.0
-        self.current = 0.0
+        # Preallocated receive path: bytes are read into _rx and collected in
+        # _line until a newline (legacy ASCII) or a 0x00 (binary frame), then
+        # decoded straight from _line, or COBS decoded into _frame. Nothing
+        # in update() allocates on a good line or frame.
+        self._rx = bytearray(rx_size)
+        self._line = bytearray(LINE_MAX)
+        self._frame = bytearray(LINE_MAX)     # a binary frame, COBS decoded
+        # Line length, overflow and all-printable flags, shared with the
+        # byte scanner (fastpath.scan_line)
+        self._scan = array("i", [0] * SCAN_STATE)
+        self._scan[SCAN_MAX] = LINE_MAX
+        self._scan_line = fastpath.scan_line
+        self._reset_line()
+        self._field_ok = True
+
+        # Arrival times: ingest() is told when the last byte of its buffer
+        # came in and dates each line back from there by byte_us per byte
+        # that followed it. Every sample is pushed to samples (a
+        # uartrx.SampleQueue), if given, with that time.
+        self.byte_us = byte_us
+        self.samples = samples
+        self.sample_us = 0      # arrival of the latest sample
+        self._end_us = 0
+        self._end_n = 0
+
+        # Live values, kept as the integers the controller sends
+        self.voltage_dv = 0     # decivolts
+        self.current_ma = 0
         self.rpm = 0
         self.duty = 0
-        self.throttle = 0.0
+        self.throttle = 0
         self.eco = False
         self.uart_blink = False
         self.new_data = False # Flag to indicate if new data was parsed
+        self.lines_parsed = 0
+        self.parse_errors = 0
+        self.samples_coalesced = 0  # messages that replaced one nobody consumed
+
+        # Binary link state
+        self.binary_link = False    # True once a valid binary frame arrived
+        self.controller_tick_ms = 0
+        self.frames_received = 0
+        self.frames_dropped = 0     # gaps in the sequence counter
+        self.crc_errors = 0
+        self._last_seq = -1
+
+    @property
+    def voltage(self):
+        """Battery voltage in volts."""
+        return self.voltage_dv / 10
+
+    @property
+    def current(self):
+        """Battery current in amps."""
+        return self.current_ma / 1000
 
     def update(self):
         """
@@ -19,34 +90,181 @@ class UartManager:
         Should be called once per main loop iteration.
         """
         self.new_data = False
-        if self.uart.any():
-            data = self.uart.read()
-            if data:
-                # Convert bytes to printable characters
-                for b in data:
-                    if 32 <= b <= 126 or b == 10:
-                        self.buffer += chr(b)
-
-                # Process complete lines
-                while "\n" in self.buffer:
-                    line, self.buffer = self.buffer.split("\n", 1)
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    self._parse_line(line)
-                    self.new_data = True
-                    self.uart_blink = not self.uart_blink
-
-    def _parse_line(self, line):
+        rx = self._rx
+        while self.uart.any():
+            n = self.uart.readinto(rx)
+            if not n:
+                break
+            self.ingest(rx, n, time.ticks_us())
+
+    def ingest(self, buf, n, t_us=0):
+        """
+        Parse the first n bytes of buf, e.g. from an asyncio stream read,
+        whose last byte arrived at t_us. Sets new_data when a message
+        completes; the caller clears it.
+        """
+        self._end_us = t_us
+        self._end_n = n
+        st = self._scan
+        st[SCAN_POS] = 0
+        st[SCAN_END] = n
+        while True:
+            term = self._scan_line(buf, self._line, st)
+            if term < 0:
+                return
+            if st[SCAN_LEN] and not st[SCAN_OVER]:
+                # scan_line() skips blank lines and takes a message whose
+                # first byte is a control byte (a frame's COBS code byte) as
+                # binary, and those only end at 0x00; a newline ends an
+                # all-printable line.
+                if term == 0:
+                    self._end_frame()
+                else:
+                    self._end_line()
+            self._reset_line()
+
+    def _reset_line(self):
+        st = self._scan
+        st[SCAN_LEN] = 0
+        st[SCAN_OVER] = 0
+        st[SCAN_ASCII] = 1
+        st[SCAN_LF] = 0
+
+    def _received(self):
+        # With a sample queue nothing is replaced; its own drop count says
+        # what was lost.
+        if self.new_data and self.samples is None:
+            self.samples_coalesced += 1
+        self.new_data = True
+        self.uart_blink = not self.uart_blink
+        # The terminator is the byte before SCAN_POS
+        t = time.ticks_add(self._end_us, -(self._end_n - self._scan[SCAN_POS]) * self.byte_us)
+        self.sample_us = t
+        if self.samples is not None:
+            self.samples.push(t, self.rpm, self.voltage_dv, self.current_ma,
+                              self.duty, self.throttle, self.eco)
+
+    # ---------------- Legacy ASCII lines ----------------
+
+    def _end_line(self):
+        n = self._scan[SCAN_LEN]
+        while n and self._line[n - 1] == 13:   # '\r'
+            n -= 1
+        if not n:
+            return
+        if self._parse_line(n):
+            self.lines_parsed += 1
+            self._received()
+
+    def _field(self, start, end):
+        """Decode line[start:end] as a signed decimal integer, in place."""
+        line = self._line
+        v = 0
+        neg = False
+        for i in range(start, end):
+            b = line[i]
+            if 48 <= b <= 57:
+                v = v * 10 + b - 48
+            elif b == 45 and i == start:   # '-'
+                neg = True
+            else:
+                self._field_ok = False
+        return -v if neg else v
+
+    def _parse_line(self, n):
         """Parses a single line of data from the UART."""
-        try:
-            if line.startswith("s"):
-                self.voltage = float(line[1:4]) / 10
-                self.current = float(line[4:10]) / 1000
-                self.rpm = int(line[10:13])
-                self.duty = int(line[13:16])
-                self.throttle = int(line[16:19])
-                self.eco = bool(int(line[19:]))
-        except Exception as e:
-            print("Parse error:", e, "on line:", line)
\ No newline at end of file
+        line = self._line
+        if line[0] != 115:   # 's'
+            return False
+        if n != LEGACY_LEN:
+            self._parse_error(n)
+            return False
+
+        self._field_ok = True
+        voltage_dv = self._field(1, 4)
+        current_ma = self._field(4, 10)
+        rpm = self._field(10, 13)
+        duty = self._field(13, 16)
+        throttle = self._field(16, 19)
+        eco = self._field(19, 20)
+        if not self._field_ok:
+            self._parse_error(n)
+            return False
+
+        self.voltage_dv = voltage_dv
+        self.current_ma = current_ma
+        self.rpm = rpm
+        self.duty = duty
+        self.throttle = throttle
+        self.eco = eco != 0
+        return True
+
+    def _parse_error(self, n):
+        self.parse_errors += 1
+        print("Parse error on line:", bytes(self._line[:n]))
+
+    # ---------------- Binary frames ----------------
+
+    def _cobs_decode(self, start, n):
+        """Decode the COBS frame in _line[start:n] into _frame; returns its length or -1."""
+        buf = self._line
+        out = self._frame
+        i = start
+        o = 0
+        while i < n:
+            code = buf[i]
+            i += 1
+            end = i + code - 1
+            if end > n:
+                return -1
+            while i < end:
+                out[o] = buf[i]
+                o += 1
+                i += 1
+            if code != 0xFF and i < n:
+                out[o] = 0
+                o += 1
+        return o
+
+    def _crc16(self, n):
+        crc = 0xFFFF
+        buf = self._frame
+        table = _CRC_TABLE
+        for i in range(n):
+            crc = ((crc << 8) & 0xFFFF) ^ table[((crc >> 8) ^ buf[i]) & 0xFF]
+        return crc
+
+    def _frame_len(self, start):
+        """Length of the valid frame decoded from _line[start:] into _frame, or 0."""
+        n = self._cobs_decode(start, self._scan[SCAN_LEN])
+        f = self._frame
+        if n < FRAME_V1_LEN or f[0] < 1:
+            return 0
+        if self._crc16(n - 2) != f[n - 2] | (f[n - 1] << 8):
+            return 0
+        return n
+
+    def _end_frame(self):
+        # A '\r' or '\n' just before the frame is either its code byte or a
+        # blank line; the CRC tells.
+        if not self._frame_len(0) and not (self._scan[SCAN_LF] and self._frame_len(1)):
+            self.crc_errors += 1
+            return
+
+        f = self._frame
+        seq = f[1]
+        if self._last_seq >= 0:
+            self.frames_dropped += (seq - self._last_seq - 1) & 0xFF
+        self._last_seq = seq
+        self.frames_received += 1
+        self.binary_link = True
+
+        self.controller_tick_ms = f[2] | (f[3] << 8) | (f[4] << 16) | (f[5] << 24)
+        self.voltage_dv = f[6] | (f[7] << 8)
+        current = f[8] | (f[9] << 8)
+        self.current_ma = current - 0x10000 if current & 0x8000 else current
+        self.rpm = f[10] | (f[11] << 8)
+        self.duty = f[12]
+        self.throttle = f[13]
+        self.eco = bool(f[14] & FLAG_ECO)
+        self._received()
@@ -0,0 +1,69 @@
+import utime as time
+
+# ---------------- File format ----------------
+# Header: b"DCAP", version, 3 reserved bytes. Then one record per UART read:
+# ticks_us (u32 LE, wraps at 2**30 like the device clock), length (u16 LE)
+# and the bytes as read. dishost/replay.py reads and replays these files.
+MAGIC = b"DCAP"
+VERSION = 1
+HEADER = MAGIC + bytes((VERSION, 0, 0, 0))
+RECORD_HEAD = 6
+
+class UartCapture:
+    """
+    Records raw UART reads with their arrival time so a race can be replayed
+    on the host. add() copies into a preallocated buffer; flush() writes it
+    out and is meant for the log task. If the buffer fills before a flush
+    the read is dropped and counted.
+    """
+    def __init__(self, path="uart.cap", buf_size=2048):
+        self.path = path
+        self._buf = bytearray(buf_size)
+        self._view = memoryview(self._buf)
+        self._len = 0
+        self._file = None
+        self.reads = 0
+        self.bytes_captured = 0
+        self.dropped = 0
+
+    def add(self, data, n, t_us=None):
+        """Record the first n bytes of data, received at t_us (default now)."""
+        if t_us is None:
+            t_us = time.ticks_us()
+        p = self._len
+        if p + RECORD_HEAD + n > len(self._buf):
+            self.dropped += 1
+            return False
+        buf = self._buf
+        buf[p] = t_us & 0xFF
+        buf[p + 1] = (t_us >> 8) & 0xFF
+        buf[p + 2] = (t_us >> 16) & 0xFF
+        buf[p + 3] = (t_us >> 24) & 0xFF
+        buf[p + 4] = n & 0xFF
+        buf[p + 5] = n >> 8
+        p += RECORD_HEAD
+        for i in range(n):
+            buf[p + i] = data[i]
+        self._len = p + n
+        self.reads += 1
+        self.bytes_captured += n
+        return True
+
+    def flush(self):
+        if not self._len:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, "wb")
+                self._file.write(HEADER)
+            self._file.write(self._view[:self._len])
+            self._file.flush()
+        except OSError as e:
+            print("Capture write failed:", e)
+        self._len = 0
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,155 @@
+from array import array
+import utime as time
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+class UartReceiver:
+    """
+    Reads the UART from its receive interrupt (IRQ_RXIDLE) into a ring of
+    preallocated chunks, each stamped with the ticks_us() at which its last
+    byte arrived. The parser then runs from a task whenever it gets to it,
+    but every line still carries its own arrival time (see
+    UartManager.ingest()), so a slow frame delays parsing, not the data.
+
+    Bytes that arrive while every chunk is in use stay in the UART's own
+    buffer until the next interrupt; full counts those reads. Without
+    UART.irq() (irq is False) call poll() from a task instead.
+    """
+    def __init__(self, uart, byte_us=0, chunks=16, chunk=64):
+        self.uart = uart
+        self.byte_us = byte_us
+        self._buf = bytearray(chunks * chunk)
+        mv = memoryview(self._buf)
+        self._views = tuple(mv[i * chunk:(i + 1) * chunk] for i in range(chunks))
+        self._len = array("H", [0] * chunks)
+        self._t = array("i", [0] * chunks)
+        self._mask = chunks - 1     # chunks must be a power of two
+        self._head = 0
+        self._tail = 0
+        self.reads = 0
+        self.full = 0
+        self.max_backlog = 0        # most chunks waiting for the parser
+        self.flag = asyncio.ThreadSafeFlag() if asyncio else None
+        try:
+            uart.irq(self._irq, uart.IRQ_RXIDLE)
+            self.irq = True
+        except (AttributeError, ValueError):
+            self.irq = False
+
+    def _irq(self, uart):
+        self.poll()
+
+    def poll(self):
+        """Read whatever the UART holds into free chunks."""
+        t = time.ticks_us()
+        first = self._head
+        total = 0
+        mask = self._mask
+        while True:
+            h = self._head
+            n = (h + 1) & mask
+            if n == self._tail:
+                if self.uart.any():
+                    self.full += 1
+                break
+            got = self.uart.readinto(self._views[h])
+            if not got:
+                break
+            self._len[h] = got
+            total += got
+            self._t[h] = total      # bytes up to the end of this chunk, fixed below
+            self._head = n
+        if not total:
+            return
+        # Every byte was in by t; a chunk's last byte arrived as many byte
+        # times earlier as there are bytes after it.
+        i = first
+        while i != self._head:
+            self._t[i] = time.ticks_add(t, -(total - self._t[i]) * self.byte_us)
+            i = (i + 1) & mask
+        self.reads += 1
+        backlog = (self._head - self._tail) & mask
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+        if self.flag is not None:
+            self.flag.set()
+
+    def pending(self):
+        return (self._head - self._tail) & self._mask
+
+    def peek(self):
+        """Index of the oldest chunk, or -1. Read it with view(), length() and t_us()."""
+        return self._tail if self._tail != self._head else -1
+
+    def view(self, i):
+        return self._views[i]
+
+    def length(self, i):
+        return self._len[i]
+
+    def t_us(self, i):
+        return self._t[i]
+
+    def release(self):
+        """Hand the oldest chunk back to the interrupt."""
+        self._tail = (self._tail + 1) & self._mask
+
+
+class SampleQueue:
+    """
+    Parsed samples with their arrival time, oldest first, for the code that
+    integrates them. Fixed size; a sample pushed onto a full queue is
+    dropped and counted.
+    """
+    def __init__(self, size=32):
+        self.t_us = array("i", [0] * size)
+        self.rpm = array("i", [0] * size)
+        self.voltage_dv = array("i", [0] * size)
+        self.current_ma = array("i", [0] * size)
+        self.duty = array("i", [0] * size)
+        self.throttle = array("i", [0] * size)
+        self.eco = array("i", [0] * size)
+        self._mask = size - 1       # size must be a power of two
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def push(self, t_us, rpm, voltage_dv, current_ma, duty=0, throttle=0, eco=0):
+        h = self._head
+        n = (h + 1) & self._mask
+        if n == self._tail:
+            self.dropped += 1
+            return
+        self.t_us[h] = t_us
+        self.rpm[h] = rpm
+        self.voltage_dv[h] = voltage_dv
+        self.current_ma[h] = current_ma
+        self.duty[h] = duty
+        self.throttle[h] = throttle
+        self.eco[h] = eco
+        self._head = n
+        depth = (n - self._tail) & self._mask
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def peek(self):
+        """Index of the oldest sample, left in the queue, or -1."""
+        return self._tail if self._tail != self._head else -1
+
+    def pop(self):
+        """
+        Index of the oldest sample, removed from the queue, or -1. Read its
+        fields before the next push() can reuse the slot.
+        """
+        i = self._tail
+        if i == self._head:
+            return -1
+        self._tail = (i + 1) & self._mask
+        return i
+
+    def __len__(self):
+        return (self._head - self._tail) & self._mask
@@ -1,9 +1,96 @@
 import framebuf
 
+class GlyphCache:
+    """
+    Ready-to-blit glyph FrameBuffers for one font, bounded by max_bytes.
+    When the budget is exceeded the least recently used glyph is dropped,
+    so a large font cannot take over RAM. Widths are kept separately since
+    they are just small ints.
+    """
+    def __init__(self, font, fb_map, max_bytes):
+        self.font = font
+        self.map = fb_map
+        self.max_bytes = max_bytes
+        self._glyphs = {}   # char -> [fbuf, height, width, nbytes, last_use]
+        self._widths = {}   # char -> width (0 for unsupported characters)
+        self._bytes = 0
+        self._clock = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, c):
+        """Return [fbuf, height, width, ...] for c, or None if unsupported."""
+        self._clock += 1
+        entry = self._glyphs.get(c)
+        if entry is not None:
+            self.hits += 1
+            entry[4] = self._clock
+            return entry
+
+        self.misses += 1
+        glyph, ht, wd = self.font.get_ch(c)
+        if glyph is None:
+            self._widths[c] = 0
+            return None
+        self._widths[c] = wd
+
+        buf = bytearray(glyph)   # memoryview → bytes
+        nbytes = len(buf)
+        while self._glyphs and self._bytes + nbytes > self.max_bytes:
+            self._evict()
+        entry = [framebuf.FrameBuffer(buf, wd, ht, self.map), ht, wd, nbytes, self._clock]
+        self._glyphs[c] = entry
+        self._bytes += nbytes
+        return entry
+
+    def width(self, c):
+        wd = self._widths.get(c)
+        if wd is None:
+            glyph, ht, wd = self.font.get_ch(c)
+            if glyph is None:
+                wd = 0
+            self._widths[c] = wd
+        return wd
+
+    def _evict(self):
+        oldest = None
+        oldest_use = 0
+        for c, entry in self._glyphs.items():
+            if oldest is None or entry[4] < oldest_use:
+                oldest = c
+                oldest_use = entry[4]
+        self._bytes -= self._glyphs.pop(oldest)[3]
+        self.evictions += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "glyphs": len(self._glyphs),
+            "bytes": self._bytes,
+        }
+
+
+# Shared per font module, so Writers on the same font reuse the same glyphs.
+_glyph_caches = {}
+
+def glyph_cache(font, fb_map=framebuf.MONO_HLSB, max_bytes=3072):
+    cache = _glyph_caches.get(font)
+    if cache is None:
+        cache = GlyphCache(font, fb_map, max_bytes)
+        _glyph_caches[font] = cache
+    return cache
+
+
 class Writer:
-    def __init__(self, device, font, verbose = True):
+    def __init__(self, device, font, verbose = True, cache_bytes=3072):
         self.device = device
         self.font = font
+        # Drivers that track dirty regions get told which rows a glyph touched.
+        self._mark_dirty = getattr(device, "mark_dirty", None)
 
         # For this font: hmap() == True, reverse() == False
         # So we render as MONO_HMSB directly.
@@ -26,6 +113,18 @@ class Writer:
         self.tab = 0
         self.text_style = 0     #0 = normal, 1 = invert, 2 = underline
 
+        # .fnt fonts (binfont.BinFont) copy rows straight into a MONO_HMSB
+        # device buffer and cache their own glyphs; font_to_py modules go
+        # through GlyphCache and framebuf.blit().
+        self._native = hasattr(font, "blit_hmsb") and hasattr(device, "buffer")
+        if self._native:
+            self._stride = device.width // 8
+            self.cache = font
+        else:
+            self.cache = glyph_cache(font, self.map, cache_bytes)
+        self._len_memo = {}     # string -> stringlen(), cleared when full
+        self._len_memo_max = 16
+
     # -------------- Position/style helpers ---------------------------
 
     def set_clip(self, clip, row_clip=False, col_clip=False):
@@ -67,9 +166,19 @@ class Writer:
             self.col = (self.col + self.tab) // self.tab * self.tab
             return
 
-        glyph, ht, wd = self.font.get_ch(c)
-        if glyph is None:
-            return  # unsupported character
+        if self._native:
+            fbc = None
+            ht = self.height
+            wd = self.font.width(c)
+            if not wd:
+                return
+        else:
+            entry = self.cache.get(c)
+            if entry is None:
+                return  # unsupported character
+            fbc = entry[0]
+            ht = entry[1]
+            wd = entry[2]
 
         # Wrap / clip checks
         if self.col + wd > self.device.width:
@@ -100,23 +209,36 @@ class Writer:
         if style & 1:
             color = 0 if color else 1
 
-        buf = bytearray(glyph)   # memoryview → bytes
-        fbc = framebuf.FrameBuffer(buf, wd, ht, self.map)
-
-        self.device.blit(fbc, self.col, self.row, -1)
+        if fbc is None:
+            self.font.blit_hmsb(c, self.device.buffer, self._stride, self.device.height,
+                                self.col, self.row)
+        else:
+            self.device.blit(fbc, self.col, self.row, -1)
 
         if style & 2:
             self.device.line(self.col, self.row + ht - 1,
                              self.col + wd, self.row + ht - 1, color)
 
+        if self._mark_dirty:
+            self._mark_dirty(self.row, ht)
+
         self.col += wd
 
     # ------------ Metrics ------------
 
     def stringlen(self, s):
+        l = self._len_memo.get(s)
+        if l is not None:
+            return l
         l = 0
         for c in s:
-            glyph, ht, wd = self.font.get_ch(c)
-            if glyph:
-                l += wd
+            l += self.cache.width(c)
+        if len(self._len_memo) >= self._len_memo_max:
+            self._len_memo.clear()
+        self._len_memo[s] = l
         return l
+
+    def cache_stats(self):
+        """Glyph cache counters; misses stop growing once rendering is steady."""
+        return self.cache.stats()
+
@@ -0,0 +1,88 @@
+"""
+dishost: run the DIS/device code on CPython.
+
+Provides stand-ins for the MicroPython modules the dash uses (machine,
+framebuf, micropython, utime/time, uasyncio/asyncio) on top of a virtual
+clock, plus a scriptable UART feed. Typical use, from DIS/host:
+
+    import dishost
+    result = dishost.run_main(duration_s=60, speed=20)
+    print(result.summary())
+
+or ``python -m dishost --duration 60 --speed 20``. Submodules are imported
+lazily so dishost.telemetry can be used on its own.
+"""
+import sys
+import time as _time
+
+STAND_INS = ("machine", "framebuf", "micropython", "utime", "uasyncio")
+
+
+def install(clock=None, device_dir=None):
+    """
+    Register the stand-ins in sys.modules, make device modules importable and
+    return the active clock. Call again to start a fresh run.
+    """
+    import importlib
+    from dishost import clock as clock_mod, loader
+
+    if clock is None:
+        clock = clock_mod.Clock()
+    clock_mod.set_clock(clock)
+    for name in STAND_INS:
+        sys.modules[name] = importlib.import_module("dishost." + name)
+    sys.modules["machine"].reset_registry()
+    loader.install_finder(device_dir or loader.DEVICE_DIR)
+    return clock
+
+
+class RunResult:
+    def __init__(self, clock, namespace, wall_s, stopped):
+        self.clock = clock
+        self.namespace = namespace      # the main module's globals
+        self.wall_s = wall_s
+        self.virtual_s = clock.elapsed_us() / 1000000
+        self.stopped = stopped          # True if ended by the time limit
+
+    def summary(self):
+        import machine
+        lines = ["virtual {:.2f}s in {:.2f}s wall ({:.1f}x)".format(
+            self.virtual_s, self.wall_s, self.virtual_s / self.wall_s if self.wall_s else 0)]
+        for spi_id, spi in sorted(machine._spis.items()):
+            lines.append("spi{}: {} bytes in {} writes".format(
+                spi_id, spi.bytes_written, spi.transactions))
+        for uart_id, uart in sorted(machine._uarts.items()):
+            lines.append("uart{}: {} bytes received, {} lost to overrun".format(
+                uart_id, uart.bytes_received, uart.overrun_bytes))
+        return "\n".join(lines)
+
+
+def run_main(duration_s=10.0, speed=1.0, step_us=0, start_ms=0, feed=None,
+             device_dir=None, module="main", setup=None):
+    """
+    Run device_dir/main.py unmodified until duration_s of virtual time has
+    passed. feed (e.g. telemetry.ControllerFeed()) is attached to UART 1
+    before the main loop starts. setup(machine), if given, runs just before
+    main.py, e.g. to schedule button presses.
+    """
+    from dishost import loader
+    from dishost.clock import Clock, SimulationEnd
+
+    clock = install(Clock(speed=speed, step_us=step_us, start_ms=start_ms,
+                          duration_s=duration_s), device_dir)
+    device_dir = device_dir or loader.DEVICE_DIR
+
+    import config   # builds the UART the feed attaches to
+    if feed is not None:
+        sys.modules["machine"].uart(1).attach(feed)
+    if setup is not None:
+        setup(sys.modules["machine"])
+
+    mod = loader.new_module(module, device_dir)
+    wall0 = _time.perf_counter()
+    stopped = False
+    try:
+        mod.__spec__.loader.exec_module(mod)
+    except SimulationEnd:
+        stopped = True
+    return RunResult(clock, mod.__dict__, _time.perf_counter() - wall0, stopped)
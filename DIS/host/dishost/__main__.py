@@ -0,0 +1,30 @@
+"""Command line entry: python -m dishost [options] (run from DIS/host)."""
+import argparse
+
+import dishost
+from dishost.telemetry import ControllerFeed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run DIS/device/main.py on CPython.")
+    ap.add_argument("--duration", type=float, default=10.0, help="virtual seconds to run")
+    ap.add_argument("--speed", type=float, default=1.0,
+                    help="virtual seconds per wall second (0 = clock only moves by --step-us)")
+    ap.add_argument("--step-us", type=int, default=0, help="virtual us charged per clock read")
+    ap.add_argument("--start-ms", type=int, default=0,
+                    help="initial ticks_ms(), e.g. 1073740000 to cross the wrap")
+    ap.add_argument("--ascii", action="store_true", help="feed legacy ASCII lines")
+    ap.add_argument("--no-feed", action="store_true", help="leave the UART silent")
+    args = ap.parse_args(argv)
+
+    if args.speed == 0 and args.step_us == 0:
+        ap.error("--speed 0 needs --step-us, or the clock never advances")
+
+    feed = None if args.no_feed else ControllerFeed(binary=not args.ascii)
+    result = dishost.run_main(duration_s=args.duration, speed=args.speed,
+                              step_us=args.step_us, start_ms=args.start_ms, feed=feed)
+    print(result.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Build a deployable copy of DIS/device with every module precompiled to .mpy,
+so the board does not compile source on power-up.
+
+    python -m dishost.build                      (writes DIS/build/device)
+    python -m dishost.build --out /tmp/dash --no-fonts
+
+MicroPython always runs main.py from source, so main.py is compiled to
+dash.mpy and replaced by a one-line main.py that imports it. Fonts are
+rebuilt with dishost.fontpack first, and data files (*.fnt, *.bin) are
+copied as they are. Needs mpy-cross matching the board's firmware
+(pip install mpy-cross==<firmware version>, or --mpy-cross PATH). Copy the
+result with e.g.
+
+    mpremote cp -r DIS/build/device/. :
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+from dishost.loader import DEVICE_DIR
+
+BUILD_DIR = os.path.normpath(os.path.join(DEVICE_DIR, "..", "build", "device"))
+MAIN_MODULE = "dash"
+DATA_SUFFIXES = (".fnt", ".bin")
+# Run from source on the board, so never compiled.
+SOURCE_ONLY = ("boot.py",)
+
+
+def find_mpy_cross(path=None):
+    exe = path or shutil.which("mpy-cross")
+    if not exe:
+        raise SystemExit("mpy-cross not found (pip install mpy-cross, or pass --mpy-cross)")
+    return exe
+
+
+def device_files(src):
+    """(relative path, kind) for every file to deploy; kind is 'py' or 'data'."""
+    out = []
+    for root, dirs, files in os.walk(src):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(files):
+            rel = os.path.relpath(os.path.join(root, name), src)
+            if name.endswith(".py"):
+                out.append((rel, "py"))
+            elif name.endswith(DATA_SUFFIXES):
+                out.append((rel, "data"))
+    return out
+
+
+def build(src=DEVICE_DIR, out=BUILD_DIR, mpy_cross=None, arch="armv6m", opt=0):
+    exe = find_mpy_cross(mpy_cross)
+    if os.path.isdir(out):
+        shutil.rmtree(out)
+    os.makedirs(out)
+    total_src = 0
+    total_out = 0
+    for rel, kind in device_files(src):
+        path = os.path.join(src, rel)
+        total_src += os.path.getsize(path)
+        if kind == "data" or rel in SOURCE_ONLY:
+            dest = os.path.join(out, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copyfile(path, dest)
+        else:
+            name = MAIN_MODULE + ".py" if rel == "main.py" else rel
+            dest = os.path.join(out, name[:-3] + ".mpy")
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            cmd = [exe, "-march=" + arch, "-O%d" % opt, "-s", name, "-o", dest, path]
+            subprocess.run(cmd, check=True)
+        total_out += os.path.getsize(dest)
+
+    main = os.path.join(out, "main.py")
+    with open(main, "w") as f:
+        f.write("import %s\n" % MAIN_MODULE)
+    total_out += os.path.getsize(main)
+    return total_src, total_out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m dishost.build",
+                                 description="Precompile DIS/device for deployment.")
+    ap.add_argument("--out", default=BUILD_DIR)
+    ap.add_argument("--mpy-cross", help="mpy-cross executable (default: from PATH)")
+    ap.add_argument("--arch", default="armv6m", help="native code target (RP2040: armv6m)")
+    ap.add_argument("-O", dest="opt", type=int, default=0, help="mpy-cross optimisation level")
+    ap.add_argument("--no-fonts", action="store_true", help="do not rebuild the .fnt fonts")
+    args = ap.parse_args(argv)
+
+    if not args.no_fonts:
+        from dishost import fontpack
+        fontpack.main([])
+    src_bytes, out_bytes = build(DEVICE_DIR, args.out, args.mpy_cross, args.arch, args.opt)
+    print("%s: %d bytes (%d bytes of source)" % (args.out, out_bytes, src_bytes))
+    print("deploy with: mpremote cp -r %s/. :" % args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
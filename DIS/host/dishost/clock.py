@@ -0,0 +1,131 @@
+"""
+Virtual clock behind the utime stand-in.
+
+MicroPython tick counters wrap at 2**30 on the rp2 port; the stand-ins wrap
+the same way so ticks_diff()/ticks_add() bugs show up on the host too.
+"""
+import time as _time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+class SimulationEnd(BaseException):
+    """Raised from a clock read once the run's virtual duration is over."""
+
+
+class Clock:
+    """
+    speed     virtual seconds per wall-clock second. 1.0 runs in real time,
+              larger values run accelerated. 0 freezes wall time so only
+              step_us and sleeps advance the clock (fully deterministic).
+    step_us   virtual time charged for every clock read, a crude model of
+              the CPU cost between two reads.
+    start_ms  initial ticks_ms() value; set it close to TICKS_MAX to test
+              wraparound handling.
+    duration_s  raise SimulationEnd once this much virtual time has passed.
+    """
+    def __init__(self, speed=1.0, step_us=0, start_ms=0, duration_s=None):
+        self.speed = speed
+        self.step_us = step_us
+        self._base_us = start_ms * 1000
+        self._offset_us = 0
+        self._wall0 = _time.perf_counter()
+        self._end_us = None if duration_s is None else int(duration_s * 1000000)
+        self._events = []       # sorted [due_us, seq, fn]
+        self._seq = 0
+        self._in_events = False
+        self.reads = 0
+
+    # ---------------- Time base ----------------
+
+    def elapsed_us(self):
+        """Virtual microseconds since the clock was created (no wrap)."""
+        us = self._offset_us
+        if self.speed:
+            us += int((_time.perf_counter() - self._wall0) * 1000000 * self.speed)
+        return us
+
+    def now_us(self):
+        """Advance bookkeeping for one clock read and return elapsed_us()."""
+        self.reads += 1
+        if self.step_us:
+            self._offset_us += self.step_us
+        us = self.elapsed_us()
+        if self._events and not self._in_events:
+            self._run_events(us)
+        if self._end_us is not None and us >= self._end_us:
+            raise SimulationEnd()
+        return us
+
+    def advance_us(self, us):
+        """Move virtual time forward without waiting (used by sleeps)."""
+        if us <= 0:
+            return
+        if self.speed == 1.0:
+            _time.sleep(us / 1000000)
+        else:
+            self._offset_us += int(us)
+        self.now_us()
+
+    def end_at_us(self, us):
+        """Move the end of the run to us of virtual time."""
+        self._end_us = int(us)
+
+    def disarm(self):
+        """Drop the duration limit, e.g. so tasks can be cancelled after SimulationEnd."""
+        self._end_us = None
+
+    # ---------------- Scheduled events ----------------
+
+    def call_at_us(self, due_us, fn):
+        """Run fn() on the first clock read at or after due_us (virtual)."""
+        self._seq += 1
+        entry = [due_us, self._seq, fn]
+        events = self._events
+        i = len(events)
+        while i and events[i - 1][:2] > entry[:2]:
+            i -= 1
+        events.insert(i, entry)
+
+    def call_after_ms(self, delay_ms, fn):
+        self.call_at_us(self.elapsed_us() + int(delay_ms * 1000), fn)
+
+    def _run_events(self, us):
+        # Events behave like interrupts: they fire from inside a clock read.
+        self._in_events = True
+        try:
+            while self._events and self._events[0][0] <= us:
+                self._events.pop(0)[2]()
+        finally:
+            self._in_events = False
+
+    # ---------------- MicroPython tick API ----------------
+
+    def ticks_us(self):
+        return (self._base_us + self.now_us()) & TICKS_MAX
+
+    def ticks_ms(self):
+        return ((self._base_us + self.now_us()) // 1000) & TICKS_MAX
+
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+_clock = Clock()
+
+
+def get():
+    return _clock
+
+
+def set_clock(clock):
+    global _clock
+    _clock = clock
+    return clock
@@ -0,0 +1,163 @@
+"""
+Decoder for the flash logs written by DIS/device/datalog.py.
+
+    from dishost import datalog
+    cols = datalog.decode_files(["race_0000.bin", "race_0001.bin"])
+    cols["rpm"], cols["t_ms"] ...
+
+Each column is an array.array of equal length; pass numpy=True to get
+numpy arrays instead. t_ms is the dash's ticks_ms() when the sample
+arrived over the UART (the controller's clock is not logged), unwrapped
+from the 2**30 tick period so it increases monotonically across a file.
+Blocks with a bad header (torn by a power cut, or never written) are
+skipped and counted in the "bad_blocks" entry of the result.
+
+Command line: python -m dishost.datalog FILE... prints a CSV.
+"""
+import sys
+from array import array
+
+# Mirrors the constants in DIS/device/datalog.py.
+MAGIC = b"DL"
+VERSION = 1
+HEADER_LEN = 6
+BLOCK_SIZE = 512
+FIELDS = ("tick_ms", "voltage_dv", "current_ma", "rpm", "duty", "throttle",
+          "flags", "distance_umi")
+FLAG_ECO = 0x01
+TIMER_SHIFT = 1
+TIMER_STATES = ("reset", "running", "paused")
+TICKS_PERIOD = 1 << 30
+
+COLUMNS = ("t_ms", "voltage", "current", "rpm", "duty", "throttle", "eco",
+           "timer_state", "distance_mi")
+
+
+def _varints(buf, pos, end):
+    """Yield zigzag-decoded varints from buf[pos:end]."""
+    while pos < end:
+        v = 0
+        shift = 0
+        while True:
+            b = buf[pos]
+            pos += 1
+            v |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                break
+        yield (v >> 1) if not v & 1 else -((v + 1) >> 1)
+
+
+def iter_block_records(block):
+    """Yield the raw field tuples of one block, or raise ValueError if it is bad."""
+    if len(block) < HEADER_LEN or block[:2] != MAGIC:
+        raise ValueError("bad magic")
+    if block[2] != VERSION:
+        raise ValueError("unsupported version %d" % block[2])
+    count = block[3]
+    used = block[4] | (block[5] << 8)
+    if used < HEADER_LEN or used > len(block):
+        raise ValueError("bad length")
+    values = _varints(block, HEADER_LEN, used)
+    prev = [0] * len(FIELDS)
+    for n in range(count):
+        rec = []
+        for i in range(len(FIELDS)):
+            try:
+                d = next(values)
+            except StopIteration:
+                raise ValueError("record %d truncated" % n) from None
+            if i == 0:
+                v = (prev[0] + d) % TICKS_PERIOD if n else d
+            else:
+                v = prev[i] + d
+            prev[i] = v
+            rec.append(v)
+        yield rec
+
+
+def decode_bytes(data, numpy=False):
+    """Decode a log image into a dict of columns."""
+    cols = {
+        "t_ms": array("q"),
+        "voltage": array("d"),
+        "current": array("d"),
+        "rpm": array("l"),
+        "duty": array("l"),
+        "throttle": array("l"),
+        "eco": array("b"),
+        "timer_state": array("b"),
+        "distance_mi": array("d"),
+    }
+    bad = 0
+    last_tick = None
+    t_ms = 0
+    for off in range(0, len(data) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        block = data[off:off + BLOCK_SIZE]
+        try:
+            records = list(iter_block_records(block))
+        except ValueError:
+            bad += 1
+            continue
+        for tick, voltage_dv, current_ma, rpm, duty, throttle, flags, dist in records:
+            if last_tick is None:
+                t_ms = tick
+            else:
+                d = (tick - last_tick) % TICKS_PERIOD
+                if d >= TICKS_PERIOD // 2:
+                    d -= TICKS_PERIOD
+                t_ms += d
+            last_tick = tick
+            cols["t_ms"].append(t_ms)
+            cols["voltage"].append(voltage_dv / 10)
+            cols["current"].append(current_ma / 1000)
+            cols["rpm"].append(rpm)
+            cols["duty"].append(duty)
+            cols["throttle"].append(throttle)
+            cols["eco"].append(flags & FLAG_ECO)
+            cols["timer_state"].append((flags >> TIMER_SHIFT) & 0x03)
+            cols["distance_mi"].append(dist / 1000000)
+    if numpy:
+        import numpy as np
+        cols = {k: np.asarray(v) for k, v in cols.items()}
+    cols["bad_blocks"] = bad
+    return cols
+
+
+def decode_file(path, numpy=False):
+    with open(path, "rb") as f:
+        return decode_bytes(f.read(), numpy)
+
+
+def decode_files(paths, numpy=False):
+    """Decode several files (e.g. one rotation set, oldest first) as one log."""
+    data = bytearray()
+    for p in paths:
+        with open(p, "rb") as f:
+            data += f.read()
+    return decode_bytes(bytes(data), numpy)
+
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print("usage: python -m dishost.datalog FILE...", file=sys.stderr)
+        return 2
+    cols = decode_files(paths)
+    out = sys.stdout
+    out.write(",".join(COLUMNS) + "\n")
+    for i in range(len(cols["t_ms"])):
+        row = []
+        for name in COLUMNS:
+            v = cols[name][i]
+            if name == "timer_state":
+                v = TIMER_STATES[v] if v < len(TIMER_STATES) else v
+            row.append(str(v))
+        out.write(",".join(row) + "\n")
+    if cols["bad_blocks"]:
+        print("skipped %d bad blocks" % cols["bad_blocks"], file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Build step for the dash's fonts: convert the font_to_py modules in
+DIS/device/fonts/ into .fnt files laid out for the MONO_HMSB framebuffer
+(format in DIS/device/binfont.py).
+
+font_to_py glyphs are MONO_HLSB (MSB = leftmost pixel) and are blitted pixel
+by pixel. A .fnt glyph is stored LSB-first and pre-shifted for all eight
+x & 7 phases, so drawing it is a copy of whole bytes per row.
+
+    python -m dishost.fontpack                   (every font in DIS/device/fonts)
+    python -m dishost.fontpack font_digits_large --check
+"""
+import argparse
+import importlib.util
+import os
+import struct
+import sys
+
+from dishost.loader import DEVICE_DIR
+
+MAGIC = b"DFNT"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBBB6x")
+GLYPH = struct.Struct("<IBx")
+FONT_DIR = os.path.join(DEVICE_DIR, "fonts")
+
+
+def load_font_module(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location("_fontpack_" + name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def glyph_pixels(font, ch):
+    """(width, rows) for ch, rows as ints with bit c = pixel c from the left."""
+    data, height, width = font.get_ch(ch)
+    data = bytes(data)
+    nbs = (width + 7) // 8
+    rows = []
+    for r in range(height):
+        v = 0
+        for c in range(width):
+            if data[r * nbs + (c >> 3)] & (0x80 >> (c & 7)):
+                v |= 1 << c
+        rows.append(v)
+    return width, rows
+
+
+def glyph_phases(width, rows):
+    """The eight pre-shifted copies of a glyph, concatenated."""
+    out = bytearray()
+    for phase in range(8):
+        nb = (phase + width + 7) >> 3
+        for v in rows:
+            out += (v << phase).to_bytes(nb, "little")
+    return bytes(out)
+
+
+def pack_font(font):
+    """Return the .fnt bytes for a font_to_py module."""
+    if not font.hmap() or font.reverse():
+        raise ValueError("only hmap, non-reversed fonts are supported")
+    height = font.height()
+    lo, hi = font.min_ch(), font.max_ch()
+    # Glyph 0 is whatever get_ch() returns for a character outside the font.
+    glyphs = [glyph_pixels(font, "\x00")]
+    ids = []
+    for code in range(lo, hi + 1):
+        g = glyph_pixels(font, chr(code))
+        if g not in glyphs:
+            glyphs.append(g)
+        ids.append(glyphs.index(g))
+    if len(glyphs) > 255 or max(w for w, _ in glyphs) > 255:
+        raise ValueError("font too large for the DFNT table")
+
+    data_start = HEADER.size + len(ids) + GLYPH.size * len(glyphs)
+    table = bytearray()
+    data = bytearray()
+    for width, rows in glyphs:
+        table += GLYPH.pack(data_start + len(data), width)
+        data += glyph_phases(width, rows)
+    head = HEADER.pack(MAGIC, VERSION, height, font.max_width(), lo, hi, len(glyphs))
+    return head + bytes(ids) + bytes(table) + bytes(data)
+
+
+def check_font(font, path):
+    """
+    Draw every character of the font at every phase and a range of clipped
+    positions with both the font_to_py glyph and the .fnt file, and return
+    the number of mismatching frames (0 = bit exact).
+    """
+    import dishost
+    dishost.install()
+    import framebuf
+    from binfont import BinFont
+
+    W, H = 128, 64
+    packed = BinFont(path)
+    chars = [chr(c) for c in range(font.min_ch(), font.max_ch() + 1)] + [" ", "~"]
+    height = font.height()
+    positions = [(x, 0) for x in range(-8, 8)] + [(x, 5) for x in range(W - 48, W + 1)]
+    positions += [(9, -7), (40, H - height + 3), (-20, -10), (100, 40)]
+    bad = 0
+    for ch in chars:
+        data, ht, wd = font.get_ch(ch)
+        glyph = framebuf.FrameBuffer(bytearray(data), wd, ht, framebuf.MONO_HLSB)
+        for x, y in positions:
+            for bg in (0x00, 0xFF, 0x5A):
+                ref = bytearray([bg]) * (W * H // 8)
+                framebuf.FrameBuffer(ref, W, H, framebuf.MONO_HMSB).blit(glyph, x, y, -1)
+                out = bytearray([bg]) * (W * H // 8)
+                packed.blit_hmsb(ch, out, W // 8, H, x, y)
+                if out != ref:
+                    bad += 1
+    packed.close()
+    return bad
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m dishost.fontpack",
+                                 description="Convert font_to_py fonts to .fnt files.")
+    ap.add_argument("fonts", nargs="*", help="font module names (default: all in the fonts dir)")
+    ap.add_argument("--dir", default=FONT_DIR)
+    ap.add_argument("--check", action="store_true", help="verify the output is bit exact")
+    args = ap.parse_args(argv)
+
+    names = args.fonts or sorted(f[:-3] for f in os.listdir(args.dir)
+                                 if f.startswith("font_") and f.endswith(".py"))
+    failed = 0
+    for name in names:
+        font = load_font_module(os.path.join(args.dir, name + ".py"))
+        packed = pack_font(font)
+        out = os.path.join(args.dir, name + ".fnt")
+        with open(out, "wb") as f:
+            f.write(packed)
+        line = "%s: %d bytes" % (out, len(packed))
+        if args.check:
+            bad = check_font(font, out)
+            failed += bad
+            line += ", %s" % ("bit exact" if not bad else "%d MISMATCHES" % bad)
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
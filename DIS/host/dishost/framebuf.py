@@ -0,0 +1,150 @@
+"""
+framebuf stand-in for CPython.
+
+Pixel layouts match MicroPython for MONO_VLSB, MONO_HLSB and MONO_HMSB, so
+buffers can be compared byte for byte with what the board produces. text()
+is the exception: MicroPython's built-in 8x8 font is not bundled here, so
+each character is drawn as a fixed pseudo-glyph inside its 8x8 cell. It
+covers the same pixels' bounding box and is deterministic, which is enough
+for timing and dirty-region work but not for pixel-exact label checks.
+"""
+
+MONO_VLSB = 0
+MVLSB = MONO_VLSB
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, format, stride=None):
+        if format not in (MONO_VLSB, MONO_HLSB, MONO_HMSB):
+            raise ValueError("dishost framebuf supports monochrome formats only")
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = width if stride is None else stride
+        if format == MONO_VLSB:
+            need = ((height + 7) // 8) * self.stride
+        else:
+            need = ((self.stride + 7) // 8) * height
+        if len(buf) < need:
+            raise ValueError("buffer too small")
+        self._row_bytes = (self.stride + 7) // 8
+
+    # ---------------- Pixel access ----------------
+
+    def _get(self, x, y):
+        fmt = self.format
+        if fmt == MONO_HMSB:
+            return (self.buf[y * self._row_bytes + (x >> 3)] >> (x & 7)) & 1
+        if fmt == MONO_HLSB:
+            return (self.buf[y * self._row_bytes + (x >> 3)] >> (7 - (x & 7))) & 1
+        return (self.buf[(y >> 3) * self.stride + x] >> (y & 7)) & 1
+
+    def _set(self, x, y, c):
+        fmt = self.format
+        if fmt == MONO_HMSB:
+            i = y * self._row_bytes + (x >> 3)
+            mask = 1 << (x & 7)
+        elif fmt == MONO_HLSB:
+            i = y * self._row_bytes + (x >> 3)
+            mask = 0x80 >> (x & 7)
+        else:
+            i = (y >> 3) * self.stride + x
+            mask = 1 << (y & 7)
+        if c & 1:
+            self.buf[i] |= mask
+        else:
+            self.buf[i] &= ~mask & 0xFF
+
+    def pixel(self, x, y, c=None):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            if c is None:
+                return self._get(x, y)
+            self._set(x, y, c)
+        return None
+
+    # ---------------- Shapes ----------------
+
+    def fill(self, c):
+        if self.stride == self.width or self.format == MONO_VLSB:
+            v = 0xFF if c & 1 else 0
+            self.buf[:len(self.buf)] = bytes([v]) * len(self.buf)
+        else:
+            self.fill_rect(0, 0, self.width, self.height, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                self._set(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.fill_rect(x, y, w, 1, c)
+        self.fill_rect(x, y + h - 1, w, 1, c)
+        self.fill_rect(x, y, 1, h, c)
+        self.fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def text(self, s, x, y, c=1):
+        for ch in s:
+            code = ord(ch)
+            if ch != " ":
+                for row in range(7):
+                    bits = ((code * (row + 3)) ^ (code >> 2)) & 0x3F
+                    for col in range(6):
+                        if bits >> col & 1:
+                            self.pixel(x + col, y + row, c)
+            x += 8
+
+    def scroll(self, xstep, ystep):
+        raise NotImplementedError("scroll is not used by the DIS")
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if isinstance(fbuf, tuple):
+            fbuf = FrameBuffer(*fbuf)
+        sy0 = max(0, -y)
+        sx0 = max(0, -x)
+        sy1 = min(fbuf.height, self.height - y)
+        sx1 = min(fbuf.width, self.width - x)
+        for sy in range(sy0, sy1):
+            for sx in range(sx0, sx1):
+                c = fbuf._get(sx, sy)
+                if palette is not None:
+                    c = palette._get(c, 0)
+                if c != key:
+                    self._set(x + sx, y + sy, c)
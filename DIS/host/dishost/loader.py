@@ -0,0 +1,88 @@
+"""
+Imports DIS/device modules unmodified under CPython.
+
+Device code says ``import time`` and expects MicroPython's tick functions.
+Modules found in the device folder are therefore executed with their own
+builtins whose __import__ maps MicroPython names to the stand-ins, while
+the rest of the process keeps CPython's real ``time``.
+"""
+import builtins
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+HOST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEVICE_DIR = os.path.normpath(os.path.join(HOST_DIR, "..", "device"))
+
+# Names device code imports -> module that serves them on the host.
+ALIASES = {
+    "time": "utime",
+    "asyncio": "uasyncio",
+}
+
+
+def _device_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0:
+        name = ALIASES.get(name, name)
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+DEVICE_BUILTINS = dict(builtins.__dict__)
+DEVICE_BUILTINS["__import__"] = _device_import
+
+
+class DeviceLoader(importlib.machinery.SourceFileLoader):
+    def exec_module(self, module):
+        module.__builtins__ = DEVICE_BUILTINS
+        super().exec_module(module)
+
+
+class DeviceFinder(importlib.abc.MetaPathFinder):
+    """Finds modules that live under device_dir and loads them with DeviceLoader."""
+    def __init__(self, device_dir):
+        self.device_dir = os.path.normpath(os.path.abspath(device_dir))
+
+    def _inside(self, path):
+        path = os.path.normpath(os.path.abspath(path))
+        return path == self.device_dir or path.startswith(self.device_dir + os.sep)
+
+    def find_spec(self, fullname, path=None, target=None):
+        dirs = [self.device_dir] if path is None else [p for p in path if self._inside(p)]
+        leaf = fullname.rpartition(".")[2]
+        for d in dirs:
+            pkg_init = os.path.join(d, leaf, "__init__.py")
+            if os.path.isfile(pkg_init):
+                loader = DeviceLoader(fullname, pkg_init)
+                return importlib.util.spec_from_file_location(
+                    fullname, pkg_init, loader=loader,
+                    submodule_search_locations=[os.path.dirname(pkg_init)])
+            source = os.path.join(d, leaf + ".py")
+            if os.path.isfile(source):
+                return importlib.util.spec_from_file_location(
+                    fullname, source, loader=DeviceLoader(fullname, source))
+        return None
+
+
+def install_finder(device_dir=DEVICE_DIR):
+    """Put a DeviceFinder first on sys.meta_path and forget stale device modules."""
+    for f in [f for f in sys.meta_path if isinstance(f, DeviceFinder)]:
+        sys.meta_path.remove(f)
+    finder = DeviceFinder(device_dir)
+    sys.meta_path.insert(0, finder)
+    for name, module in list(sys.modules.items()):
+        source = getattr(module, "__file__", None)
+        if source and finder._inside(source):
+            del sys.modules[name]
+    return finder
+
+
+def new_module(name, device_dir=DEVICE_DIR):
+    """Create (but do not run) device_dir/<name>.py as a device module."""
+    source = os.path.join(device_dir, name + ".py")
+    spec = importlib.util.spec_from_file_location(
+        name, source, loader=DeviceLoader(name, source))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    return module
@@ -0,0 +1,291 @@
+"""
+machine module stand-in: Pin, SPI and UART for the DIS on CPython.
+
+Instances are registered by id so a simulation can reach the objects the
+device code created, e.g. ``machine.uart(1).attach(feed)`` or
+``machine.pin(15).drive(0, at_ms=500)``.
+"""
+from dishost import clock as _clock
+
+_pins = {}
+_uarts = {}
+_spis = {}
+
+
+def pin(pin_id):
+    """Shared state of a pin, created on first use."""
+    state = _pins.get(pin_id)
+    if state is None:
+        state = _pins[pin_id] = _PinState(pin_id)
+    return state
+
+
+def uart(uart_id):
+    return _uarts[uart_id]
+
+
+def spi(spi_id):
+    return _spis[spi_id]
+
+
+def reset_registry():
+    _pins.clear()
+    _uarts.clear()
+    _spis.clear()
+
+
+def freq(hz=None):
+    return 125000000 if hz is None else None
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+def unique_id():
+    return b"DISHOST0"
+
+
+# ---------------- Pin ----------------
+
+class _PinState:
+    def __init__(self, pin_id):
+        self.id = pin_id
+        self.level = 0
+        self.pull = None
+        self.handler = None
+        self.trigger = 0
+        self.edges = 0
+
+    def set(self, level):
+        level = 1 if level else 0
+        if level == self.level:
+            return
+        self.level = level
+        self.edges += 1
+        if self.handler is not None:
+            if (level == 0 and self.trigger & Pin.IRQ_FALLING) or \
+               (level == 1 and self.trigger & Pin.IRQ_RISING):
+                self.handler(self.owner)
+
+    def drive(self, level, at_ms=None):
+        """Set an input level from outside, now or at a virtual time."""
+        if at_ms is None:
+            self.set(level)
+        else:
+            _clock.get().call_at_us(int(at_ms * 1000), lambda: self.set(level))
+
+    def press(self, at_ms, duration_ms):
+        """Pull an active-low button down at at_ms for duration_ms."""
+        self.drive(0, at_ms)
+        self.drive(1, at_ms + duration_ms)
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, pin_id, mode=-1, pull=-1, value=None):
+        self._state = pin(pin_id)
+        self._state.owner = self
+        self.id = pin_id
+        if pull == Pin.PULL_UP and self._state.pull is None:
+            self._state.level = 1
+        if pull != -1:
+            self._state.pull = pull
+        if value is not None:
+            self._state.level = 1 if value else 0
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def value(self, value=None):
+        if value is None:
+            _clock.get().now_us()   # let due input edges land first
+            return self._state.level
+        self._state.set(value)
+
+    def on(self):
+        self._state.set(1)
+
+    def off(self):
+        self._state.set(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._state.handler = handler
+        self._state.trigger = trigger if handler else 0
+
+    def __repr__(self):
+        return "Pin({})".format(self.id)
+
+
+# ---------------- SPI ----------------
+
+class SPI:
+    """Records traffic instead of sending it; counters feed the benchmarks."""
+    def __init__(self, spi_id, baudrate=1000000, polarity=0, phase=0, **kwargs):
+        self.id = spi_id
+        self.baudrate = baudrate
+        self.bytes_written = 0
+        self.transactions = 0
+        self.log = None     # set to a list to keep a copy of every write
+        _spis[spi_id] = self
+
+    def write(self, buf):
+        self.bytes_written += len(buf)
+        self.transactions += 1
+        if self.log is not None:
+            self.log.append(bytes(buf))
+
+    def reset_counters(self):
+        self.bytes_written = 0
+        self.transactions = 0
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
+
+
+# ---------------- UART ----------------
+
+class UART:
+    """
+    Receive side is scriptable: feed() queues bytes for a virtual time and
+    attach() connects a source object whose poll(now_us) returns new bytes
+    (see dishost.telemetry.ControllerFeed). Like the rp2 port, at most rxbuf
+    bytes wait to be read; the rest are lost and counted in overrun_bytes.
+    Transmitted bytes land in .tx.
+
+    Without an IRQ handler a source is only polled when the UART is read.
+    With one (irq(), like IRQ_RXIDLE on the board) a source that has a
+    next_us attribute is delivered from clock events at its own sample
+    times, so the handler runs when the bytes arrive. As on the board the
+    handler does not nest: bytes that arrive while it runs (its reads move
+    the clock) raise it again once it returns.
+    """
+    IRQ_RXIDLE = 64
+
+    def __init__(self, uart_id, baudrate=115200, tx=None, rx=None, rxbuf=256, **kwargs):
+        self.id = uart_id
+        self.baudrate = baudrate
+        self.rxbuf = rxbuf
+        self.overrun_bytes = 0
+        self._rx = bytearray()
+        self.tx = bytearray()
+        self.source = None
+        self.bytes_received = 0
+        self._irq_handler = None
+        self._in_irq = False
+        self._irq_again = False
+        _uarts[uart_id] = self
+
+    def feed(self, data, at_ms=None):
+        if at_ms is None:
+            self._deliver(data)
+        else:
+            _clock.get().call_at_us(int(at_ms * 1000), lambda: self._deliver(data))
+
+    def attach(self, source):
+        self.source = source
+        self._arm_source()
+
+    def _arm_source(self):
+        due = getattr(self.source, "next_us", None)
+        if due is not None and self._irq_handler is not None:
+            _clock.get().call_at_us(due, lambda: self._source_event(due))
+
+    def _source_event(self, due):
+        if self._irq_handler is None:
+            return
+        self._deliver(self.source.poll(due))
+        self._arm_source()
+
+    def _deliver(self, data):
+        if not data:
+            return
+        room = self.rxbuf - len(self._rx)
+        if len(data) > room:
+            self.overrun_bytes += len(data) - max(room, 0)
+            data = data[:max(room, 0)]
+            if not data:
+                return
+        self._rx += data
+        self.bytes_received += len(data)
+        if self._irq_handler is None:
+            return
+        if self._in_irq:
+            self._irq_again = True
+            return
+        self._in_irq = True
+        try:
+            self._irq_again = True
+            while self._irq_again and self._irq_handler is not None:
+                self._irq_again = False
+                self._irq_handler(self)
+        finally:
+            self._in_irq = False
+
+    def _pump(self):
+        now = _clock.get().now_us()
+        if self.source is not None:
+            self._deliver(self.source.poll(now))
+
+    def any(self):
+        self._pump()
+        return len(self._rx)
+
+    def read(self, n=None):
+        self._pump()
+        if not self._rx:
+            return None
+        if n is None or n >= len(self._rx):
+            data = bytes(self._rx)
+            self._rx.clear()
+        else:
+            data = bytes(self._rx[:n])
+            del self._rx[:n]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        self._pump()
+        n = len(buf) if nbytes is None else min(nbytes, len(buf))
+        n = min(n, len(self._rx))
+        if n == 0:
+            return None
+        buf[:n] = self._rx[:n]
+        del self._rx[:n]
+        return n
+
+    def readline(self):
+        self._pump()
+        i = self._rx.find(b"\n")
+        if i < 0:
+            return None
+        return self.read(i + 1)
+
+    def write(self, buf):
+        self.tx += buf
+        return len(buf)
+
+    def irq(self, handler=None, trigger=IRQ_RXIDLE, hard=False):
+        armed = self._irq_handler is not None
+        self._irq_handler = handler
+        if not armed:
+            self._arm_source()
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
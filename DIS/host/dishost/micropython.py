@@ -0,0 +1,30 @@
+"""micropython module stand-in: code emitters become no-ops on CPython."""
+
+
+def const(value):
+    return value
+
+
+def native(fn):
+    return fn
+
+
+def viper(fn):
+    return fn
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+
+def mem_info(verbose=False):
+    print("mem_info: not available on the host")
+
+
+def schedule(fn, arg):
+    fn(arg)
+    return True
@@ -0,0 +1,276 @@
+"""
+Offline pacing optimizer: energy-minimal target speeds for the dash.
+
+Given a course (distance, grade, corners) and the car's parameters, finds
+speed profiles that minimise battery energy for a range of time prices
+lambda (J per second saved) by dynamic programming over a distance x speed
+grid, vectorized with NumPy over speeds and lambdas at once. Each lambda
+gives one optimal run; together they cover every pace from slow to flat out.
+
+For the dash the profiles are folded into a table indexed by distance and
+elapsed time: at distance s with R seconds left, the target is the speed of
+the profile that reaches the finish from s in exactly R seconds. The table
+is written in the binary format read by DIS/device/pacing.py:
+
+    magic b"PACE", version, 0, n_dist (u16), n_time (u16),
+    dist_step_umi (u32), time_step_ms (u32),
+    n_dist * n_time target speeds in milli-mph (u16), distance-major.
+
+All values little endian.
+
+    python -m dishost.pacing --out pace.bin                  (built-in demo lap)
+    python -m dishost.pacing course.csv --time-min 4 --out pace.bin --eco
+
+course.csv has a header and one row per point along the course:
+distance_m, grade (rise/run) and optionally corner_radius_m (0 = straight)
+and speed_limit_mph. Grade is interpolated between points; corners and
+limits hold until the next point. The last row is the finish.
+"""
+import argparse
+import csv
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"PACE"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHHII")
+
+G = 9.81
+M_PER_MILE = 1609.344
+MPS_PER_MPH = M_PER_MILE / 3600
+
+
+class Vehicle:
+    """
+    Car, driver and drivetrain. Defaults describe a battery-electric
+    prototype on the 16 inch wheels main.py assumes. current_limit_a is the
+    controller's normal limit, eco_current_a its limit in eco mode; with
+    eco=True the optimizer plans acceleration within the eco limit.
+    """
+    def __init__(self, mass_kg=110.0, crr=0.003, cda_m2=0.035, air_density=1.2,
+                 battery_v=48.0, current_limit_a=20.0, eco_current_a=6.0,
+                 motor_efficiency=0.85, drivetrain_efficiency=0.92,
+                 max_force_n=250.0, lateral_accel=2.0, max_speed_mph=30.0, eco=False):
+        self.mass_kg = mass_kg
+        self.crr = crr
+        self.cda_m2 = cda_m2
+        self.air_density = air_density
+        self.battery_v = battery_v
+        self.current_limit_a = current_limit_a
+        self.eco_current_a = eco_current_a
+        self.motor_efficiency = motor_efficiency
+        self.drivetrain_efficiency = drivetrain_efficiency
+        self.max_force_n = max_force_n          # stall / traction limit
+        self.lateral_accel = lateral_accel      # m/s^2 allowed in corners
+        self.max_speed_mph = max_speed_mph
+        self.eco = eco
+
+    @property
+    def efficiency(self):
+        return self.motor_efficiency * self.drivetrain_efficiency
+
+    def max_force(self, v):
+        """Tractive force limit (N) at speed v (m/s), from the current limit."""
+        amps = self.eco_current_a if self.eco else self.current_limit_a
+        power = amps * self.battery_v * self.efficiency
+        return np.minimum(power / np.maximum(v, 0.1), self.max_force_n)
+
+
+class Course:
+    """Course sampled at the optimizer's grid: grade and speed cap per node."""
+    def __init__(self, distance_m, grade, corner_radius_m=None, speed_limit_mph=None):
+        self.distance_m = np.asarray(distance_m, dtype=float)
+        self.grade = np.asarray(grade, dtype=float)
+        n = len(self.distance_m)
+        self.corner_radius_m = (np.zeros(n) if corner_radius_m is None
+                                else np.asarray(corner_radius_m, dtype=float))
+        self.speed_limit_mph = (np.full(n, np.inf) if speed_limit_mph is None
+                                else np.asarray(speed_limit_mph, dtype=float))
+        if n < 2 or np.any(np.diff(self.distance_m) <= 0):
+            raise ValueError("course needs at least two points with increasing distance")
+
+    @property
+    def length_m(self):
+        return float(self.distance_m[-1])
+
+    def sample(self, s):
+        """Grade at s (interpolated) and the corner radius / limit in force at s."""
+        grade = np.interp(s, self.distance_m, self.grade)
+        idx = np.clip(np.searchsorted(self.distance_m, s, side="right") - 1,
+                      0, len(self.distance_m) - 1)
+        return grade, self.corner_radius_m[idx], self.speed_limit_mph[idx]
+
+
+def load_course(path):
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise ValueError("%s: empty course" % path)
+
+    def column(name, default):
+        return [float(r[name]) if r.get(name) not in (None, "") else default for r in rows]
+
+    return Course(column("distance_m", 0.0), column("grade", 0.0),
+                  column("corner_radius_m", 0.0), column("speed_limit_mph", np.inf))
+
+
+def demo_course(length_mi=1.0):
+    """A one mile lap: a gentle climb, a descent and two hairpins."""
+    L = length_mi * M_PER_MILE
+    d = np.array([0.0, 0.15, 0.30, 0.45, 0.50, 0.55, 0.75, 0.90, 0.95, 1.0]) * L
+    grade = np.array([0.0, 0.01, 0.02, 0.0, 0.0, -0.02, -0.01, 0.0, 0.0, 0.0])
+    radius = np.array([0, 0, 0, 0, 15, 0, 0, 0, 12, 0], dtype=float)
+    return Course(d, grade, radius)
+
+
+# ---------------- Optimizer ----------------
+
+def speed_caps(course, vehicle, s):
+    """Highest allowed speed (m/s) at each node: corners, limits, top speed."""
+    grade, radius, limit_mph = course.sample(s)
+    cap = np.full(len(s), vehicle.max_speed_mph * MPS_PER_MPH)
+    corner = radius > 0
+    cap[corner] = np.minimum(cap[corner], np.sqrt(vehicle.lateral_accel * radius[corner]))
+    cap = np.minimum(cap, limit_mph * MPS_PER_MPH)
+    return cap
+
+
+def optimize(course, vehicle, lambdas, segments=200, speeds=64):
+    """
+    Optimal speed profiles, one per lambda in lambdas (W, i.e. J per second).
+
+    Returns (s, v, t) where s is the node distance (m, segments + 1 values)
+    and v, t have one row per lambda: the speed (m/s) at each node and the
+    time (s) spent in each of the segments.
+    """
+    lambdas = np.asarray(lambdas, dtype=float)
+    s = np.linspace(0.0, course.length_m, segments + 1)
+    ds = s[1] - s[0]
+    vmax = vehicle.max_speed_mph * MPS_PER_MPH
+    vg = np.linspace(0.0, vmax, speeds)                 # speed grid, vg[0] = standstill
+    caps = speed_caps(course, vehicle, s)
+    grade_mid = course.sample(s[:-1] + ds / 2)[0]
+    theta = np.arctan(grade_mid)
+
+    # Transition j -> k over one segment at constant acceleration.
+    vj = vg[:, None]
+    vk = vg[None, :]
+    v_avg = (vj + vk) / 2
+    with np.errstate(divide="ignore"):
+        t_seg = np.where(v_avg > 0, ds / v_avg, np.inf)   # (speeds, speeds)
+    accel = (vk ** 2 - vj ** 2) / (2 * ds)
+    drag = 0.5 * vehicle.air_density * vehicle.cda_m2 * (vj ** 2 + vk ** 2) / 2
+    f_limit = vehicle.max_force(v_avg)
+    m = vehicle.mass_kg
+
+    L = len(lambdas)
+    J = np.zeros((L, speeds))                           # cost to go from the finish
+    policy = np.zeros((segments, L, speeds), dtype=np.int32)
+    for i in range(segments - 1, -1, -1):
+        force = (m * accel + m * G * (np.sin(theta[i]) + vehicle.crr * np.cos(theta[i]))
+                 + drag)
+        energy = np.maximum(force, 0.0) * ds / vehicle.efficiency
+        feasible = (force <= f_limit) & np.isfinite(t_seg) & (vk <= caps[i + 1] + 1e-9)
+        step = np.where(feasible, energy, np.inf)       # (speeds, speeds)
+        total = step[None, :, :] + lambdas[:, None, None] * t_seg[None, :, :] + J[:, None, :]
+        policy[i] = np.argmin(total, axis=2)
+        J = np.take_along_axis(total, policy[i][:, :, None], axis=2)[:, :, 0]
+
+    # Follow each policy forward from standstill.
+    idx = np.zeros((L, segments + 1), dtype=np.int32)
+    rows = np.arange(L)
+    for i in range(segments):
+        idx[:, i + 1] = policy[i][rows, idx[:, i]]
+    v = vg[idx]
+    t = t_seg[idx[:, :-1], idx[:, 1:]]
+    bad = ~np.isfinite(J[:, 0])
+    if bad.any():
+        raise ValueError("course infeasible for %d of %d lambdas" % (bad.sum(), L))
+    return s, v, t
+
+
+def pace_table(course, vehicle, race_time_s, n_dist=64, n_time=64, lambdas=None,
+               segments=200, speeds=64):
+    """
+    Target speed (m/s) for n_dist distances x n_time elapsed times.
+    Returns (table, dist_step_m, time_step_s, (fastest_s, slowest_s)).
+    """
+    if lambdas is None:
+        lambdas = np.geomspace(0.5, 5000.0, 48)
+    s, v, t = optimize(course, vehicle, lambdas, segments, speeds)
+    # Time to go from every node along each profile, and the speed each
+    # profile is heading for in the segment that starts at that node.
+    to_go = np.concatenate([np.cumsum(t[:, ::-1], axis=1)[:, ::-1],
+                            np.zeros((len(lambdas), 1))], axis=1)
+    heading = np.concatenate([v[:, 1:], v[:, -1:]], axis=1)
+    totals = to_go[:, 0]
+
+    sd = np.linspace(0.0, course.length_m, n_dist)
+    te = np.linspace(0.0, race_time_s, n_time)
+    # Interpolate every profile onto the table's distances.
+    go_d = np.stack([np.interp(sd, s, row) for row in to_go])       # (L, n_dist)
+    v_d = np.stack([np.interp(sd, s, row) for row in heading])
+    table = np.empty((n_dist, n_time))
+    remaining = race_time_s - te
+    for i in range(n_dist):
+        order = np.argsort(go_d[:, i])                  # time to go, ascending
+        table[i] = np.interp(remaining, go_d[order, i], v_d[order, i])
+    return table, sd[1] - sd[0], te[1] - te[0], (totals.min(), totals.max())
+
+
+def write_table(path, table_mps, dist_step_m, time_step_s):
+    mmph = np.clip(np.rint(table_mps / MPS_PER_MPH * 1000), 0, 65535).astype("<u2")
+    n_dist, n_time = mmph.shape
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, n_dist, n_time,
+                            int(round(dist_step_m / M_PER_MILE * 1000000)),
+                            int(round(time_step_s * 1000))))
+        f.write(mmph.tobytes())
+    return HEADER.size + mmph.nbytes
+
+
+def read_table(path):
+    """Inverse of write_table(): (table_mmph, dist_step_umi, time_step_ms)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, _, n_dist, n_time, d_step, t_step = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s: not a version %d pace table" % (path, VERSION))
+    table = np.frombuffer(data, dtype="<u2", count=n_dist * n_time, offset=HEADER.size)
+    return table.reshape(n_dist, n_time), d_step, t_step
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m dishost.pacing",
+                                 description="Build the dash's target-speed table.")
+    ap.add_argument("course", nargs="?", help="course CSV (default: built-in one mile lap)")
+    ap.add_argument("--out", default="pace.bin")
+    ap.add_argument("--time-min", type=float, default=4.0, help="race time, like RACE_TIME_MIN")
+    ap.add_argument("--dist", type=int, default=64, help="table rows (distances)")
+    ap.add_argument("--times", type=int, default=64, help="table columns (elapsed times)")
+    ap.add_argument("--segments", type=int, default=200)
+    ap.add_argument("--speeds", type=int, default=64)
+    ap.add_argument("--mass", type=float, default=110.0)
+    ap.add_argument("--eco", action="store_true", help="plan within the eco current limit")
+    args = ap.parse_args(argv)
+
+    course = load_course(args.course) if args.course else demo_course()
+    vehicle = Vehicle(mass_kg=args.mass, eco=args.eco)
+    race_s = args.time_min * 60
+    table, d_step, t_step, (fast, slow) = pace_table(
+        course, vehicle, race_s, args.dist, args.times, segments=args.segments,
+        speeds=args.speeds)
+    if not fast <= race_s <= slow:
+        print("warning: race time %.0fs is outside the profiles' %.0f-%.0fs range"
+              % (race_s, fast, slow), file=sys.stderr)
+    size = write_table(args.out, table, d_step, t_step)
+    print("course %.3f mi, race %.0f s, profiles %.0f-%.0f s; wrote %d bytes to %s"
+          % (course.length_m / M_PER_MILE, race_s, fast, slow, size, args.out))
+    print("start target %.1f mph" % (table[0, 0] / MPS_PER_MPH))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
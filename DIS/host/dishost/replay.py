@@ -0,0 +1,382 @@
+"""
+Record raw controller UART traffic and replay it into the dash.
+
+Capture files hold every UART read with its arrival time; the device writes
+them with DIS/device/uartcapture.py, and the host can record one from a
+USB-serial adapter or synthesise one. Replays either push the bytes straight
+into UartManager as fast as possible, or run the real main.py on the virtual
+clock at 1x or Nx speed with the capture attached to UART 1.
+
+    python -m dishost.replay synth race.cap --seconds 120
+    python -m dishost.replay record /dev/ttyUSB0 race.cap      (needs pyserial)
+    python -m dishost.replay play race.cap --fast --chunk 7
+    python -m dishost.replay play race.cap --speed 20 --split 1
+
+Chunking (--chunk/--split) re-cuts the recorded reads so lines and frames
+straddle read boundaries, spreading the pieces at the UART byte time.
+"""
+import argparse
+import math
+import random
+import struct
+import sys
+import time as _time
+
+from dishost.clock import TICKS_PERIOD, TICKS_HALFPERIOD
+
+# Mirrors DIS/device/uartcapture.py.
+MAGIC = b"DCAP"
+VERSION = 1
+HEADER_LEN = 8
+RECORD = struct.Struct("<IH")
+
+KEY1_PIN = 17           # timer start/stop button in config.py
+PRESS_AFTER_MS = 200    # after main's first frame; clears the 150 ms debounce from boot
+PRESS_MS = 300          # a short press: toggles the timer on release
+
+
+# ---------------- Capture files ----------------
+
+def read_capture(path):
+    """Return [(t_us, bytes)], times unwrapped and relative to the first read."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC or len(data) < HEADER_LEN:
+        raise ValueError("%s: not a DCAP capture" % path)
+    if data[4] != VERSION:
+        raise ValueError("%s: unsupported capture version %d" % (path, data[4]))
+    chunks = []
+    pos = HEADER_LEN
+    t = 0
+    last = None
+    while pos + RECORD.size <= len(data):
+        tick, n = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        payload = data[pos:pos + n]
+        pos += n
+        if len(payload) < n:
+            break       # truncated tail (power cut while writing)
+        if last is not None:
+            d = (tick - last) % TICKS_PERIOD
+            if d >= TICKS_HALFPERIOD:
+                d -= TICKS_PERIOD
+            t += d
+        last = tick
+        chunks.append((t, payload))
+    return chunks
+
+
+def write_capture(path, chunks):
+    with open(path, "wb") as f:
+        f.write(MAGIC + bytes((VERSION, 0, 0, 0)))
+        for t_us, payload in chunks:
+            f.write(RECORD.pack(t_us % TICKS_PERIOD, len(payload)))
+            f.write(payload)
+
+
+def synth_capture(seconds, binary=True, period_ms=250):
+    """A capture of the synthetic race profile, one read per message."""
+    from dishost.telemetry import ControllerFeed
+    feed = ControllerFeed(period_ms=period_ms, binary=binary)
+    chunks = []
+    for t_us in range(0, int(seconds * 1000000), feed.period_us):
+        chunks.append((t_us, feed.poll(t_us)))
+    return chunks
+
+
+def record_serial(port, path, baudrate=115200, seconds=None):
+    """Record a capture from a serial port until Ctrl-C or seconds elapse."""
+    try:
+        import serial
+    except ImportError:
+        raise SystemExit("recording needs pyserial (pip install pyserial)")
+    chunks = []
+    t0 = _time.perf_counter()
+    with serial.Serial(port, baudrate, timeout=0.01) as ser:
+        try:
+            while seconds is None or _time.perf_counter() - t0 < seconds:
+                data = ser.read(ser.in_waiting or 1)
+                if data:
+                    chunks.append((int((_time.perf_counter() - t0) * 1000000), data))
+        except KeyboardInterrupt:
+            pass
+    write_capture(path, chunks)
+    return chunks
+
+
+def rechunk(chunks, chunk=None, split_seed=None, baudrate=115200):
+    """
+    Cut every read into pieces of at most chunk bytes (random sizes 1..chunk
+    with split_seed), each arriving one byte time after the previous byte.
+    """
+    if not chunk:
+        return list(chunks)
+    byte_us = 10 * 1000000 / baudrate       # 8N1
+    rng = random.Random(split_seed) if split_seed is not None else None
+    out = []
+    for t_us, payload in chunks:
+        i = 0
+        while i < len(payload):
+            n = rng.randint(1, chunk) if rng else chunk
+            end = min(i + n, len(payload))
+            out.append((t_us + int(end * byte_us), payload[i:end]))
+            i = end
+    return out
+
+
+class CaptureSource:
+    """
+    UART source for machine.UART.attach(). Playback starts lead_us after
+    start(now_us), or after the first poll() if nothing called start() (so
+    boot time does not eat into the capture); on_start(base_us) is called
+    then with the virtual time playback runs from.
+
+    next_us is when the next read is due (None before the start and after
+    the last read), so a UART with an IRQ handler delivers every read from
+    a clock event at its own time. Such a UART is never polled, so start()
+    it and attach() it again to arm the first event.
+    """
+    def __init__(self, chunks, lead_us=0, on_start=None):
+        self.chunks = chunks
+        self.lead_us = lead_us
+        self.on_start = on_start
+        self.base_us = None
+        self.next_us = None
+        self.i = 0
+
+    def start(self, now_us):
+        self.base_us = now_us + self.lead_us
+        self._schedule()
+        if self.on_start is not None:
+            self.on_start(self.base_us)
+
+    def _schedule(self):
+        i = self.i
+        self.next_us = self.chunks[i][0] + self.base_us if i < len(self.chunks) else None
+
+    def poll(self, now_us):
+        if self.base_us is None:
+            self.start(now_us)
+        out = b""
+        chunks = self.chunks
+        while self.i < len(chunks) and chunks[self.i][0] + self.base_us <= now_us:
+            out += chunks[self.i][1]
+            self.i += 1
+        self._schedule()
+        return out
+
+    def done(self):
+        return self.i >= len(self.chunks)
+
+
+# ---------------- Reference ----------------
+
+def sample_times(chunks, baudrate=115200):
+    """
+    Parse the capture byte by byte with a fresh UartManager and return
+    [(t_us, rpm)] for every message, timed at its last byte.
+    """
+    from uart_manager import UartManager
+    mgr = UartManager(None)
+    byte_us = 10 * 1000000 / baudrate
+    one = bytearray(1)
+    out = []
+    for t_us, payload in chunks:
+        n = len(payload)
+        for i, b in enumerate(payload):
+            one[0] = b
+            seen = mgr.lines_parsed + mgr.frames_received
+            mgr.ingest(one, 1)
+            if mgr.lines_parsed + mgr.frames_received != seen:
+                out.append((t_us - (n - 1 - i) * byte_us, mgr.rpm))
+    return out
+
+
+def ideal_distance(samples, start_us, end_us, mph_per_rpm):
+    """Exact integral of the zero-order-held speed between start_us and end_us, in miles."""
+    dist = 0.0
+    rpm = 0
+    t = start_us
+    for t_s, r in samples:
+        if t_s > end_us:
+            break
+        if t_s > t:
+            dist += rpm * mph_per_rpm * (t_s - t) / 3.6e9
+            t = t_s
+        rpm = r
+    if end_us > t:
+        dist += rpm * mph_per_rpm * (end_us - t) / 3.6e9
+    return dist
+
+
+# ---------------- Replays ----------------
+
+def replay_fast(chunks):
+    """Feed every read straight into UartManager.update(); no clock, no main.py."""
+    from uart_manager import UartManager
+
+    class _Uart:
+        data = b""
+
+        def any(self):
+            return len(self.data)
+
+        def readinto(self, buf):
+            n = min(len(buf), len(self.data))
+            buf[:n] = self.data[:n]
+            self.data = self.data[n:]
+            return n
+
+    uart = _Uart()
+    mgr = UartManager(uart)
+    total = 0
+    t0 = _time.perf_counter()
+    for _, payload in chunks:
+        uart.data = payload
+        total += len(payload)
+        mgr.update()
+    wall = _time.perf_counter() - t0
+    parsed = mgr.lines_parsed + mgr.frames_received
+    return {
+        "mode": "fast",
+        "reads": len(chunks),
+        "bytes": total,
+        "samples": parsed,
+        "wall_s": wall,
+        "samples_per_s": parsed / wall if wall else 0,
+        "bytes_per_s": total / wall if wall else 0,
+        "coalesced": mgr.samples_coalesced,
+        "dropped": mgr.frames_dropped,
+        "errors": mgr.parse_errors + mgr.crc_errors,
+    }
+
+
+def replay_main(chunks, speed=20.0, step_us=0, lead_ms=1000, tail_ms=500):
+    """
+    Run main.py with the capture on UART 1. Once main has drawn its first
+    frame, so its tasks are running, the timer is started with a KEY1 press
+    and playback begins lead_ms later; the dash's distance then covers the
+    whole capture and can be compared with the ideal integration. Raises
+    RuntimeError if the timer never started.
+    """
+    import dishost
+    from dishost import clock as clock_mod
+
+    span_us = chunks[-1][0] if chunks else 0
+    if lead_ms <= PRESS_AFTER_MS + PRESS_MS:
+        raise ValueError("lead_ms must leave time for the KEY1 press")
+    source = CaptureSource(chunks, lead_ms * 1000)
+
+    def watch():
+        clock = clock_mod.get()
+        if getattr(sys.modules.get("main"), "boot_first_frame_ms", None) is None:
+            clock.call_after_ms(10, watch)
+            return
+        machine = sys.modules["machine"]
+        now_us = clock.elapsed_us()
+        machine.pin(KEY1_PIN).press(now_us // 1000 + PRESS_AFTER_MS, PRESS_MS)
+        # Attached only now, so neither a polled nor an IRQ-driven UART
+        # sees any of the capture before the timer runs.
+        source.start(now_us)
+        machine.uart(1).attach(source)
+        clock.end_at_us(source.base_us + span_us + tail_ms * 1000)
+
+    # The real end is set once playback starts; this only bounds a dash that
+    # never draws a frame.
+    result = dishost.run_main(duration_s=span_us / 1000000 + 60, speed=speed, step_us=step_us,
+                              setup=lambda machine: clock_mod.get().call_at_us(0, watch))
+    ns = result.namespace
+    mgr = ns["uart_manager"]
+    uart = sys.modules["machine"].uart(1)
+
+    # The dash integrates from its timer start to its last derive pass; map
+    # its ticks_us back to virtual time without assuming they did not wrap.
+    race = ns["race"]
+    if source.base_us is None:
+        raise RuntimeError("main.py never drew a frame; nothing was replayed")
+    if not race.running or not race.elapsed_us():
+        raise RuntimeError("the dash timer never started (KEY1 press missed); "
+                           "distance and drift would compare nothing")
+    clock = result.clock
+    end_us = clock.elapsed_us()
+    last_us = end_us - clock_mod.ticks_diff(
+        (clock._base_us + end_us) & clock_mod.TICKS_MAX, race.last_us)
+    start_us = last_us - race.elapsed_us()
+    mph_per_rpm = math.pi * ns["wheel_diameter_in"] * 60 / 63360.0
+    samples = [(t + source.base_us, r) for t, r in sample_times(chunks)]
+    ideal = ideal_distance(samples, start_us, last_us, mph_per_rpm)
+    dash = race.distance_umi / 1000000
+    parsed = mgr.lines_parsed + mgr.frames_received
+    return {
+        "mode": "main",
+        "speed": speed,
+        "virtual_s": result.virtual_s,
+        "wall_s": result.wall_s,
+        "samples": parsed,
+        "expected": len(samples),
+        "samples_per_s": parsed / result.wall_s if result.wall_s else 0,
+        "queue_dropped": ns["samples"].dropped,
+        "dropped": mgr.frames_dropped,
+        "errors": mgr.parse_errors + mgr.crc_errors,
+        "overrun_bytes": uart.overrun_bytes,
+        "distance_mi": dash,
+        "ideal_mi": ideal,
+        "drift_mi": dash - ideal,
+        "drift_pct": (dash - ideal) * 100 / ideal if ideal else 0.0,
+    }
+
+
+def format_report(r):
+    return "  ".join("%s=%s" % (k, ("%.6g" % v) if isinstance(v, float) else v)
+                     for k, v in r.items())
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m dishost.replay", description=__doc__.split("\n\n")[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("synth", help="write a capture of the synthetic race profile")
+    p.add_argument("out")
+    p.add_argument("--seconds", type=float, default=60)
+    p.add_argument("--ascii", action="store_true")
+
+    p = sub.add_parser("record", help="record a capture from a serial port")
+    p.add_argument("port")
+    p.add_argument("out")
+    p.add_argument("--baud", type=int, default=115200)
+    p.add_argument("--seconds", type=float)
+
+    p = sub.add_parser("play", help="replay a capture and report")
+    p.add_argument("capture")
+    p.add_argument("--fast", action="store_true", help="UartManager only, as fast as possible")
+    p.add_argument("--speed", type=float, default=1.0, help="virtual seconds per wall second")
+    p.add_argument("--chunk", type=int, help="re-cut reads into pieces of at most N bytes")
+    p.add_argument("--split", type=int, metavar="SEED", help="random piece sizes 1..--chunk")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "synth":
+        chunks = synth_capture(args.seconds, binary=not args.ascii)
+        write_capture(args.out, chunks)
+        print("wrote %d reads to %s" % (len(chunks), args.out))
+    elif args.cmd == "record":
+        chunks = record_serial(args.port, args.out, args.baud, args.seconds)
+        print("recorded %d reads to %s" % (len(chunks), args.out))
+    else:
+        import dishost
+        dishost.install()
+        chunks = read_capture(args.capture)
+        chunk = args.chunk or (16 if args.split is not None else None)
+        chunks = rechunk(chunks, chunk, args.split)
+        if args.fast:
+            print(format_report(replay_fast(chunks)))
+        else:
+            try:
+                print(format_report(replay_main(chunks, speed=args.speed)))
+            except RuntimeError as e:
+                print("replay failed:", e)
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Host-side encoders for the controller's UART telemetry, and a synthetic
+controller that feeds a machine.UART stand-in.
+
+encode_frame() produces the same bytes as telemetry_encode() in
+Motor_Code/telemetry.c; encode_line() matches the legacy snprintf() line.
+"""
+import math
+
+
+def crc16_ccitt(data):
+    crc = 0xFFFF
+    for b in data:
+        crc ^= b << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        crc &= 0xFFFF
+    return crc
+
+
+def cobs_encode(data):
+    out = bytearray(1)
+    code_idx = 0
+    code = 1
+    for b in data:
+        if b == 0:
+            out[code_idx] = code
+            code_idx = len(out)
+            out.append(0)
+            code = 1
+        else:
+            out.append(b)
+            code += 1
+            if code == 0xFF:
+                out[code_idx] = code
+                code_idx = len(out)
+                out.append(0)
+                code = 1
+    out[code_idx] = code
+    return bytes(out)
+
+
+def encode_frame(seq, tick_ms, voltage_dv, current_ma, rpm, duty, throttle, eco):
+    """One binary frame, COBS encoded and 0x00 terminated."""
+    p = bytearray(15)
+    p[0] = 1
+    p[1] = seq & 0xFF
+    p[2:6] = (tick_ms & 0xFFFFFFFF).to_bytes(4, "little")
+    p[6:8] = voltage_dv.to_bytes(2, "little")
+    p[8:10] = (current_ma & 0xFFFF).to_bytes(2, "little")
+    p[10:12] = rpm.to_bytes(2, "little")
+    p[12] = duty
+    p[13] = throttle
+    p[14] = 1 if eco else 0
+    p += crc16_ccitt(p).to_bytes(2, "little")
+    return cobs_encode(p) + b"\x00"
+
+
+def encode_line(voltage_dv, current_ma, rpm, duty, throttle, eco):
+    """Legacy ASCII line, same format as the controller's snprintf()."""
+    return "s{:03d}{:06d}{:03d}{:03d}{:03d}{:1d}\n".format(
+        voltage_dv, current_ma, rpm, duty, throttle, 1 if eco else 0).encode()
+
+
+def race_profile(t_s):
+    """
+    Plausible race telemetry at time t_s: launch to ~20 mph, then cruise
+    with a slow speed wave and eco pulses, battery sagging over the run.
+    Returns (voltage_dv, current_ma, rpm, duty, throttle, eco).
+    """
+    cruise = 420 + 40 * math.sin(t_s / 15.0)
+    rpm = int(min(t_s / 20.0, 1.0) * cruise)
+    throttle = 95 if (int(t_s) // 10) % 3 == 0 else 60
+    eco = throttle >= 90
+    current_ma = 6000 if eco else int(2500 + 2000 * math.sin(t_s / 7.0) ** 2)
+    voltage_dv = max(440, 500 - int(t_s / 30))
+    duty = min(100, rpm // 5)
+    return voltage_dv, current_ma, rpm, duty, throttle, eco
+
+
+class ControllerFeed:
+    """
+    Emits one telemetry sample every period_ms of virtual time, like the
+    motor controller's 250 ms loop. Attach with machine.uart(1).attach().
+    """
+    def __init__(self, profile=race_profile, period_ms=250, binary=True, start_ms=0):
+        self.profile = profile
+        self.period_us = int(period_ms * 1000)
+        self.binary = binary
+        self.next_us = int(start_ms * 1000)
+        self.seq = 0
+        self.samples = 0
+
+    def poll(self, now_us):
+        out = b""
+        while now_us >= self.next_us:
+            t_ms = self.next_us // 1000
+            values = self.profile(t_ms / 1000)
+            if self.binary:
+                out += encode_frame(self.seq, t_ms, *values)
+            else:
+                out += encode_line(*values)
+            self.seq += 1
+            self.samples += 1
+            self.next_us += self.period_us
+        return out
@@ -0,0 +1,192 @@
+"""
+uasyncio / asyncio stand-in: CPython's asyncio driven by the virtual clock.
+
+The event loop reads time from dishost.clock and, instead of blocking in
+select(), advances the clock to the next timer. Tasks therefore sleep in
+virtual time and an accelerated or stepped run stays deterministic. Only
+the subset of the MicroPython API the dash uses is provided.
+"""
+import asyncio as _aio
+import selectors as _selectors
+
+from dishost import clock as _clock
+from dishost.clock import SimulationEnd
+
+CancelledError = _aio.CancelledError
+TimeoutError = _aio.TimeoutError
+Event = _aio.Event
+Lock = _aio.Lock
+gather = _aio.gather
+wait_for = _aio.wait_for
+
+# How long an idle loop with no timers waits before looking again (s).
+_IDLE_S = 0.001
+
+
+class _VirtualSelector(_selectors.BaseSelector):
+    """Keeps registrations but never reports I/O; select() just passes time."""
+    def __init__(self):
+        self._map = {}
+
+    def register(self, fileobj, events, data=None):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        key = _selectors.SelectorKey(fileobj, fd, events, data)
+        self._map[fd] = key
+        return key
+
+    def unregister(self, fileobj):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        return self._map.pop(fd)
+
+    def select(self, timeout=None):
+        clock = _clock.get()
+        if timeout is None:
+            timeout = _IDLE_S
+        if timeout > 0:
+            clock.advance_us(int(timeout * 1000000) or 1)
+        else:
+            clock.now_us()
+        return []
+
+    def get_map(self):
+        return self._map
+
+    def close(self):
+        self._map.clear()
+
+
+class _VirtualLoop(_aio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__(selector=_VirtualSelector())
+
+    def time(self):
+        return _clock.get().elapsed_us() / 1000000
+
+
+_loop = None
+
+
+def get_event_loop():
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = _VirtualLoop()
+    return _loop
+
+
+def new_event_loop():
+    global _loop
+    _loop = _VirtualLoop()
+    return _loop
+
+
+def create_task(coro):
+    return get_event_loop().create_task(coro)
+
+
+def current_task():
+    return _aio.current_task()
+
+
+async def sleep(seconds):
+    await _aio.sleep(seconds)
+
+
+async def sleep_ms(ms):
+    await _aio.sleep(ms / 1000)
+
+
+async def wait_for_ms(aw, timeout):
+    return await _aio.wait_for(aw, timeout / 1000)
+
+
+def _exception_handler(loop, context):
+    # A task that read the clock as the run ended finished with SimulationEnd;
+    # that is the normal way out, not an error worth a traceback.
+    if not isinstance(context.get("exception"), SimulationEnd):
+        loop.default_exception_handler(context)
+
+
+def run(coro):
+    """
+    Run coro to completion. When the clock's duration runs out the remaining
+    tasks are cancelled and SimulationEnd propagates to the caller.
+    """
+    loop = new_event_loop()
+    loop.set_exception_handler(_exception_handler)
+    _aio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        _clock.get().disarm()
+        tasks = [t for t in _aio.all_tasks(loop) if not t.done()]
+        for t in tasks:
+            t.cancel()
+        done = _aio.gather(*tasks, return_exceptions=True)
+        while not done.done():
+            try:
+                loop.run_until_complete(done)
+            except RuntimeError:
+                # A stop() queued by the interrupted run ended this pass early.
+                pass
+        loop.close()
+        _aio.set_event_loop(None)
+
+
+class ThreadSafeFlag:
+    """Flag set from an IRQ or another thread and awaited by one task."""
+    def __init__(self):
+        self._flag = False
+
+    def set(self):
+        self._flag = True
+
+    def clear(self):
+        self._flag = False
+
+    async def wait(self):
+        while not self._flag:
+            await _aio.sleep(0)
+            if not self._flag:
+                await _aio.sleep(_IDLE_S)
+        self._flag = False
+
+
+class StreamReader:
+    """
+    asyncio.StreamReader over a machine.UART-like object. MicroPython polls
+    the UART from its scheduler; here the task polls any() every poll_ms.
+    """
+    def __init__(self, stream, poll_ms=1):
+        self.s = stream
+        self.poll_ms = poll_ms
+
+    async def read(self, n=-1):
+        while not self.s.any():
+            await sleep_ms(self.poll_ms)
+        return self.s.read() if n < 0 else self.s.read(n)
+
+    async def readinto(self, buf):
+        while True:
+            n = self.s.readinto(buf)
+            if n:
+                return n
+            await sleep_ms(self.poll_ms)
+
+    async def readline(self):
+        line = b""
+        while True:
+            chunk = self.s.readline()
+            if chunk:
+                line += chunk
+                if line.endswith(b"\n"):
+                    return line
+            else:
+                await sleep_ms(self.poll_ms)
+
+
+Stream = StreamReader
+
+__all__ = ["run", "create_task", "current_task", "gather", "wait_for", "sleep",
+           "sleep_ms", "Event", "Lock", "ThreadSafeFlag", "StreamReader",
+           "Stream", "CancelledError", "TimeoutError", "get_event_loop",
+           "new_event_loop"]
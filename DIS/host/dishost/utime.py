@@ -0,0 +1,48 @@
+"""utime / time stand-in backed by the virtual clock in dishost.clock."""
+import time as _time
+from dishost import clock as _clock
+from dishost.clock import ticks_add, ticks_diff
+
+
+def ticks_ms():
+    return _clock.get().ticks_ms()
+
+
+def ticks_us():
+    return _clock.get().ticks_us()
+
+
+def ticks_cpu():
+    return _clock.get().ticks_us()
+
+
+def sleep(seconds):
+    _clock.get().advance_us(seconds * 1000000)
+
+
+def sleep_ms(ms):
+    _clock.get().advance_us(ms * 1000)
+
+
+def sleep_us(us):
+    _clock.get().advance_us(us)
+
+
+def time():
+    return int(_time.time())
+
+
+def time_ns():
+    return _time.time_ns()
+
+
+def localtime(secs=None):
+    return _time.localtime(secs)[:8]
+
+
+def gmtime(secs=None):
+    return _time.gmtime(secs)[:8]
+
+
+__all__ = ["ticks_ms", "ticks_us", "ticks_cpu", "ticks_diff", "ticks_add",
+           "sleep", "sleep_ms", "sleep_us", "time", "time_ns", "localtime", "gmtime"]
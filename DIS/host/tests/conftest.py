@@ -0,0 +1,25 @@
+"""
+Host tests for the DIS/device code, run on dishost (from DIS/host):
+
+    python -m pytest tests
+
+Device modules are imported inside each test, after the `dev` fixture has
+installed a fresh runtime, so every test starts from clean module state.
+"""
+import os
+import sys
+
+import pytest
+
+HOST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if HOST_DIR not in sys.path:
+    sys.path.insert(0, HOST_DIR)
+
+import dishost
+from dishost.clock import Clock
+
+
+@pytest.fixture
+def dev():
+    """Fresh stand-ins and device modules on a virtual clock that only moves when told to."""
+    return dishost.install(Clock(speed=0))
@@ -0,0 +1,166 @@
+"""
+buttons.ButtonEvents against OLED_1inch3.check_button() called every ms,
+on the edge sequences bench_buttons.py reports on: taps, contact bounce,
+long presses either side of the limit, presses inside the debounce time,
+taps shorter than a poll period, toggles quicker than a stalled loop
+polls and a press across the ticks_ms wrap.
+"""
+import pytest
+
+from dishost import clock as clock_mod
+
+TICKS_PERIOD = 1 << 30
+TAIL_MS = 4000      # time simulated after the last edge
+
+
+class _Pin:
+    """Active-low button whose irq() handlers all stay attached."""
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self):
+        self.level = 1
+        self.handlers = []
+
+    def value(self):
+        return self.level
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handlers.append(handler)
+
+    def set(self, level):
+        if level != self.level:
+            self.level = level
+            for handler in self.handlers:
+                handler(self)
+
+
+class _Reference:
+    """The state check_button() keeps on the display driver, around the real method."""
+    def __init__(self, key0, key1, now):
+        import config
+        self.check_button = config.OLED_1inch3.check_button.__get__(self)
+        self.key0 = key0
+        self.key1 = key1
+        self._debounce_ms = 150
+        self._longpress_ms = 3000
+        self._last_key0 = key0.value()
+        self._last_key1 = key1.value()
+        self._last_time_k0 = now
+        self._last_time_k1 = now
+        self._k1_press_start = None
+        self._k1_reset_fired = False
+
+
+def _tap(key, at, ms):
+    return [(at, key, 0), (at + ms, key, 1)]
+
+
+def _bounce(key, at, ms, n=3):
+    """A press of ms with n extra 1 ms open/close pairs at each end."""
+    edges = []
+    for i in range(n):
+        edges += [(at + 2 * i, key, 0), (at + 2 * i + 1, key, 1)]
+    edges.append((at + 2 * n, key, 0))
+    for i in range(n):
+        edges += [(at + ms + 2 * i, key, 1), (at + ms + 2 * i + 1, key, 0)]
+    edges.append((at + ms + 2 * n, key, 1))
+    return edges
+
+
+SCENARIOS = {
+    "taps": (0, _tap(0, 500, 120) + _tap(1, 900, 200) + _tap(0, 1500, 80) + _tap(1, 2000, 90)),
+    "bounce": (0, _bounce(0, 500, 150) + _bounce(1, 1200, 300) + _bounce(1, 2500, 120)),
+    "long_press": (0, _tap(1, 500, 3500) + _tap(0, 1500, 60) + _tap(1, 5000, 100)),
+    "long_exact": (0, _tap(1, 500, 2999) + _tap(1, 4000, 3000) + _tap(1, 9000, 6000)),
+    "close_taps": (0, _tap(1, 500, 40) + _tap(1, 600, 40) + _tap(1, 800, 40)
+                   + _tap(0, 1500, 30) + _tap(0, 1600, 30) + _tap(0, 1800, 30)),
+    "short_tap": (0, _tap(0, 510, 20) + _tap(1, 1010, 20) + _tap(0, 1777, 5)),
+    "boot_press": (0, _tap(1, 50, 200) + _tap(1, 600, 100)),
+    "quick_toggles": (0, _tap(1, 500, 60) + _tap(1, 720, 60) + _tap(1, 940, 60)),
+    "wrap": (TICKS_PERIOD - 2000, _tap(1, 500, 3200) + _tap(0, 1990, 40) + _tap(1, 4000, 80)),
+}
+
+
+def _record(events, t, result):
+    screen_delta, toggle, reset, clear = result
+    events += [("screen", t)] * screen_delta
+    for name, fired in (("toggle", toggle), ("reset", reset), ("clear", clear)):
+        if fired:
+            events.append((name, t))
+
+
+def _simulate(start_ms, edges, poll_ms):
+    """
+    Step the clock 1 ms at a time driving the edges through the IRQs.
+    Returns the events of check_button() every ms, ButtonEvents polled
+    whenever pending_ms() says so (as button_task does) and ButtonEvents
+    polled every poll_ms.
+    """
+    from buttons import ButtonEvents
+    clock = clock_mod.Clock(speed=0, start_ms=start_ms)
+    clock_mod.set_clock(clock)
+    pins = (_Pin(), _Pin())
+    ref = _Reference(pins[0], pins[1], clock.ticks_ms())
+    woken = ButtonEvents(pins[0], pins[1])
+    polled = ButtonEvents(pins[0], pins[1])
+    out = ([], [], [])
+    edges = sorted(edges)
+    i = 0
+    for ms in range(edges[-1][0] + TAIL_MS):
+        while i < len(edges) and edges[i][0] == ms:
+            pins[edges[i][1]].set(edges[i][2])
+            i += 1
+        _record(out[0], ms, ref.check_button())
+        while woken.pending_ms() == 0:
+            _record(out[1], ms, woken.poll())
+        if ms % poll_ms == poll_ms - 1:
+            _record(out[2], ms, polled.poll())
+        clock.advance_us(1000)
+    assert woken.overruns == polled.overruns == 0
+    return out
+
+
+@pytest.mark.parametrize("poll_ms", [50, 400])
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_decoder_matches_check_button(dev, scenario, poll_ms):
+    start_ms, edges = SCENARIOS[scenario]
+    ref, woken, polled = _simulate(start_ms, edges, poll_ms)
+    assert ref, "scenario produced no events"
+    # Woken when button_task would be: the same events at the same ms
+    assert woken == ref
+    # Polled late (a slow frame): the same events, a KEY1 event a poll
+    assert [e for e, _ in polled] == [e for e, _ in ref]
+    for (_, t_ref), (_, t) in zip(ref, polled):
+        assert t >= t_ref
+
+
+def test_ring_overflow_is_counted(dev):
+    from buttons import ButtonEvents
+    pins = (_Pin(), _Pin())
+    ev = ButtonEvents(pins[0], pins[1], size=8)
+    for _ in range(10):
+        pins[0].set(0)
+        pins[0].set(1)
+    assert ev.overruns == 20 - 7
+    assert ev.pending_ms() == 0
+
+
+def test_pending_ms_times_the_long_press(dev):
+    from buttons import ButtonEvents
+    clock = clock_mod.get()
+    pins = (_Pin(), _Pin())
+    ev = ButtonEvents(pins[0], pins[1])
+    assert ev.pending_ms() is None
+    clock.advance_us(1000000)
+    pins[1].set(0)
+    assert ev.pending_ms() == 0
+    assert ev.poll() == (0, False, False, False)
+    clock.advance_us(1000000)
+    assert ev.pending_ms() == 2000
+    clock.advance_us(2000000)
+    assert ev.pending_ms() == 0
+    assert ev.poll() == (0, False, True, False)
+    assert ev.pending_ms() is None
+    pins[1].set(1)
+    assert ev.poll() == (0, False, False, True)
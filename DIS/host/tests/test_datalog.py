@@ -0,0 +1,69 @@
+"""
+Per-sample logging: datalog.RecordQueue into a DataLogger, and main.py
+logging every controller sample with its own arrival time.
+"""
+import glob
+import os
+
+import pytest
+
+import dishost
+from dishost.datalog import decode_bytes, decode_files
+from dishost.telemetry import ControllerFeed, race_profile
+
+KEY1_PIN = 17
+
+
+def _logged(logger):
+    """Everything the logger holds, sealed and decoded."""
+    logger._seal()
+    return decode_bytes(bytes(logger._batch[:logger._sealed * 512]))
+
+
+def test_record_queue_keeps_order_and_counts_drops(dev, tmp_path):
+    from datalog import DataLogger, RecordQueue
+    logger = DataLogger(str(tmp_path))
+    q = RecordQueue(8)
+    for k in range(10):
+        q.put(1000 + k * 250, 480 + k, -1200 * k, 300 + k, 50, 60, k & 1, 1000 * k, 1)
+    assert q.dropped == 3           # one slot always stays free
+    assert q.drain(logger) == 7
+    assert q.drain(logger) == 0
+    q.put(9999, 1, 2, 3, 4, 5, 1, 6, 2)
+    assert q.drain(logger) == 1
+    cols = _logged(logger)
+    assert list(cols["t_ms"]) == [1000 + k * 250 for k in range(7)] + [9999]
+    assert list(cols["current"]) == pytest.approx([-1.2 * k for k in range(7)] + [0.002])
+    assert list(cols["eco"]) == [bool(k & 1) for k in range(7)] + [True]
+    assert list(cols["timer_state"]) == [1] * 7 + [2]      # TIMER_RUNNING, TIMER_PAUSED
+
+
+@pytest.fixture
+def race_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    feed = ControllerFeed()
+    result = dishost.run_main(duration_s=10, speed=0, step_us=20, feed=feed,
+                              setup=lambda machine: machine.pin(KEY1_PIN).press(2000, 300))
+    ns = result.namespace
+    ns["data_logger"].flush(None, seal=True)
+    return ns, feed, decode_files(sorted(glob.glob(os.path.join("log", "*"))))
+
+
+def test_main_logs_every_sample_at_its_arrival(race_log):
+    ns, feed, cols = race_log
+    assert ns["records"].dropped == 0
+    assert ns["data_logger"].dropped == 0
+    # The last sample may still be on its way through the queues
+    assert feed.samples - 1 <= len(cols["t_ms"]) <= feed.samples
+    for k, t_ms in enumerate(cols["t_ms"]):
+        # Sent every 250 ms, stamped when its last byte arrived (to the ms:
+        # ticks_us is moved onto the ticks_ms clock)
+        assert -1 <= t_ms - k * 250 <= 20
+        volts, amps, rpm, duty, throttle, eco = race_profile(k * 250 / 1000)
+        assert cols["rpm"][k] == rpm
+        assert cols["duty"][k] == duty and cols["throttle"][k] == throttle
+        assert cols["eco"][k] == bool(eco)
+    distance = list(cols["distance_mi"])
+    assert distance == sorted(distance) and distance[-1] > 0
+    states = list(cols["timer_state"])
+    assert states[0] == 0 and states[-1] == 1        # TIMER_RESET, then TIMER_RUNNING
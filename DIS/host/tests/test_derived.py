@@ -0,0 +1,99 @@
+"""
+derived.DerivedValues' fixed-point race math against exact rational
+arithmetic (the check bench_derived.py reports, as assertions), across the
+ticks_us wrap.
+"""
+import math
+import random
+from fractions import Fraction
+
+import pytest
+
+TICKS_PERIOD = 1 << 30
+START_US = TICKS_PERIOD - 5000000      # wrap five seconds into the race
+WHEEL_IN = 16
+GOAL_MI = 40
+GOAL_S = 3600
+
+
+def _race(seconds, seed=4242):
+    """(t_us, rpm) per derive pass: a new rpm every 250 ms, passes every ~50 ms."""
+    rng = random.Random(seed)
+    t = 0
+    rpm = 0
+    next_sample = 0
+    while t < seconds * 1000000:
+        if t >= next_sample:
+            rpm = max(0, min(800, rpm + rng.randrange(-15, 26)))
+            next_sample += 250000
+        yield t, rpm
+        t += 50000 + rng.randrange(3000)
+
+
+def _derived(**kwargs):
+    from derived import DerivedValues
+    race = DerivedValues(WHEEL_IN, GOAL_MI, GOAL_S, now_us=START_US, **kwargs)
+    race.start(START_US)
+    return race
+
+
+def test_distance_elapsed_and_target_match_exact_reference(dev):
+    race = _derived()
+    umi_per_rev_us = Fraction(math.pi * WHEEL_IN) * 1000000 / 63360 / 60000000
+    ref = Fraction(0)
+    prev_t = prev_rpm = 0
+    for step, (t, rpm) in enumerate(_race(1800)):
+        race.update((START_US + t) % TICKS_PERIOD, rpm, 480, 3000)
+        # Zero-order hold: each interval runs at the rpm from its start
+        ref += prev_rpm * (t - prev_t) * umi_per_rev_us
+        prev_t, prev_rpm = t, rpm
+        if step % 64:
+            continue
+        assert abs(race.distance_umi - ref) < 20
+        assert race.elapsed_ms == t // 1000
+        rem_umi = max(GOAL_MI * 1000000 - ref, 0)
+        target = rem_umi * 3600 / Fraction(GOAL_S * 1000000 - t, 1000)
+        if 1000 <= target <= 999999:
+            assert abs(race.target_mmph - target) / target < Fraction(1, 10000)
+    assert ref > 15 * 1000000          # the race got somewhere
+    assert race.mmph == (prev_rpm * race._mmph_q10) >> 10
+    assert abs(race.mmph - prev_rpm * Fraction(math.pi * WHEEL_IN) * 60 * 1000 / 63360) < 2
+
+
+def test_whole_revolutions_are_exact(dev):
+    race = _derived()
+    # 60 rpm for ten minutes in uneven steps: exactly 600 revolutions
+    now = START_US
+    race.update(now, 60, 480, 3000)
+    steps = [37, 999999, 250001, 12345] * 100
+    for dt in steps + [600000000 - sum(steps)]:
+        now = (now + dt) % TICKS_PERIOD
+        race.update(now, 60, 480, 3000)
+    assert race._revs == 600 and race._rev_acc == 0
+    assert race.distance_umi == int(600 * math.pi * WHEEL_IN * 1000000 / 63360)
+    assert race.elapsed_ms == 600000
+
+
+def test_stop_and_reset(dev):
+    race = _derived()
+    race.update(START_US, 300, 480, 3000)
+    race.stop((START_US + 10000000) % TICKS_PERIOD)
+    distance, elapsed = race.distance_umi, race.elapsed_ms
+    assert elapsed == 10000 and distance > 0
+    race.update((START_US + 20000000) % TICKS_PERIOD, 300, 480, 3000)
+    assert (race.distance_umi, race.elapsed_ms) == (distance, elapsed)
+    race.reset((START_US + 21000000) % TICKS_PERIOD)
+    assert (race.distance_umi, race.elapsed_ms, race.remaining_umi) == (0, 0, GOAL_MI * 1000000)
+    assert race.power_mw == 480 * 3000 // 10
+
+
+@pytest.mark.parametrize("late_us", [1, 250000])
+def test_late_sample_only_sets_rpm(dev, late_us):
+    race = _derived()
+    race.update((START_US + 1000000) % TICKS_PERIOD, 300, 480, 3000)
+    distance = race.distance_umi
+    race.update((START_US + 1000000 - late_us) % TICKS_PERIOD, 400, 480, 3000)
+    assert (race.distance_umi, race.elapsed_ms, race.rpm) == (distance, 1000, 400)
+    # The next interval starts where the race already was, at the new rpm
+    race.update((START_US + 4000000) % TICKS_PERIOD, 400, 480, 3000)
+    assert race.elapsed_ms == 4000 and race._revs == 20     # 3 s at 400 rpm
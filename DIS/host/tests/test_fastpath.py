@@ -0,0 +1,209 @@
+"""
+fastpath's routines against references that do not share their code, and
+fastpath_viper's source run on CPython against the Python versions.
+
+On CPython the viper module's decorator is dishost's no-op, and ptr8/ptr32
+become plain indexing of the bytearray or array('i') they wrap, so its
+loops run as written. What the native emitter makes of them is still for
+bench_fastpath.py on the board.
+"""
+import random
+from array import array
+
+import pytest
+
+W = 128
+H = 64
+STRIDE = W // 8
+FONTS = ("font_digits_large", "font_digits_med", "font_letters_large")
+
+
+def _viper():
+    from dishost import loader
+    mod = loader.new_module("fastpath_viper")
+    mod.ptr8 = mod.ptr32 = lambda obj: obj
+    mod.__spec__.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(params=["python", "viper"])
+def impl(request, dev):
+    """(sync_page, blit_rows, scan_line) of one implementation."""
+    import fastpath
+    if request.param == "python":
+        return fastpath.py_sync_page, fastpath.py_blit_rows, fastpath.py_scan_line
+    mod = _viper()
+    return mod.sync_page, mod.blit_rows, mod.scan_line
+
+
+def test_sync_page(impl):
+    sync_page = impl[0]
+    rng = random.Random(1)
+    size = W * H // 8
+    for trial in range(32):
+        buf = bytearray(rng.randrange(256) for _ in range(size))
+        shadow = bytearray(buf)
+        for _ in range(trial % 4):
+            shadow[rng.randrange(size)] ^= 1 << rng.randrange(8)
+        before = bytes(shadow)
+        for page in range(H):
+            start = page * STRIDE
+            end = start + STRIDE
+            assert sync_page(buf, shadow, start, STRIDE) == (buf[start:end] != before[start:end])
+            assert shadow[start:end] == buf[start:end]
+            assert shadow[end:] == before[end:]
+        assert shadow == buf
+
+
+def test_blit_rows_matches_framebuf_blit(impl):
+    """Every glyph of every .fnt, clipped and not, against framebuf.blit() of its font_to_py glyph."""
+    import framebuf
+    from binfont import BinFont, font_path
+    rng = random.Random(2)
+    for name in FONTS:
+        module = __import__("fonts." + name, None, None, (name,))
+        font = BinFont(font_path(name))
+        font._blit_rows = impl[1]
+        ht = module.height()
+        for c in range(module.min_ch(), module.max_ch() + 1):
+            ch = chr(c)
+            data, gh, gw = module.get_ch(ch)
+            glyph = framebuf.FrameBuffer(bytearray(data), gw, gh, framebuf.MONO_HLSB)
+            for _ in range(6):
+                x = rng.randrange(-gw, W + gw)
+                y = rng.randrange(-ht // 2, H + ht // 2)
+                bg = rng.randrange(256)
+                ref = bytearray([bg]) * (W * H // 8)
+                framebuf.FrameBuffer(ref, W, H, framebuf.MONO_HMSB).blit(glyph, x, y, -1)
+                out = bytearray([bg]) * (W * H // 8)
+                font.blit_hmsb(ch, out, STRIDE, H, x, y)
+                assert out == ref, (name, ch, x, y)
+        font.close()
+
+
+def _stream(rng, n):
+    """Printable lines (with spaces and CRs), binary-looking runs, zeros and overlong noise."""
+    out = bytearray()
+    for _ in range(n):
+        kind = rng.randrange(6)
+        if kind == 0:
+            out += b"s 480 %06d 300 050 060 1\r\n" % rng.randrange(10 ** 6)
+        elif kind == 1:
+            out += bytes(rng.randrange(1, 256) for _ in range(rng.randrange(1, 30))) + b"\x00"
+        elif kind == 2:
+            out += bytes(rng.randrange(32, 127) for _ in range(rng.randrange(40, 80))) + b"\n"
+        elif kind == 3:
+            out += bytes([rng.choice((10, 13, 0, 32, 127, 1))])
+        elif kind == 4:
+            out += bytes([10]) + bytes(rng.randrange(256) for _ in range(rng.randrange(60)))
+        else:
+            out += b"\n\n\r\n"
+    return bytes(out)
+
+
+def _chunks(rng, total, cut=None):
+    """Read lengths covering total bytes: cut each, or random up to 64."""
+    out = []
+    while total:
+        out.append(min(total, cut or rng.randrange(1, 65)))
+        total -= out[-1]
+    return out
+
+
+def _scan(scan_line, stream, chunks):
+    """
+    Every (terminator, message, overflow, ascii, position, lf) scan_line()
+    leaves, reading the stream in pieces of the given lengths.
+    """
+    import fastpath
+    from fastpath import SCAN_POS, SCAN_END, SCAN_LEN, SCAN_OVER, SCAN_ASCII, SCAN_MAX, SCAN_LF
+    st = array("i", [0] * fastpath.SCAN_STATE)
+    st[SCAN_MAX] = 48
+    st[SCAN_ASCII] = 1
+    line = bytearray(48)
+    seen = []
+    pos = 0
+    for n in chunks:
+        buf = stream[pos:pos + n]
+        pos += n
+        st[SCAN_POS] = 0
+        st[SCAN_END] = n
+        while True:
+            term = scan_line(buf, line, st)
+            seen.append((term, bytes(line[:st[SCAN_LEN]]), st[SCAN_OVER], st[SCAN_ASCII],
+                         st[SCAN_POS], st[SCAN_LF]))
+            if term < 0:
+                break
+            st[SCAN_LEN] = 0
+            st[SCAN_OVER] = 0
+            st[SCAN_ASCII] = 1
+            st[SCAN_LF] = 0
+    return seen
+
+
+def _reference_messages(stream):
+    """
+    The framing scan_line() implements, written over the whole stream: CRs
+    and '\\n's between messages are blank lines and dropped. A message
+    whose first byte is printable is a line ending at '\\n', with its
+    spaces dropped and CRs kept; one starting with any other byte is binary
+    and ends at 0x00, or at '\\n' once past the 48 byte buffer, and keeps
+    the CR or '\\n' right before it (it may be a frame's code byte). 0x00
+    ends both.
+    """
+    out = []
+    msg = bytearray()
+    kept = 0
+    ascii_line = True
+    prev = None
+    for b in stream:
+        if b == 0:
+            out.append((0, bytes(msg[:48]), int(kept > 48)))
+            msg, kept, ascii_line, prev = bytearray(), 0, True, None
+            continue
+        if ascii_line:
+            if b in (10, 13) and not kept:
+                prev = b
+                continue
+            if b == 10:
+                out.append((10, bytes(msg[:48]), int(kept > 48)))
+                msg, kept, prev = bytearray(), 0, None
+                continue
+            if not (32 <= b <= 126 or b == 13):
+                ascii_line = False
+                if prev in (10, 13) and not kept:
+                    msg.append(prev)
+                    kept += 1
+            elif b == 32:
+                prev = b
+                continue
+        elif b == 10 and kept > 48:
+            out.append((10, bytes(msg[:48]), 1))
+            msg, kept, ascii_line, prev = bytearray(), 0, True, None
+            continue
+        msg.append(b)
+        kept += 1
+        prev = b
+    return out
+
+
+def test_scan_line_framing(impl):
+    rng = random.Random(3)
+    stream = _stream(rng, 400)
+    expected = _reference_messages(stream)
+    for cut in (len(stream), 1, 7, 64, None):
+        got = [(term, msg, over)
+               for term, msg, over, _, _, _ in _scan(impl[2], stream, _chunks(rng, len(stream), cut))
+               if term >= 0]
+        assert got == expected
+
+
+def test_scan_line_python_and_viper_agree(dev):
+    """Same results and the same state after every call, for any cut of the stream."""
+    import fastpath
+    viper = _viper()
+    rng = random.Random(4)
+    stream = _stream(rng, 300)
+    for _ in range(20):
+        chunks = _chunks(rng, len(stream))
+        assert _scan(fastpath.py_scan_line, stream, chunks) == _scan(viper.scan_line, stream, chunks)
@@ -0,0 +1,188 @@
+"""
+OLED_1inch3's threaded flush: the show() / worker hand-off through _idle
+and _ready, wait_flush(), set_invert() and the synchronous fallback.
+
+The worker runs on a CPython thread started by a _thread stand-in, with
+the interpreter's switch interval turned right down and every SPI data
+write yielding, so the caller keeps drawing while frames are on the bus.
+A model of the SH1107 decodes the bus into panel RAM; every finished
+flush must leave exactly the frame that was shown, in order.
+"""
+import sys
+import threading
+import time
+
+import pytest
+
+FRAMES = 40
+
+
+class _Thread:
+    """
+    _thread stand-in: real locks, workers on CPython threads the test can
+    join. fail=True refuses to start one, like a core 1 already in use.
+    """
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.threads = []
+
+    def allocate_lock(self):
+        return threading.Lock()
+
+    def start_new_thread(self, fn, args):
+        if self.fail:
+            raise OSError("core1 in use")
+        t = threading.Thread(target=fn, args=args, daemon=True)
+        self.threads.append(t)
+        t.start()
+
+
+class _Line:
+    """CS or DC output that remembers its level."""
+    def __init__(self, pin):
+        self.pin = pin
+        self.level = 1
+
+    def __call__(self, value=None):
+        if value is None:
+            return self.level
+        self.level = 1 if value else 0
+        self.pin(value)
+
+
+class _Panel:
+    """
+    SPI stand-in decoding the SH1107 stream into RAM (rotate 180, so RAM is
+    laid out like the framebuffer). Records the RAM after every flush, and
+    every single-byte command with the number of flushes finished before it.
+    """
+    def __init__(self, oled):
+        self.cs = oled.cs = _Line(oled.cs)
+        self.dc = oled.dc = _Line(oled.dc)
+        oled.spi = self
+        self.ram = bytearray(len(oled.buffer))
+        self.column = 0
+        self.page = 0
+        self.cs_high_bytes = 0
+        self.frames = []
+        self.commands = []      # (command bytes, flushes finished)
+        flush = oled._flush
+
+        def wrapped(*args):
+            flush(*args)
+            self.frames.append(bytes(self.ram))
+        oled._flush = wrapped
+
+    def write(self, buf):
+        if self.cs.level:
+            self.cs_high_bytes += len(buf)
+        if not self.dc.level:
+            if buf[0] < 0xB0 and len(buf) == 1 and buf[0] > 0x17:
+                self.commands.append((bytes(buf), len(self.frames)))
+            for b in buf:
+                if 0xB0 <= b <= 0xBF:
+                    self.page = b & 0x0F
+                elif b <= 0x0F:
+                    self.column = (self.column & 0xF0) | b
+                elif b <= 0x17:
+                    self.column = (self.column & 0x0F) | ((b & 0x07) << 4)
+            return
+        ram = self.ram
+        for b in buf:
+            ram[self.column * 16 + self.page] = b
+            self.page += 1
+            if self.page == 16:
+                self.page = 0
+                self.column += 1
+        time.sleep(0)           # let the other side run mid-frame
+
+
+@pytest.fixture
+def switchy():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _oled(thread):
+    import config
+    config._thread = thread
+    oled = config.OLED_1inch3(threaded=True)
+    return oled, _Panel(oled)
+
+
+def _draw(oled, k):
+    """Frame k: every page a different byte, so a torn frame cannot match."""
+    buf = oled.buffer
+    for page in range(oled.height):
+        v = (k * 7 + page) & 0xFF
+        for i in range(page * 16, page * 16 + 16):
+            buf[i] = v
+    oled.mark_dirty()
+
+
+def test_no_tearing_no_lost_frames(dev, switchy):
+    thread = _Thread()
+    oled, panel = _oled(thread)
+    assert oled._threaded
+    shown = []
+    for k in range(1, FRAMES + 1):
+        _draw(oled, k)
+        shown.append(bytes(oled.buffer))
+        oled.show()
+        oled.fill(0xFF)         # start on the next frame while this one is sent
+    oled.wait_flush()
+    assert panel.frames == shown
+    assert panel.cs_high_bytes == 0
+
+
+def test_wait_flush_leaves_frame_on_panel(dev, switchy):
+    oled, panel = _oled(_Thread())
+    for k in range(1, 6):
+        _draw(oled, k)
+        oled.show()
+        oled.wait_flush()
+        assert panel.ram == oled.buffer
+        assert len(panel.frames) == k
+
+
+def test_set_invert_waits_for_flush(dev, switchy):
+    oled, panel = _oled(_Thread())
+    for k in range(1, 11):
+        _draw(oled, k)
+        oled.show()
+        oled.set_invert(k & 1)
+    oled.wait_flush()
+    # Each command went out after the frame shown before it had been sent
+    assert panel.commands == [(b"\xa7" if k & 1 else b"\xa6", k) for k in range(1, 11)]
+
+
+def test_stop_flush_worker_sends_pending_frame(dev, switchy):
+    thread = _Thread()
+    oled, panel = _oled(thread)
+    _draw(oled, 1)
+    oled.show()
+    oled.stop_flush_worker()
+    assert panel.ram == oled.buffer
+    thread.threads[0].join(1)
+    assert not thread.threads[0].is_alive()
+    assert not oled._threaded
+    _draw(oled, 2)
+    oled.show()
+    assert panel.ram == oled.buffer
+    assert len(panel.frames) == 2
+
+
+@pytest.mark.parametrize("thread", [None, _Thread(fail=True)])
+def test_fallback_is_synchronous(dev, thread):
+    oled, panel = _oled(thread)
+    assert not oled._threaded
+    assert oled._front is None if thread else not hasattr(oled, "_front")
+    for k in range(1, 4):
+        _draw(oled, k)
+        oled.show()
+        assert panel.ram == oled.buffer
+    oled.set_invert(True)
+    oled.wait_flush()
+    assert panel.commands == [(b"\xa7", 3)]
@@ -0,0 +1,61 @@
+"""
+The precompiled .fnt fonts against the font_to_py modules they are built
+from: the files are current, every glyph is bit exact, and the dash's
+screens come out the same with either font source.
+"""
+import os
+
+import pytest
+
+from dishost import fontpack
+
+FONTS = ("font_digits_large", "font_digits_med", "font_letters_large")
+
+
+@pytest.mark.parametrize("name", FONTS)
+def test_fnt_file_is_current(name):
+    font = fontpack.load_font_module(os.path.join(fontpack.FONT_DIR, name + ".py"))
+    with open(os.path.join(fontpack.FONT_DIR, name + ".fnt"), "rb") as f:
+        assert f.read() == fontpack.pack_font(font), "run python -m dishost.fontpack"
+
+
+@pytest.mark.parametrize("name", FONTS)
+def test_fnt_glyphs_are_bit_exact(name):
+    font = fontpack.load_font_module(os.path.join(fontpack.FONT_DIR, name + ".py"))
+    assert fontpack.check_font(font, os.path.join(fontpack.FONT_DIR, name + ".fnt")) == 0
+
+
+def _display(font_files):
+    import config
+    import display
+    display.FONT_FILES = font_files
+    try:
+        d = display.DisplayManager(config.OLED_1inch3())
+        # Writers load their font on first use; load them under this setting
+        d.w_digits_large, d.w_digits_med, d.w_letters_big
+        return d
+    finally:
+        display.FONT_FILES = True
+
+
+def test_screens_match_module_fonts(dev):
+    from racestate import TIMER_RUNNING, TIMER_PAUSED
+    ref = _display(False)
+    new = _display(True)
+    assert hasattr(new.w_digits_large.font, "blit_hmsb")
+    assert not hasattr(ref.w_digits_large.font, "blit_hmsb")
+    alerts = (("TIMER", "RESET"), ("LOW", "BATT"), ("ABCDEFGH", "XYZ"), ("GO", None))
+    calls = (
+        lambda d, i: d.draw_large_num((i * 0.37) % 99.9, "MPH", i & 4, TIMER_RUNNING,
+                                      invert=(i // 30) & 1 == 1, eco=i & 8),
+        lambda d, i: d.draw_time(i * 7.3, "ELAPSED", i & 4, TIMER_PAUSED),
+        lambda d, i: d.draw_demo_distance(i * 0.0031),
+        lambda d, i: d.draw_alert(*alerts[i % len(alerts)]),
+    )
+    for call in calls:
+        for d in (ref, new):
+            d.screen_changed()
+        for i in range(60):
+            for d in (ref, new):
+                call(d, i)
+            assert ref.oled.buffer == new.oled.buffer, (call, i)
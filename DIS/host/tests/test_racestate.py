@@ -0,0 +1,155 @@
+"""
+racestate.RaceState's seqlock and dualcore.CommandQueue: copy_into() never
+returns half of one write and half of another, whether the writer is mid
+write when the copy starts, starts one during the copy, or runs flat out
+on another thread.
+"""
+import sys
+import threading
+
+import pytest
+
+
+class _Interleaved:
+    """
+    Stands in for RaceState.data and runs a writer step just after chosen
+    reads of RS_SEQ, as if the other core had got that far by then.
+    """
+    def __init__(self, state, steps):
+        self.real = state.data
+        self.steps = steps      # {nth RS_SEQ read: callable}
+        self.reads = 0
+
+    def __getitem__(self, i):
+        from racestate import RS_SEQ
+        v = self.real[i]
+        if i == RS_SEQ:
+            self.reads += 1
+            step = self.steps.get(self.reads)
+            if step:
+                step()
+        return v
+
+    def __setitem__(self, i, v):
+        self.real[i] = v
+
+
+def _fill(state, lo, hi, value):
+    for i in range(lo, hi):
+        state.data[i] = value
+
+
+def _consistent(state):
+    from racestate import RS_SEQ, RS_PUBLISHED
+    d = state.data
+    return not d[RS_SEQ] & 1 and all(d[i] == d[1] for i in range(1, RS_PUBLISHED))
+
+
+@pytest.fixture
+def published(dev):
+    from racestate import RaceState, RS_PUBLISHED
+    state = RaceState()
+    state.begin()
+    _fill(state, 1, RS_PUBLISHED, 7)
+    state.end()
+    return state
+
+
+def test_copy_waits_out_a_write_in_progress(published):
+    from racestate import RaceState, RS_PUBLISHED
+    half = RS_PUBLISHED // 2
+    published.begin()
+    _fill(published, 1, half, 8)
+    real = published.data
+
+    def finish():
+        published.data = real
+        _fill(published, half, RS_PUBLISHED, 8)
+        published.end()
+    published.data = _Interleaved(published, {3: finish})
+    dst = RaceState()
+    published.copy_into(dst)
+    assert _consistent(dst) and dst.data[1] == 8
+    assert published.retries >= 2
+
+
+def test_copy_retries_a_write_that_started_during_it(published):
+    from racestate import RaceState, RS_PUBLISHED
+    half = RS_PUBLISHED // 2
+    real = published.data
+
+    def start():
+        # After the copy read an even counter, before it copies the fields
+        published.begin()
+        _fill(published, 1, half, 8)
+
+    def finish():
+        _fill(published, half, RS_PUBLISHED, 8)
+        published.end()
+    hooked = _Interleaved(published, {1: start, 3: finish})
+    published.data = hooked
+    dst = RaceState()
+    published.copy_into(dst)
+    published.data = real
+    assert _consistent(dst) and dst.data[1] == 8
+    assert published.retries >= 1
+
+
+def test_copy_leaves_timer_and_screen(published):
+    from racestate import RaceState, RS_TIMER, RS_SCREEN, TIMER_PAUSED
+    published.data[RS_TIMER] = TIMER_PAUSED
+    published.data[RS_SCREEN] = 3
+    dst = RaceState()
+    dst.data[RS_SCREEN] = 1
+    published.copy_into(dst)
+    assert (dst.data[RS_TIMER], dst.data[RS_SCREEN]) == (0, 1)
+    snap = published.snapshot()
+    assert (snap.data[RS_TIMER], snap.data[RS_SCREEN]) == (TIMER_PAUSED, 3)
+    assert _consistent(snap)
+
+
+def test_no_torn_copies_under_threads(dev):
+    from racestate import RaceState, RS_PUBLISHED
+    state = RaceState()
+    stop = threading.Event()
+
+    def writer():
+        k = 0
+        while not stop.is_set():
+            k = (k + 1) & 0xFFFFFF
+            state.begin()
+            _fill(state, 1, RS_PUBLISHED, k)
+            state.end()
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    t = threading.Thread(target=writer, daemon=True)
+    t.start()
+    try:
+        dst = RaceState()
+        seen = set()
+        for _ in range(20000):
+            state.copy_into(dst)
+            assert _consistent(dst)
+            seen.add(dst.data[1])
+    finally:
+        stop.set()
+        t.join(5)
+        sys.setswitchinterval(interval)
+    assert len(seen) > 10           # the writer really ran during the copies
+
+
+def test_command_queue_order_and_drops(dev):
+    from dualcore import CommandQueue, CMD_START, CMD_STOP, CMD_RESET
+    q = CommandQueue(4)
+    assert q.get() == 0 and q.peek_t() is None
+    for code, t in ((CMD_START, 10), (CMD_STOP, 20), (CMD_RESET, 30), (CMD_START, 40)):
+        q.put(code, t)
+    assert q.dropped == 1
+    got = []
+    while q.peek_t() is not None:
+        t = q.peek_t()
+        got.append((q.get(), t))
+    assert got == [(CMD_START, 10), (CMD_STOP, 20), (CMD_RESET, 30)]
+    q.put(CMD_STOP, 50)             # wraps
+    assert (q.peek_t(), q.get()) == (50, CMD_STOP)
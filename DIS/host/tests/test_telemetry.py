@@ -0,0 +1,250 @@
+"""
+Telemetry framing on both ends of the link: Motor_Code/telemetry.c built
+for the host against dishost.telemetry's encoder, and that encoder
+round-tripped through UartManager (binary frames, legacy ASCII lines, CRC
+failures, sequence gaps, reads cut at every byte).
+"""
+import ctypes
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from dishost.telemetry import cobs_encode, crc16_ccitt, encode_frame, encode_line
+
+MOTOR_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "Motor_Code")
+
+# The 0x0A case: payload bytes 0-8 nonzero and byte 9 (current high byte)
+# zero, so the frame's COBS code byte is a newline.
+NEWLINE_FRAME = (5, 0x01020304, 480, 200, 300, 50, 60, False)
+# The 0x0D case: bytes 0-11 nonzero and byte 12 (duty) zero, a CR.
+CR_FRAME = (6, 0x01020304, 480, 257, 300, 0, 60, False)
+
+
+def _samples(n, seed=1):
+    rng = random.Random(seed)
+    edges = [
+        (0, 0, 0, 0, 0, 0, 0, False),
+        (255, 0xFFFFFFFF, 0xFFFF, -32768, 0xFFFF, 255, 255, True),
+        (17, 1 << 24, 500, -1, 1, 100, 100, True),
+        NEWLINE_FRAME,
+        CR_FRAME,
+    ]
+    for seq in range(n):
+        edges.append((seq & 0xFF, rng.randrange(1 << 32), rng.randrange(1 << 16),
+                      rng.randrange(-32768, 32768), rng.randrange(1 << 16),
+                      rng.randrange(101), rng.randrange(101), rng.random() < 0.5))
+    return edges
+
+
+def _manager(**kwargs):
+    from uart_manager import UartManager
+    from uartrx import SampleQueue
+    return UartManager(None, samples=SampleQueue(), **kwargs)
+
+
+def _feed(mgr, data, chunk=None):
+    """Ingest data whole, or in pieces of chunk bytes."""
+    chunk = chunk or len(data)
+    for i in range(0, len(data), chunk):
+        piece = data[i:i + chunk]
+        mgr.ingest(piece, len(piece))
+
+
+# ---------------- telemetry.c ----------------
+
+class _Sample(ctypes.Structure):
+    _fields_ = [("tick_ms", ctypes.c_uint32), ("voltage_dv", ctypes.c_uint16),
+                ("current_ma", ctypes.c_int16), ("rpm", ctypes.c_uint16),
+                ("duty", ctypes.c_uint8), ("throttle", ctypes.c_uint8), ("eco", ctypes.c_bool)]
+
+
+@pytest.fixture(scope="module")
+def libtelemetry(tmp_path_factory):
+    cc = shutil.which("cc") or shutil.which("gcc") or shutil.which("clang")
+    if cc is None:
+        pytest.skip("no C compiler")
+    lib = str(tmp_path_factory.mktemp("telemetry") / "libtelemetry.so")
+    subprocess.run([cc, "-std=c11", "-Wall", "-Werror", "-O2", "-shared", "-fPIC", "-o", lib,
+                    os.path.join(MOTOR_DIR, "telemetry.c")], check=True)
+    c = ctypes.CDLL(lib)
+    c.telemetry_crc16.restype = ctypes.c_uint16
+    c.telemetry_crc16.argtypes = [ctypes.c_char_p, ctypes.c_size_t]
+    c.telemetry_cobs_encode.restype = ctypes.c_size_t
+    c.telemetry_cobs_encode.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_char_p]
+    c.telemetry_encode.restype = ctypes.c_size_t
+    c.telemetry_encode.argtypes = [ctypes.POINTER(_Sample), ctypes.c_uint8, ctypes.c_char_p]
+    return c
+
+
+def test_c_frames_match_host_encoder(libtelemetry):
+    out = ctypes.create_string_buffer(32)
+    for seq, tick, volts, amps, rpm, duty, throttle, eco in _samples(500):
+        sample = _Sample(tick, volts, amps, rpm, duty, throttle, eco)
+        n = libtelemetry.telemetry_encode(ctypes.byref(sample), seq, out)
+        assert out.raw[:n] == encode_frame(seq, tick, volts, amps, rpm, duty, throttle, eco)
+
+
+def test_c_crc_and_cobs_match_host(libtelemetry):
+    rng = random.Random(2)
+    out = ctypes.create_string_buffer(600)
+    for length in (0, 1, 17, 253, 254, 255, 300):
+        for zeros in (0.0, 0.3, 1.0):
+            data = bytes(0 if rng.random() < zeros else rng.randrange(1, 256)
+                         for _ in range(length))
+            assert libtelemetry.telemetry_crc16(data, length) == crc16_ccitt(data)
+            n = libtelemetry.telemetry_cobs_encode(data, length, out)
+            assert out.raw[:n] == cobs_encode(data)
+
+
+# ---------------- UartManager ----------------
+
+@pytest.mark.parametrize("chunk", [None, 1, 7, 64])
+def test_binary_round_trip(dev, chunk):
+    mgr = _manager()
+    samples = _samples(300)
+    for seq, tick, volts, amps, rpm, duty, throttle, eco in samples:
+        frame = encode_frame(seq, tick, volts, amps, rpm, duty, throttle, eco)
+        _feed(mgr, frame, chunk)
+        assert mgr.new_data
+        mgr.new_data = False
+        assert (mgr.controller_tick_ms, mgr.voltage_dv, mgr.current_ma, mgr.rpm, mgr.duty,
+                mgr.throttle, mgr.eco) == (tick, volts, amps, rpm, duty, throttle, eco)
+    assert mgr.frames_received == len(samples)
+    assert mgr.crc_errors == 0 and mgr.parse_errors == 0
+    assert mgr.binary_link
+    assert len(mgr.samples) == mgr.samples._mask     # full, the rest counted as dropped
+    assert mgr.samples.dropped == len(samples) - mgr.samples._mask
+
+
+@pytest.mark.parametrize("chunk", [None, 1, 3])
+@pytest.mark.parametrize("sample, code", [(NEWLINE_FRAME, 0x0A), (CR_FRAME, 0x0D)])
+def test_newline_code_byte_frame(dev, chunk, sample, code):
+    frame = encode_frame(*sample)
+    assert frame[0] == code
+    mgr = _manager()
+    line = encode_line(480, 1000, 300, 50, 60, 0)
+    stream = frame + line + frame + frame + b"\n" + frame + line + b"\r\n" + frame
+    _feed(mgr, stream, chunk)
+    assert mgr.frames_received == 5
+    assert mgr.lines_parsed == 2
+    assert mgr.crc_errors == 0 and mgr.parse_errors == 0
+    assert mgr.controller_tick_ms == 0x01020304 and mgr.current_ma == sample[3]
+
+
+@pytest.mark.parametrize("chunk", [None, 1, 7])
+def test_blank_lines_before_frames(dev, chunk):
+    blanks = (b"\n", b"\r\n", b"", b"\n\n", b"\r", b"\n\r")
+    samples = _samples(300)
+    stream = b"".join(blanks[i % len(blanks)] + encode_frame(*s) for i, s in enumerate(samples))
+    mgr = _manager()
+    _feed(mgr, stream, chunk)
+    assert mgr.frames_received == len(samples)
+    assert mgr.crc_errors == 0 and mgr.parse_errors == 0
+
+
+def test_crc_failure(dev):
+    mgr = _manager()
+    good = encode_frame(1, 1000, 480, 2500, 300, 50, 60, True)
+    _feed(mgr, good)
+    mgr.new_data = False
+    blink = mgr.uart_blink
+    bad = bytearray(encode_frame(2, 1250, 470, 2600, 310, 51, 61, False))
+    bad[8] ^= 0x40          # still nonzero, so the frame keeps its length
+    _feed(mgr, bytes(bad))
+    assert mgr.crc_errors == 1
+    assert mgr.frames_received == 1
+    assert not mgr.new_data and mgr.uart_blink == blink
+    assert (mgr.voltage_dv, mgr.rpm) == (480, 300)
+    assert len(mgr.samples) == 1
+    # Resyncs on the next frame
+    _feed(mgr, encode_frame(3, 1500, 470, 2600, 320, 51, 61, False))
+    assert mgr.frames_received == 2 and mgr.rpm == 320
+    # A truncated frame is a CRC error too
+    _feed(mgr, good[:9] + b"\x00")
+    assert mgr.crc_errors == 2
+
+
+def test_sequence_gaps(dev):
+    mgr = _manager()
+    for seq in (250, 251, 254, 255, 0, 1, 5):
+        _feed(mgr, encode_frame(seq, seq * 250, 480, 0, 300, 50, 60, False))
+    assert mgr.frames_received == 7
+    assert mgr.frames_dropped == 2 + 3
+
+
+def test_legacy_lines(dev):
+    mgr = _manager()
+    values = [(480, 2500, 300, 50, 60, 0), (455, -1200, 0, 0, 0, 1), (999, 99999, 999, 100, 100, 1)]
+    for chunk in (None, 1, 5):
+        for v in values:
+            _feed(mgr, encode_line(*v), chunk)
+            assert (mgr.voltage_dv, mgr.current_ma, mgr.rpm, mgr.duty, mgr.throttle,
+                    mgr.eco) == v[:5] + (bool(v[5]),)
+    _feed(mgr, b"s 480 002500 300 050 060 1\r\n")      # spaces and CR are dropped
+    assert mgr.lines_parsed == 3 * len(values) + 1 and mgr.eco
+    assert mgr.parse_errors == 0 and not mgr.binary_link
+
+
+def test_bad_lines_are_not_samples(dev):
+    mgr = _manager()
+    _feed(mgr, encode_line(480, 2500, 300, 50, 60, 0))
+    mgr.new_data = False
+    blink = mgr.uart_blink
+    _feed(mgr, b"s48000250030005006\n")         # short
+    _feed(mgr, b"s4800025x0300050060\n")        # bad digit
+    _feed(mgr, b"hello\n")                      # not an 's' line
+    assert mgr.parse_errors == 2
+    assert mgr.lines_parsed == 1
+    assert not mgr.new_data and mgr.uart_blink == blink
+    assert len(mgr.samples) == 1
+    assert mgr.rpm == 300
+
+
+def test_mixed_stream_with_noise(dev):
+    rng = random.Random(3)
+    mgr = _manager()
+    stream = bytearray()
+    frames = lines = 0
+    for i, (seq, tick, volts, amps, rpm, duty, throttle, eco) in enumerate(_samples(200)):
+        if i % 3 == 0:
+            stream += encode_line(volts % 1000, amps % 100000 if amps >= 0 else amps % -99999,
+                                  rpm % 1000, duty, throttle, eco)
+            lines += 1
+        else:
+            stream += encode_frame(frames & 0xFF, tick, volts, amps, rpm, duty, throttle, eco)
+            frames += 1
+    # Noise before the first message, ended by a zero like a real resync
+    stream = bytes(rng.randrange(1, 256) for _ in range(30)) + b"\x00" + bytes(stream)
+    for chunk in (1, 13, 64):
+        mgr = _manager()
+        _feed(mgr, stream, chunk)
+        assert mgr.frames_received == frames
+        assert mgr.lines_parsed == lines
+        assert mgr.frames_dropped == 0
+        assert mgr.crc_errors == 1 and mgr.parse_errors == 0
+
+
+def test_blank_lines_are_skipped(dev):
+    # The controller prints blank lines, e.g. printf("\nIf any values...")
+    mgr = _manager()
+    line = encode_line(480, 2500, 300, 50, 60, 0)
+    _feed(mgr, b"\n" + line * 6)
+    assert mgr.lines_parsed == 6
+    for chunk in (None, 1, 5):
+        _feed(mgr, b"\r\n\n\r" + line + b"\nIf any values are wrong, reset\n\n" + line, chunk)
+    assert mgr.lines_parsed == 6 + 3 * 2
+    assert mgr.parse_errors == 0 and mgr.crc_errors == 0
+
+
+def test_noise_does_not_stall_ascii_link(dev):
+    mgr = _manager()
+    line = encode_line(480, 2500, 300, 50, 60, 0)
+    _feed(mgr, b"\x7f" + line * 6)
+    # The noise and the lines it swallowed before overflowing are lost
+    assert 0 < mgr.lines_parsed < 6
+    before = mgr.lines_parsed
+    _feed(mgr, line)
+    assert mgr.lines_parsed == before + 1
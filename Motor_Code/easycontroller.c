@@ -8,6 +8,7 @@
 #include "hardware/gpio.h"
 #include "hardware/sync.h"
 #include "hardware/uart.h"
+#include "telemetry.h"
 
 #define UART_ID   uart1
 #define TX_PIN    4       
@@ -28,6 +29,7 @@ int ECO_CURRENT_ma=6000;
 uint8_t hallToMotor[8] = {255, 3, 1, 2, 5, 4, 0, 255}; 
 const bool CURRENT_CONTROL = true;          
 const int CURRENT_CONTROL_LOOP_GAIN = 200;  
+const bool TELEMETRY_BINARY = true;         // Send COBS/CRC framed telemetry (see telemetry.h) instead of ASCII lines
 // End user config section -----------------------------
 
 const uint LED_PIN = 25;
@@ -362,6 +364,8 @@ int main() {
     gpio_set_function(TX_PIN, GPIO_FUNC_UART);
     gpio_set_function(RX_PIN, GPIO_FUNC_UART);
     char message[64];
+    uint8_t frame[TELEMETRY_FRAME_MAX];
+    uint8_t telemetry_seq = 0;
 
     int signal = 's';
     int duty_cycle_norm = 0;
@@ -387,8 +391,22 @@ int main() {
         { 
             eco = 0;
         }
-        snprintf(message, sizeof(message), "%c%03d%06d%03d%03d%03d%1d\n", signal, UARTvoltage_mv, current_ma, rpm, duty_cycle_norm, throttle_norm,eco);
-        uart_puts(UART_ID, message);
+        if (TELEMETRY_BINARY) {
+            telemetry_sample_t sample = {
+                .tick_ms = to_ms_since_boot(get_absolute_time()),
+                .voltage_dv = UARTvoltage_mv,
+                .current_ma = current_ma,
+                .rpm = rpm,
+                .duty = duty_cycle_norm,
+                .throttle = throttle_norm,
+                .eco = eco,
+            };
+            size_t frame_len = telemetry_encode(&sample, telemetry_seq++, frame);
+            uart_write_blocking(UART_ID, frame, frame_len);
+        } else {
+            snprintf(message, sizeof(message), "%c%03d%06d%03d%03d%03d%1d\n", signal, UARTvoltage_mv, current_ma, rpm, duty_cycle_norm, throttle_norm,eco);
+            uart_puts(UART_ID, message);
+        }
         sleep_ms(250);
     }
 
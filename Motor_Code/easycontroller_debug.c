@@ -8,6 +8,7 @@
 #include "hardware/gpio.h"
 #include "hardware/sync.h"
 #include "hardware/uart.h"
+#include "telemetry.h"
 
 //UART COMs
 #define UART_ID   uart1
@@ -56,6 +57,7 @@ The throttle sets the current target mapped off phase max current but the batter
 */
 
 const int CURRENT_CONTROL_LOOP_GAIN = 200;  // Adjusts the speed of the current control loop
+const bool TELEMETRY_BINARY = true;         // Send COBS/CRC framed telemetry (see telemetry.h) instead of ASCII lines
 
 // End user config section -----------------------------
 
@@ -567,6 +569,8 @@ int main() {
     gpio_set_function(TX_PIN, GPIO_FUNC_UART);
     gpio_set_function(RX_PIN, GPIO_FUNC_UART);
     char message[64];
+    uint8_t frame[TELEMETRY_FRAME_MAX];
+    uint8_t telemetry_seq = 0;
 
 
     printf("Hello from Pico!\n");
@@ -635,16 +639,30 @@ int main() {
             }
 
             // Inside main while(true) loop
-            snprintf(message, sizeof(message), "%c%03d%06d%03d%03d%03d%1d\n", 
-                signal, 
-                UARTvoltage_mv, 
-                battery_current_ma, 
-                rpm, 
-                duty_cycle_norm, 
-                throttle_norm,
-                eco);
-            //printf(message);
-            uart_puts(UART_ID, message);
+            if (TELEMETRY_BINARY) {
+                telemetry_sample_t sample = {
+                    .tick_ms = to_ms_since_boot(get_absolute_time()),
+                    .voltage_dv = UARTvoltage_mv,
+                    .current_ma = battery_current_ma,
+                    .rpm = rpm,
+                    .duty = duty_cycle_norm,
+                    .throttle = throttle_norm,
+                    .eco = eco,
+                };
+                size_t frame_len = telemetry_encode(&sample, telemetry_seq++, frame);
+                uart_write_blocking(UART_ID, frame, frame_len);
+            } else {
+                snprintf(message, sizeof(message), "%c%03d%06d%03d%03d%03d%1d\n", 
+                    signal, 
+                    UARTvoltage_mv, 
+                    battery_current_ma, 
+                    rpm, 
+                    duty_cycle_norm, 
+                    throttle_norm,
+                    eco);
+                //printf(message);
+                uart_puts(UART_ID, message);
+            }
             sleep_ms(250);
 
 
@@ -0,0 +1,73 @@
+#include "telemetry.h"
+
+uint16_t telemetry_crc16(const uint8_t *data, size_t len) {
+    // CRC-16/CCITT-FALSE: poly 0x1021, init 0xFFFF, no reflection
+    uint16_t crc = 0xFFFF;
+    for (size_t i = 0; i < len; i++) {
+        crc ^= (uint16_t)data[i] << 8;
+        for (int bit = 0; bit < 8; bit++) {
+            if (crc & 0x8000)
+                crc = (crc << 1) ^ 0x1021;
+            else
+                crc <<= 1;
+        }
+    }
+    return crc;
+}
+
+size_t telemetry_cobs_encode(const uint8_t *in, size_t len, uint8_t *out) {
+    // Consistent Overhead Byte Stuffing: removes every 0x00 from the payload.
+    // Each code byte holds the distance to the next zero (or block end).
+    size_t code_idx = 0;
+    size_t o = 1;
+    uint8_t code = 1;
+
+    for (size_t i = 0; i < len; i++) {
+        if (in[i] == 0) {
+            out[code_idx] = code;
+            code_idx = o++;
+            code = 1;
+        } else {
+            out[o++] = in[i];
+            code++;
+            if (code == 0xFF) {
+                out[code_idx] = code;
+                code_idx = o++;
+                code = 1;
+            }
+        }
+    }
+    out[code_idx] = code;
+    return o;
+}
+
+size_t telemetry_encode(const telemetry_sample_t *sample, uint8_t seq, uint8_t *out) {
+    // Builds one complete frame in out (at least TELEMETRY_FRAME_MAX bytes)
+    // and returns its length including the 0x00 delimiter.
+    uint8_t payload[TELEMETRY_PAYLOAD_LEN];
+    uint16_t current = (uint16_t)sample->current_ma;
+
+    payload[0] = TELEMETRY_VERSION;
+    payload[1] = seq;
+    payload[2] = sample->tick_ms & 0xFF;
+    payload[3] = (sample->tick_ms >> 8) & 0xFF;
+    payload[4] = (sample->tick_ms >> 16) & 0xFF;
+    payload[5] = (sample->tick_ms >> 24) & 0xFF;
+    payload[6] = sample->voltage_dv & 0xFF;
+    payload[7] = sample->voltage_dv >> 8;
+    payload[8] = current & 0xFF;
+    payload[9] = current >> 8;
+    payload[10] = sample->rpm & 0xFF;
+    payload[11] = sample->rpm >> 8;
+    payload[12] = sample->duty;
+    payload[13] = sample->throttle;
+    payload[14] = sample->eco ? TELEMETRY_FLAG_ECO : 0;
+
+    uint16_t crc = telemetry_crc16(payload, TELEMETRY_PAYLOAD_LEN - 2);
+    payload[15] = crc & 0xFF;
+    payload[16] = crc >> 8;
+
+    size_t n = telemetry_cobs_encode(payload, TELEMETRY_PAYLOAD_LEN, out);
+    out[n++] = 0x00;
+    return n;
+}
@@ -0,0 +1,48 @@
+#ifndef TELEMETRY_H
+#define TELEMETRY_H
+
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+/*
+Binary telemetry frame sent to the DIS over UART1.
+
+Payload, version 1 (multi-byte fields little endian):
+    0       version
+    1       sequence number, wraps at 256 (lets the DIS count dropped frames)
+    2-5     controller tick, ms since boot
+    6-7     battery voltage, decivolts
+    8-9     battery current, mA (signed)
+    10-11   rpm
+    12      duty cycle, percent
+    13      throttle, percent
+    14      flags (bit 0: eco)
+    15-16   CRC-16/CCITT-FALSE over every byte before it
+
+On the wire the payload is COBS encoded and terminated by a single 0x00,
+so a receiver can always resync on the next zero. Later versions may add
+fields before the CRC; decoders read the fields they know and skip the rest.
+*/
+
+#define TELEMETRY_VERSION       1
+#define TELEMETRY_PAYLOAD_LEN   17
+#define TELEMETRY_FRAME_MAX     (TELEMETRY_PAYLOAD_LEN + 2)    // COBS code byte + delimiter
+
+#define TELEMETRY_FLAG_ECO      0x01
+
+typedef struct {
+    uint32_t tick_ms;
+    uint16_t voltage_dv;
+    int16_t current_ma;
+    uint16_t rpm;
+    uint8_t duty;
+    uint8_t throttle;
+    bool eco;
+} telemetry_sample_t;
+
+uint16_t telemetry_crc16(const uint8_t *data, size_t len);
+size_t telemetry_cobs_encode(const uint8_t *in, size_t len, uint8_t *out);
+size_t telemetry_encode(const telemetry_sample_t *sample, uint8_t seq, uint8_t *out);
+
+#endif